@@ -0,0 +1,185 @@
+"""
+Batched embedding pipeline shared by the website agent and the PDF summarizer.
+
+LangChain's default path embeds every chunk through one call with no control
+over batch size or concurrency, and a single 429 fails the whole index build.
+BatchedEmbeddings wraps any LangChain Embeddings object and instead:
+
+    - sends chunks in batches of at most batch_size texts / max_batch_tokens tokens
+    - runs up to max_concurrency batches in parallel
+    - keeps requests under a QPS and tokens-per-minute budget
+    - retries throttled or transiently failing batches with jittered exponential
+      backoff, halving the batch size while the API is pushing back and growing
+      it again after a run of successful batches
+    - reports chunks/sec for every embed_documents call
+
+Callers put it under the on-disk embedding cache (if any) so only cache misses
+reach the API:
+
+    embeddings = BatchedEmbeddings(GoogleGenerativeAIEmbeddings(model=...))
+"""
+import sys
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:  # The PDF summarizer can run without LangChain
+    Embeddings = object
+
+from request_budget import DEFAULT_MAX_QPS, DEFAULT_TOKENS_PER_MINUTE, RequestBudget, estimate_tokens
+
+DEFAULT_BATCH_SIZE = 32  # texts per request
+DEFAULT_MAX_BATCH_TOKENS = 16000  # estimated tokens per request
+DEFAULT_MAX_CONCURRENCY = 4  # batches in flight
+DEFAULT_MAX_RETRIES = 6
+BASE_BACKOFF = 1.0  # seconds
+MAX_BACKOFF = 60.0  # seconds
+GROW_AFTER_SUCCESSES = 4  # successful batches before the batch size grows back
+
+RETRYABLE_MARKERS = ("429", "resource exhausted", "resourceexhausted", "quota", "rate limit",
+                     "too many requests", "503", "unavailable", "deadline exceeded", "timed out")
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for rate-limit and transient server errors worth retrying."""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code in (429, 500, 503, 504):
+        return True
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in RETRYABLE_MARKERS)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * (2 ** attempt)))
+
+
+class BatchedEmbeddings(Embeddings):
+    """Embeddings wrapper that batches, parallelizes and rate-limits embed_documents."""
+
+    def __init__(self, underlying, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 max_qps: Optional[float] = DEFAULT_MAX_QPS,
+                 tokens_per_minute: Optional[int] = DEFAULT_TOKENS_PER_MINUTE,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 verbose: bool = True):
+        self.underlying = underlying
+        self.max_batch_size = max(1, batch_size)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.verbose = verbose
+        self.budget = RequestBudget(max_qps, tokens_per_minute)
+        self._lock = threading.Lock()
+        self._batch_size = self.max_batch_size
+        self._successes = 0
+        self.stats = {"chunks": 0, "batches": 0, "retries": 0, "seconds": 0.0}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        start_time = time.time()
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        state = {"next": 0, "batches": 0, "retries": 0, "failed": False}
+
+        def take_batch():
+            # Batches are cut on demand so a shrunken batch size applies immediately
+            with self._lock:
+                start = state["next"]
+                if start >= len(texts) or state["failed"]:
+                    return None
+                end, tokens = start, 0
+                while end < len(texts) and end - start < self._batch_size:
+                    text_tokens = estimate_tokens(texts[end])
+                    if end > start and tokens + text_tokens > self.max_batch_tokens:
+                        break
+                    tokens += text_tokens
+                    end += 1
+                state["next"] = end
+                state["batches"] += 1
+                return start, end, tokens
+
+        def worker():
+            while True:
+                batch = take_batch()
+                if batch is None:
+                    return
+                start, end, tokens = batch
+                try:
+                    vectors[start:end] = self._embed_batch(texts[start:end], tokens, state)
+                except Exception:
+                    state["failed"] = True  # Stop the other workers from starting new batches
+                    raise
+
+        workers = min(self.max_concurrency, len(texts))
+        if workers == 1:
+            worker()
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(worker) for _ in range(workers)]
+                for future in futures:
+                    future.result()
+
+        elapsed = time.time() - start_time
+        with self._lock:
+            self.stats["chunks"] += len(texts)
+            self.stats["batches"] += state["batches"]
+            self.stats["retries"] += state["retries"]
+            self.stats["seconds"] += elapsed
+        if self.verbose:
+            print(f"Embedded {len(texts)} chunks in {elapsed:.2f} seconds "
+                  f"({len(texts) / max(elapsed, 1e-6):.1f} chunks/sec, {state['batches']} batches, "
+                  f"{state['retries']} retries)", file=sys.stderr)
+        return vectors
+
+    def _embed_batch(self, batch: List[str], tokens: int, state: Dict) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            self.budget.acquire(tokens)
+            try:
+                result = self.underlying.embed_documents(batch)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                self._throttled()
+                delay = backoff_delay(attempt)
+                with self._lock:
+                    state["retries"] += 1
+                if self.verbose:
+                    print(f"Embedding batch throttled ({e}); retrying in {delay:.1f} seconds "
+                          f"(attempt {attempt + 1}/{self.max_retries})", file=sys.stderr)
+                time.sleep(delay)
+                continue
+            self._succeeded()
+            return result
+
+    def _throttled(self) -> None:
+        with self._lock:
+            self._batch_size = max(1, self._batch_size // 2)
+            self._successes = 0
+
+    def _succeeded(self) -> None:
+        with self._lock:
+            self._successes += 1
+            if self._successes >= GROW_AFTER_SUCCESSES and self._batch_size < self.max_batch_size:
+                self._batch_size = min(self.max_batch_size, self._batch_size * 2)
+                self._successes = 0
+
+    def embed_query(self, text: str) -> List[float]:
+        for attempt in range(self.max_retries + 1):
+            self.budget.acquire(estimate_tokens(text))
+            try:
+                return self.underlying.embed_query(text)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                time.sleep(backoff_delay(attempt))
+
+    def chunks_per_second(self) -> Optional[float]:
+        if not self.stats["seconds"]:
+            return None
+        return self.stats["chunks"] / self.stats["seconds"]
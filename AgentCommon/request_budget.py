@@ -0,0 +1,52 @@
+"""
+Request pacing shared by the embedding pipeline and the PDF summarizer.
+
+Kept free of third-party imports so callers on a LangChain-free path (the
+direct PDF summarizer) can rate-limit Gemini calls without loading LangChain.
+"""
+import time
+import threading
+from collections import deque
+from typing import Optional
+
+DEFAULT_MAX_QPS = 5.0  # requests per second
+DEFAULT_TOKENS_PER_MINUTE = None  # no token budget unless configured
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) used for budgeting."""
+    return len(text) // 4 + 1
+
+
+class RequestBudget:
+    """Blocks callers so requests stay under a QPS and tokens-per-minute budget."""
+
+    def __init__(self, max_qps: Optional[float] = DEFAULT_MAX_QPS,
+                 tokens_per_minute: Optional[int] = DEFAULT_TOKENS_PER_MINUTE):
+        self.max_qps = max_qps
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._window = deque()  # (time, tokens) of requests in the last minute
+        self._window_tokens = 0
+
+    def acquire(self, tokens: int) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._window and now - self._window[0][0] >= 60:
+                    self._window_tokens -= self._window.popleft()[1]
+
+                wait = 0.0
+                if self.max_qps:
+                    wait = self._next_slot - now
+                if (self.tokens_per_minute and self._window
+                        and self._window_tokens + tokens > self.tokens_per_minute):
+                    wait = max(wait, self._window[0][0] + 60 - now)
+
+                if wait <= 0:
+                    self._next_slot = now + (1.0 / self.max_qps if self.max_qps else 0.0)
+                    self._window.append((now, tokens))
+                    self._window_tokens += tokens
+                    return
+            time.sleep(wait)
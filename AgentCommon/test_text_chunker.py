@@ -0,0 +1,91 @@
+"""Property tests for text_chunker: no text lost or duplicated, size bound and page ranges."""
+import random
+
+import pytest
+
+from text_chunker import CHARS_PER_TOKEN, _is_heading, chunk_pages, chunk_text, iter_chunks
+
+WORDS = ["the", "results", "Figure", "model", "data", "e.g.", "2.1", "analysis", "is", "SUMMARY", "x" * 150]
+SEPARATORS = [" ", " ", " ", ". ", "! ", "? ", ".\" ", "\n", "\n\n", "\n \n", "\n\n\n  "]
+HEADINGS = ["# Overview", "2.1 Results", "CHAPTER 3", "Appendix B", "INTRODUCTION"]
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    parts = []
+    while sum(map(len, parts)) < length:
+        if rng.random() < 0.05:
+            parts.append(f"\n\n{rng.choice(HEADINGS)}\n\n")
+        parts.append(rng.choice(WORDS))
+        parts.append(rng.choice(SEPARATORS))
+    return "".join(parts)
+
+
+def random_pages(rng: random.Random):
+    return [(number, random_text(rng, rng.randint(0, 1500))) for number in range(1, rng.randint(1, 8) + 1)]
+
+
+def page_of(page_starts, position):
+    number = page_starts[0][1]
+    for start, page_number in page_starts:
+        if start <= position:
+            number = page_number
+    return number
+
+
+@pytest.mark.parametrize("seed", range(40))
+@pytest.mark.parametrize("max_tokens,overlap_tokens", [(1, 0), (8, 0), (50, 0), (50, 10), (200, 60)])
+def test_chunk_text_round_trip(seed, max_tokens, overlap_tokens):
+    rng = random.Random(seed)
+    text = random_text(rng, rng.randint(0, 3000))
+    chunks = chunk_text(text, max_tokens, overlap_tokens)
+    assert "".join(chunk["text"][chunk["overlap"]:] for chunk in chunks) == text
+    for chunk in chunks:
+        assert 0 < len(chunk["text"]) <= max_tokens * CHARS_PER_TOKEN
+        assert chunk["text"] == text[chunk["start"]:chunk["end"]]
+
+
+@pytest.mark.parametrize("seed", range(40))
+@pytest.mark.parametrize("max_tokens,overlap_tokens", [(10, 0), (100, 0), (100, 30)])
+def test_chunk_pages_page_ranges(seed, max_tokens, overlap_tokens):
+    rng = random.Random(seed)
+    pages = random_pages(rng)
+    joined = "\n\n".join(page_text for _, page_text in pages)
+    page_starts, offset = [], 0
+    for page_number, page_text in pages:
+        page_starts.append((offset, page_number))
+        offset += len(page_text) + 2
+
+    chunks = chunk_pages(pages, max_tokens, overlap_tokens)
+    assert "".join(chunk["text"][chunk["overlap"]:] for chunk in chunks) == joined
+    for chunk in chunks:
+        assert len(chunk["text"]) <= max_tokens * CHARS_PER_TOKEN
+        assert chunk["start_page"] == page_of(page_starts, chunk["start"])
+        assert chunk["end_page"] == page_of(page_starts, chunk["end"] - 1)
+        assert chunk["start_page"] <= chunk["end_page"]
+
+
+@pytest.mark.parametrize("seed", range(40))
+@pytest.mark.parametrize("max_tokens", [5, 60, 300])
+def test_iter_chunks_matches_text(seed, max_tokens):
+    rng = random.Random(seed)
+    pages = random_pages(rng)
+    joined = "\n\n".join(page_text for _, page_text in pages)
+
+    chunks = list(iter_chunks(iter(pages), max_tokens))
+    assert "".join(chunk["text"] for chunk in chunks) == joined
+    for chunk in chunks:
+        assert chunk["overlap"] == 0
+        assert len(chunk["text"]) <= max_tokens * CHARS_PER_TOKEN
+        assert chunk["text"] == joined[chunk["start"]:chunk["end"]]
+
+
+@pytest.mark.parametrize("line", ["# Overview", "2.1 Results", "CHAPTER 3", "Chapter 3: Methods",
+                                  "appendix b", "EXECUTIVE SUMMARY"])
+def test_headings(line):
+    assert _is_heading(line)
+
+
+@pytest.mark.parametrize("line", ["the results are shown below", "2.1 percent of the sample",
+                                  "participants were asked to rate", "Our approach works well."])
+def test_prose_is_not_a_heading(line):
+    assert not _is_heading(line)
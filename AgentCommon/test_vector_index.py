@@ -0,0 +1,24 @@
+"""IVF indexes are only built where they pay off, and probe enough clusters for good recall."""
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from vector_index import MIN_IVF_VECTORS, build_index, effective_index_type, evaluate_index
+
+
+@pytest.mark.parametrize("index_type,count,expected", [
+    ("ivf", MIN_IVF_VECTORS - 1, "flat"), ("ivf", MIN_IVF_VECTORS, "ivf"),
+    ("pq", 255, "float16"), ("pq", 256, "pq"), ("hnsw", 10, "hnsw"), ("float16", 10, "float16"),
+])
+def test_effective_index_type(index_type, count, expected):
+    assert effective_index_type(index_type, count) == expected
+
+
+def test_ivf_recall_on_unclustered_vectors():
+    # Random vectors have no cluster structure, the hardest case for inverted lists
+    vectors = np.random.default_rng(0).standard_normal((MIN_IVF_VECTORS, 64)).astype(np.float32)
+    index = build_index(vectors, "ivf")
+    assert isinstance(index, faiss.IndexIVF)
+    assert index.nprobe >= index.nlist // 4
+    assert evaluate_index(index, vectors)["recall"] >= 0.75  # about 0.6 with an eighth of the clusters
@@ -0,0 +1,194 @@
+"""
+Token-aware text chunker shared by the agents.
+
+Text is cut into units at paragraph breaks, and paragraphs larger than the
+budget at sentence ends (falling back to hard splits for run-on text). Units
+are then packed greedily into chunks of at most max_tokens, starting a new
+chunk at a heading once the current one is reasonably full. Each unit is
+visited a constant number of times, so chunking is linear in the text length.
+
+Every chunk records the page range it spans and how many of its leading
+characters repeat the end of the previous chunk (its overlap), so
+
+    "".join(chunk["text"][chunk["overlap"]:] for chunk in chunks)
+
+reproduces the input exactly: no text is dropped and none is emitted twice
+except for the requested overlap. Token counts use the same estimate as the
+embedding pipeline (about four characters per token).
+
+iter_chunks does the same for a stream of pages while holding at most a few
+chunks of text: everything but the last chunk of the buffered window is
+emitted as soon as the window is large enough, and the last one is carried
+over and re-chunked together with the following pages.
+"""
+import re
+import bisect
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from request_budget import estimate_tokens
+
+PAGE_SEPARATOR = "\n\n"
+CHARS_PER_TOKEN = 4
+HEADING_MIN_FILL = 0.5  # share of max_tokens a chunk needs before a heading may start the next one
+
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n\s*")
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+HEADING = re.compile(
+    r"(#{1,6}\s+\S"  # markdown heading
+    r"|(?:\d+\.)+\d*\s+[A-Z]"  # numbered section, e.g. "2.1 Results"
+    r"|(?i:chapter|section|part|appendix)\b"
+    r"|[A-Z][A-Z0-9 ,:&/-]{2,79}$)"  # short all-caps line
+)
+
+
+def _is_heading(text: str) -> bool:
+    first_line = text.lstrip().split("\n", 1)[0].strip()
+    if not first_line or len(first_line) > 80:
+        return False
+    if first_line.isupper() or first_line.startswith("#"):
+        return True
+    return bool(HEADING.match(first_line)) and not first_line.endswith(".")
+
+
+def _split_at(text: str, start: int, end: int, pattern) -> List[Tuple[int, int]]:
+    """Pieces of text[start:end] cut after each match of pattern (separators stay with the piece before)."""
+    pieces = []
+    for match in pattern.finditer(text, start, end):
+        if match.end() > start and match.end() < end:
+            pieces.append((start, match.end()))
+            start = match.end()
+    pieces.append((start, end))
+    return pieces
+
+
+def _units(text: str, max_chars: int) -> List[Tuple[int, int, bool]]:
+    """(start, end, is_heading) spans covering text, none longer than max_chars."""
+    units = []
+    for start, end in _split_at(text, 0, len(text), PARAGRAPH_BREAK):
+        heading = _is_heading(text[start:end])
+        if end - start <= max_chars:
+            units.append((start, end, heading))
+            continue
+        for sentence_start, sentence_end in _split_at(text, start, end, SENTENCE_END):
+            for piece_start in range(sentence_start, sentence_end, max_chars):
+                units.append((piece_start, min(piece_start + max_chars, sentence_end), heading))
+                heading = False
+    return units
+
+
+def chunk_text(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[Dict]:
+    """Chunk one text; see chunk_pages for the returned fields."""
+    return chunk_pages([(1, text)], max_tokens, overlap_tokens, separator="")
+
+
+def chunk_pages(pages: Iterable[Tuple[int, str]], max_tokens: int, overlap_tokens: int = 0,
+                separator: str = PAGE_SEPARATOR) -> List[Dict]:
+    """Chunk (page_number, text) pages joined by separator.
+
+    Returns dicts with text, start/end character offsets into the joined text,
+    start_page/end_page and overlap (leading characters shared with the previous chunk).
+    """
+    if max_tokens < 1:
+        raise ValueError("max_tokens must be at least 1")
+    page_numbers, page_starts, parts, offset = [], [], [], 0
+    for page_number, page_text in pages:
+        if parts:
+            parts.append(separator)
+            offset += len(separator)
+        page_numbers.append(page_number)
+        page_starts.append(offset)
+        parts.append(page_text)
+        offset += len(page_text)
+    return _pack("".join(parts), page_numbers, page_starts, max_tokens, overlap_tokens)
+
+
+def iter_chunks(pages: Iterable[Tuple[int, str]], max_tokens: int,
+                separator: str = PAGE_SEPARATOR) -> Iterator[Dict]:
+    """Streaming chunk_pages without overlap; start/end stay offsets into the joined text."""
+    if max_tokens < 1:
+        raise ValueError("max_tokens must be at least 1")
+    window_chars = 2 * max_tokens * CHARS_PER_TOKEN
+    text, page_numbers, page_starts, base = "", [], [], 0
+
+    def emit(final: bool):
+        nonlocal text, page_numbers, page_starts, base
+        chunks = _pack(text, page_numbers, page_starts, max_tokens, 0)
+        keep = chunks if final else chunks[:-1]
+        for chunk in keep:
+            chunk["start"] += base
+            chunk["end"] += base
+            yield chunk
+        if final or not keep:
+            return
+        # Carry the last (possibly incomplete) chunk over into the next window
+        carry = chunks[-1]["start"]
+        first_page = max(0, bisect.bisect_right(page_starts, carry) - 1)
+        page_numbers = page_numbers[first_page:]
+        page_starts = [max(0, start - carry) for start in page_starts[first_page:]]
+        text = text[carry:]
+        base += carry
+
+    for page_number, page_text in pages:
+        if page_numbers:
+            text += separator
+        page_numbers.append(page_number)
+        page_starts.append(len(text))
+        text += page_text
+        if len(text) >= window_chars:
+            yield from emit(final=False)
+    if text:
+        yield from emit(final=True)
+
+
+def _pack(text: str, page_numbers: List[int], page_starts: List[int], max_tokens: int,
+          overlap_tokens: int) -> List[Dict]:
+    """Chunks of text whose pages start at page_starts."""
+    if not text:
+        return []
+
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    overlap_chars = min(overlap_tokens * CHARS_PER_TOKEN, max_chars // 2)
+    units = _units(text, max_chars)
+
+    def page_at(position: int) -> int:
+        return page_numbers[max(0, bisect.bisect_right(page_starts, position) - 1)]
+
+    chunks = []
+    first = 0  # index of the first unit of the current chunk
+    new = 0  # index of the first unit not in any previous chunk
+    emitted_end = 0  # end offset of the previous chunk
+    while first < len(units):
+        start = units[first][0]
+        last = max(first, new)
+        while last + 1 < len(units):
+            next_start, next_end, next_heading = units[last + 1]
+            if next_end - start > max_chars:
+                break
+            if next_heading and units[last][1] - start >= max_chars * HEADING_MIN_FILL:
+                break
+            last += 1
+        end = units[last][1]
+        chunks.append({
+            "text": text[start:end],
+            "start": start,
+            "end": end,
+            "start_page": page_at(start),
+            "end_page": page_at(end - 1),
+            "overlap": max(0, emitted_end - start),
+        })
+        emitted_end = end
+        new = last + 1
+        if new >= len(units):
+            break
+        # Step back over trailing units that fit the overlap, always moving forward
+        following = last + 1
+        while (overlap_chars and following - 1 > first
+               and end - units[following - 1][0] <= overlap_chars
+               and units[new][1] - units[following - 1][0] <= max_chars):
+            following -= 1
+        first = following
+    return chunks
+
+
+def chunk_tokens(chunk: Dict) -> int:
+    return estimate_tokens(chunk["text"])
@@ -0,0 +1,607 @@
+"""
+Long-lived agent server for the Agenix Python agents.
+
+Every API route used to spawn a fresh interpreter per request, which re-imports
+LangChain / google-generativeai, re-reads .env and re-runs dependency checks
+before doing any work. This server keeps a pool of warm worker processes that
+have imported every agent module once, and runs each request's existing
+command line entry point in one of them, so only the actual work is paid per
+request.
+
+Each worker runs one request at a time on its main thread, exactly like the
+standalone script: everything the agent writes to sys.stdout / sys.stderr
+(from any thread) belongs to that request, process-wide state the agents touch
+(os.environ via load_dotenv, genai.configure, warnings filters, signal
+handlers) is never shared between concurrent requests, and multiprocessing
+pools are started with forkserver/spawn instead of forking a threaded process.
+
+Protocol (JSON lines over a local socket):
+    request:   {"agent": "website_agent", "argv": ["--urls", "...", "--query", "..."]}
+    responses: {"stream": "stdout" | "stderr", "data": "..."}   (zero or more)
+               {"exit_code": 0}                                (always last)
+               {"error": "...", "fallback": true}              (agent not loaded, no worker running)
+
+Closing the connection before the exit code cancels the request: the worker
+gets SIGTERM, which pdf_summarizer turns into a cooperative cancellation; other
+agents stop immediately and their worker is replaced.
+
+Usage:
+    python agent_server.py serve [--agents pdf_summarizer website_agent ...]
+    python agent_server.py call website_agent --urls https://example.com --query "..."
+
+The `call` subcommand is a thin client: it prints the agent's output exactly as
+the standalone script would (so the routes can keep parsing it unchanged) and
+falls back to running the script in a local subprocess when no server is
+reachable. SIGTERM sent to the client (e.g. by a route's timeout) is forwarded
+to the request either way. Because the agents live in separate virtual
+environments, one server can be started per environment with a subset of
+--agents and its own port.
+
+Paths in argv are resolved against the server's working directory, so callers
+should pass absolute paths (the client makes existing relative paths absolute).
+"""
+import io
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import socket
+import argparse
+import threading
+import traceback
+import subprocess
+import socketserver
+import multiprocessing
+import importlib.util
+from typing import Callable, Dict, List, Optional
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(script_dir)  # Go up one level to the root Agenix directory
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = int(os.environ.get("AGENIX_AGENT_PORT", "8765"))
+DEFAULT_SOCKET = os.environ.get("AGENIX_AGENT_SOCKET")
+DEFAULT_WORKERS = 4
+CONNECT_TIMEOUT = 2  # seconds
+WORKER_STOP_TIMEOUT = 10  # seconds a worker gets to exit before it is killed
+WORKER_START_ATTEMPTS = 3  # starts of a worker that exits before it is ready, before giving up
+
+# Agent name -> (script path relative to the root directory, entry point taking argv)
+AGENTS = {
+    "pdf_summarizer": ("DocSummarizer/DocSummarizer/pdf_summarizer.py", "main"),
+    "website_agent": ("webcrawler/webcrawler/website_agent.py", "main"),
+    "casestudy": ("CaseStudyAgent/CaseStudyAgent/casestudy.py", "main"),
+    "ytsummarizer": ("YTSummarizer/YTSummarizer/ytsummarizer.py", "cli"),
+    "email_generator": ("Email_Generator_Agent/email_generator.py", "main"),
+    "blog": ("blog/blog.py", "api_main"),
+}
+
+
+def log(message: str) -> None:
+    """Server-side log line (never routed to a client)."""
+    sys.__stderr__.write(f"[{time.strftime('%H:%M:%S')}] {message}\n")
+    sys.__stderr__.flush()
+
+
+class AgentRegistry:
+    """Imports agent modules once and keeps them warm for the worker's lifetime."""
+
+    def __init__(self):
+        self.modules: Dict[str, object] = {}
+        self.errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def load(self, name: str) -> Optional[object]:
+        with self._lock:
+            if name in self.modules:
+                return self.modules[name]
+            if name in self.errors:
+                return None
+
+            relative_path, _ = AGENTS[name]
+            path = os.path.join(root_dir, relative_path)
+            start_time = time.time()
+            try:
+                # Sibling imports (e.g. simple_patch) need the script directory on the path
+                agent_dir = os.path.dirname(path)
+                if agent_dir not in sys.path:
+                    sys.path.insert(0, agent_dir)
+
+                spec = importlib.util.spec_from_file_location(name, path)
+                module = importlib.util.module_from_spec(spec)
+                sys.modules[name] = module
+                spec.loader.exec_module(module)
+            except BaseException as e:
+                # Agents call sys.exit() on missing keys/packages; keep serving the others
+                sys.modules.pop(name, None)
+                self.errors[name] = f"{type(e).__name__}: {e}"
+                log(f"Failed to load {name}: {self.errors[name]}")
+                return None
+
+            self.modules[name] = module
+            log(f"Loaded {name} in {time.time() - start_time:.2f} seconds")
+            return module
+
+    def entry_point(self, name: str):
+        module = self.load(name)
+        if module is None:
+            return None
+        return getattr(module, AGENTS[name][1], None)
+
+
+registry = AgentRegistry()
+
+
+def run_entry_point(entry_point, argv: List[str]) -> int:
+    """Run an agent's CLI entry point and translate its result into an exit code."""
+    try:
+        result = entry_point(argv)
+    except SystemExit as e:
+        result = e.code
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return 1
+
+    if result is None:
+        return 0
+    if isinstance(result, int):
+        return result
+    # sys.exit("message") semantics
+    print(result, file=sys.stderr)
+    return 1
+
+
+class _Channel:
+    """JSON-lines pipe from a worker to the server; whole lines even from helper threads."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._lock = threading.Lock()
+        self.active = False  # whether output currently belongs to a request
+
+    def send(self, payload: Dict) -> None:
+        with self._lock:
+            self._stream.write(json.dumps(payload) + "\n")
+            self._stream.flush()
+
+
+class _RequestStream(io.TextIOBase):
+    """A worker's sys.stdout / sys.stderr: request output while one runs, the server log otherwise."""
+
+    def __init__(self, name: str, channel: _Channel):
+        self.name = name
+        self._channel = channel
+
+    def write(self, data) -> int:
+        if not data:
+            return 0
+        if self._channel.active:
+            self._channel.send({"stream": self.name, "data": data})
+        else:
+            sys.__stderr__.write(data)
+        return len(data)
+
+    def flush(self) -> None:
+        if not self._channel.active:
+            sys.__stderr__.flush()
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return False
+
+
+def run_worker(agents: List[str]) -> int:
+    """Worker process: load the agents, then run the requests the server sends on stdin one by one."""
+    # Keep the protocol pipes private: fd 1 goes to the server log so output of
+    # child processes and C extensions cannot corrupt the JSON lines
+    channel = _Channel(os.fdopen(os.dup(1), "w", encoding="utf-8"))
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    os.dup2(2, 1)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    sys.stdin = open(os.devnull, "r")
+    sys.stdout = _RequestStream("stdout", channel)
+    sys.stderr = _RequestStream("stderr", channel)
+
+    # Ctrl-C reaches the whole process group; the server stops its workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Agents start process pools while their own threads run; never fork such a process
+    methods = multiprocessing.get_all_start_methods()
+    multiprocessing.set_start_method("forkserver" if "forkserver" in methods else "spawn", force=True)
+
+    for name in agents:
+        registry.load(name)
+    channel.send({"ready": True, "loaded": sorted(registry.modules), "failed": registry.errors})
+
+    while True:
+        raw = requests.readline()
+        if not raw:
+            return 0
+        request = json.loads(raw)
+        entry_point = registry.entry_point(request["agent"])
+        if entry_point is None:
+            channel.send({"error": f"Agent '{request['agent']}' has no entry point", "fallback": True})
+            continue
+        channel.active = True
+        try:
+            exit_code = run_entry_point(entry_point, request["argv"])
+        finally:
+            channel.active = False
+        channel.send({"exit_code": exit_code})
+
+
+class AgentWorker:
+    """Server-side handle of one worker process."""
+
+    def __init__(self, agents: List[str]):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "worker", "--agents", *agents],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE
+        )  # stderr is inherited: the worker's own log lines go to the server log
+        self._output = io.TextIOWrapper(self.process.stdout, encoding="utf-8")
+        self.loaded: List[str] = []
+        self.failed: Dict[str, str] = {}
+
+    def _read(self) -> Optional[Dict]:
+        line = self._output.readline()
+        return json.loads(line) if line else None
+
+    def wait_ready(self) -> bool:
+        """Block until the worker has imported its agents; False if it died instead."""
+        ready = self._read()
+        if ready is None:
+            return False
+        self.loaded, self.failed = ready["loaded"], ready["failed"]
+        return True
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, name: str, argv: List[str], send: Callable[[Dict], None]) -> Optional[Dict]:
+        """Run one request, forwarding its output; returns the final message or None if the worker died."""
+        try:
+            self.process.stdin.write((json.dumps({"agent": name, "argv": argv}) + "\n").encode("utf-8"))
+            self.process.stdin.flush()
+        except OSError:
+            return None
+        while True:
+            message = self._read()
+            if message is None or "stream" not in message:
+                return message
+            send(message)
+
+    def cancel(self) -> None:
+        if self.alive():
+            self.process.terminate()
+
+    def close(self) -> None:
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=WORKER_STOP_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+
+class WorkerPool:
+    """Fixed number of warm workers handed out one request at a time.
+
+    Workers that die are replaced on a background thread, so the request that
+    finds or leaves a dead worker does not wait for the new one to import its agents.
+    """
+
+    def __init__(self, agents: List[str], size: int):
+        self.agents = list(agents)
+        self._idle: "queue.Queue[Optional[AgentWorker]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.size = max(1, size)
+        workers = [AgentWorker(self.agents) for _ in range(self.size)]
+        try:
+            for index, worker in enumerate(workers):
+                if not worker.wait_ready():
+                    log(f"Worker {worker.process.pid} exited with code {worker.process.poll()} while starting")
+                    worker.close()
+                    workers[index] = self._spawn()
+        except RuntimeError:
+            for worker in workers:
+                worker.close()
+            raise
+        for worker in workers:
+            self._idle.put(worker)
+        self.loaded, self.failed = workers[0].loaded, workers[0].failed
+
+    def _spawn(self) -> AgentWorker:
+        """Start a worker and wait until it is ready, retrying a few times before giving up."""
+        for attempt in range(1, WORKER_START_ATTEMPTS + 1):
+            worker = AgentWorker(self.agents)
+            if worker.wait_ready():
+                return worker
+            log(f"Worker {worker.process.pid} exited with code {worker.process.poll()} while starting "
+                f"(attempt {attempt} of {WORKER_START_ATTEMPTS})")
+            worker.close()
+        raise RuntimeError(f"Agent worker failed to start {WORKER_START_ATTEMPTS} times")
+
+    def _replace(self, worker: AgentWorker) -> None:
+        log(f"Worker {worker.process.pid} exited with code {worker.process.returncode}; starting a new one")
+
+        def spawn():
+            try:
+                self._idle.put(self._spawn())
+            except Exception as e:
+                log(f"Error: {e}; the pool shrinks to {self.size - 1} workers")
+                with self._lock:
+                    self.size -= 1
+                    if self.size == 0:
+                        self._idle.put(None)  # wakes acquire() so requests fail instead of hanging
+
+        threading.Thread(target=spawn, daemon=True).start()
+
+    def acquire(self) -> AgentWorker:
+        """An idle live worker; raises RuntimeError once no worker can be started any more."""
+        while True:
+            worker = self._idle.get()
+            if worker is None:
+                self._idle.put(None)
+                raise RuntimeError("No agent worker is running")
+            if worker.alive():
+                return worker
+            self._replace(worker)
+
+    def release(self, worker: AgentWorker) -> None:
+        if worker.alive():
+            self._idle.put(worker)
+        else:
+            self._replace(worker)
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            worker = self._idle.get()
+            if worker is not None:
+                worker.close()
+
+
+class AgentRequestHandler(socketserver.StreamRequestHandler):
+    """Handles one JSON-lines request per connection."""
+
+    def send(self, payload: Dict) -> bool:
+        try:
+            self.wfile.write((json.dumps(payload) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            return True
+        except (BrokenPipeError, ConnectionResetError, ValueError):
+            return False
+
+    def watch_disconnect(self, worker: AgentWorker, done: threading.Event) -> None:
+        """Cancel the request when the client goes away (route timeout or aborted upload)."""
+        try:
+            data = self.connection.recv(1)
+        except OSError:
+            data = b""
+        if not data and not done.is_set():
+            log(f"Client disconnected; cancelling the request in worker {worker.process.pid}")
+            worker.cancel()
+
+    def handle(self) -> None:
+        raw = self.rfile.readline()
+        if not raw:
+            return
+        try:
+            request = json.loads(raw.decode("utf-8"))
+            name = request["agent"]
+            argv = [str(arg) for arg in request.get("argv", [])]
+        except (ValueError, KeyError, TypeError) as e:
+            self.send({"error": f"Invalid request: {e}"})
+            self.send({"exit_code": 2})
+            return
+
+        pool = self.server.pool
+        if name == "ping":
+            self.send({"loaded": pool.loaded, "failed": pool.failed})
+            self.send({"exit_code": 0})
+            return
+
+        if name not in pool.agents:
+            self.send({"error": f"Agent '{name}' is not served here", "fallback": True})
+            return
+        if name not in pool.loaded:
+            self.send({"error": pool.failed.get(name, f"Agent '{name}' could not be loaded"), "fallback": True})
+            return
+
+        start_time = time.time()
+        try:
+            worker = pool.acquire()
+        except RuntimeError as e:
+            self.send({"error": str(e), "fallback": True})
+            return
+        done = threading.Event()
+        threading.Thread(target=self.watch_disconnect, args=(worker, done), daemon=True).start()
+        try:
+            def forward(message):
+                if not self.send(message):
+                    worker.cancel()
+
+            result = worker.run(name, argv, forward)
+        finally:
+            done.set()
+            pool.release(worker)
+
+        if result is None:
+            result = {"exit_code": 1}
+            self.send({"stream": "stderr", "data": "Error: Agent worker exited unexpectedly\n"})
+        log(f"{name} finished with {result} in {time.time() - start_time:.2f} seconds")
+        self.send(result)
+
+
+class _AgentServerMixin:
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class TCPAgentServer(_AgentServerMixin, socketserver.ThreadingTCPServer):
+    pass
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class UnixAgentServer(_AgentServerMixin, socketserver.ThreadingUnixStreamServer):
+        pass
+else:
+    UnixAgentServer = None
+
+
+def serve(agents: List[str], host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          socket_path: Optional[str] = None, max_workers: int = DEFAULT_WORKERS) -> int:
+    """Start the warm workers and serve requests until interrupted."""
+    if socket_path:
+        if UnixAgentServer is None:
+            log("Unix sockets are not supported on this platform; use --port instead")
+            return 1
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixAgentServer(socket_path, AgentRequestHandler)
+        address = socket_path
+    else:
+        server = TCPAgentServer((host, port), AgentRequestHandler)
+        address = f"{host}:{port}"
+
+    start_time = time.time()
+    try:
+        server.pool = WorkerPool(agents, max_workers)
+    except RuntimeError as e:
+        log(f"Error: {e}")
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+        return 1
+    log(f"Agent server listening on {address} with {max_workers} workers ready in "
+        f"{time.time() - start_time:.2f} seconds (agents: {', '.join(server.pool.loaded) or 'none'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log("Shutting down agent server")
+    finally:
+        server.server_close()
+        server.pool.close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+    return 0
+
+
+def on_terminate(callback: Callable[[], None]) -> None:
+    """Run callback when this client is sent SIGTERM (e.g. by a route's timeout)."""
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda signum, frame: callback())
+
+
+def connect(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+            socket_path: Optional[str] = None) -> socket.socket:
+    """Open a connection to a running agent server."""
+    if socket_path:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.settimeout(CONNECT_TIMEOUT)
+        conn.connect(socket_path)
+    else:
+        conn = socket.create_connection((host, port), timeout=CONNECT_TIMEOUT)
+    # Agent runs can take minutes; the caller enforces its own deadline
+    conn.settimeout(None)
+    return conn
+
+
+def absolutize_paths(argv: List[str]) -> List[str]:
+    """Make arguments that name existing relative paths absolute for the server."""
+    return [os.path.abspath(arg) if not os.path.isabs(arg) and os.path.exists(arg) else arg
+            for arg in argv]
+
+
+def run_locally(name: str, argv: List[str]) -> int:
+    """Fallback: run the standalone script exactly as the routes used to."""
+    path = os.path.join(root_dir, AGENTS[name][0])
+    if name == "blog":
+        # blog.py's standalone mode is interactive; use its API entry point instead
+        code = "import sys, blog; sys.exit(blog.api_main(sys.argv[1:]))"
+        process = subprocess.Popen([sys.executable, "-c", code] + argv, cwd=os.path.dirname(path))
+    else:
+        process = subprocess.Popen([sys.executable, path] + argv)
+    on_terminate(process.terminate)
+    return process.wait()
+
+
+def call(name: str, argv: List[str], host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+         socket_path: Optional[str] = None) -> int:
+    """Thin client: forward a CLI invocation to the server and replay its output."""
+    try:
+        conn = connect(host, port, socket_path)
+    except OSError:
+        return run_locally(name, argv)
+
+    def cancel():
+        # The server cancels the request when the connection goes away
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    with conn:
+        on_terminate(cancel)
+        request = {"agent": name, "argv": absolutize_paths(argv)}
+        conn.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        reader = conn.makefile("r", encoding="utf-8")
+        for line in reader:
+            message = json.loads(line)
+            if "stream" in message:
+                stream = sys.stdout if message["stream"] == "stdout" else sys.stderr
+                stream.write(message["data"])
+                stream.flush()
+            elif message.get("fallback"):
+                print(f"Agent server cannot run {name}: {message['error']}. Running locally.", file=sys.stderr)
+                return run_locally(name, argv)
+            elif "error" in message:
+                print(f"Error: {message['error']}", file=sys.stderr)
+            elif "exit_code" in message:
+                return message["exit_code"]
+
+    print("Error: Agent server closed the connection unexpectedly", file=sys.stderr)
+    return 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Warm agent server for the Agenix Python agents")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Host to bind/connect to")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port (env: AGENIX_AGENT_PORT)")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET,
+                        help="Unix socket path to use instead of TCP (env: AGENIX_AGENT_SOCKET)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Start the agent server")
+    serve_parser.add_argument("--agents", nargs="+", choices=sorted(AGENTS), default=sorted(AGENTS),
+                              help="Agents to preload and serve (default: all)")
+    serve_parser.add_argument("--max_workers", type=int, default=DEFAULT_WORKERS,
+                              help="Number of warm worker processes (requests processed concurrently)")
+
+    worker_parser = subparsers.add_parser("worker", help=argparse.SUPPRESS)
+    worker_parser.add_argument("--agents", nargs="+", choices=sorted(AGENTS), default=sorted(AGENTS))
+
+    call_parser = subparsers.add_parser("call", help="Run an agent through the server")
+    call_parser.add_argument("agent", choices=sorted(AGENTS), help="Agent to run")
+    call_parser.add_argument("agent_args", nargs=argparse.REMAINDER, help="Arguments for the agent's CLI")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        return serve(args.agents, args.host, args.port, args.socket, args.max_workers)
+    if args.command == "worker":
+        return run_worker(args.agents)
+
+    agent_args = args.agent_args
+    if agent_args and agent_args[0] == "--":
+        agent_args = agent_args[1:]
+    return call(args.agent, agent_args, args.host, args.port, args.socket)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
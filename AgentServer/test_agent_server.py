@@ -0,0 +1,97 @@
+"""WorkerPool only hands out workers that started, and replaces dead ones off the request path."""
+import io
+import sys
+import time
+import subprocess
+
+import pytest
+
+import agent_server
+from agent_server import AgentWorker, WorkerPool
+
+# Reports ready without importing any agent, then idles until the pool closes its stdin
+IDLE_WORKER = ('import json, sys; print(json.dumps({"ready": True, "loaded": ["idle"], "failed": {}}), flush=True); '
+               'sys.stdin.read()')
+
+
+class IdleWorker(AgentWorker):
+    """AgentWorker whose process loads nothing; the next `failures` starts die before they are ready."""
+
+    failures = 0
+    starts = 0
+
+    def __init__(self, agents):
+        self.process = subprocess.Popen([sys.executable, "-c", IDLE_WORKER],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self._output = io.TextIOWrapper(self.process.stdout, encoding="utf-8")
+        self.loaded, self.failed = [], {}
+
+    def wait_ready(self):
+        IdleWorker.starts += 1
+        if IdleWorker.failures:
+            IdleWorker.failures -= 1
+            self.process.kill()
+        return super().wait_ready()
+
+
+@pytest.fixture
+def idle_workers(monkeypatch):
+    IdleWorker.failures = IdleWorker.starts = 0
+    monkeypatch.setattr(agent_server, "AgentWorker", IdleWorker)
+    monkeypatch.setattr(agent_server, "log", lambda message: None)
+    return IdleWorker
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.05)
+
+
+def test_failed_start_is_retried(idle_workers):
+    idle_workers.failures = 1
+    pool = WorkerPool(["idle"], 2)
+    try:
+        assert idle_workers.starts == 3
+        workers = [pool.acquire(), pool.acquire()]
+        assert all(worker.alive() for worker in workers)
+        assert pool.loaded == ["idle"] and pool.failed == {}
+        for worker in workers:
+            pool.release(worker)
+    finally:
+        pool.close()
+
+
+def test_pool_gives_up_after_bounded_attempts(idle_workers):
+    idle_workers.failures = 1 + agent_server.WORKER_START_ATTEMPTS
+    with pytest.raises(RuntimeError):
+        WorkerPool(["idle"], 1)
+    assert idle_workers.starts == 1 + agent_server.WORKER_START_ATTEMPTS
+
+
+def test_dead_worker_is_replaced_in_background(idle_workers):
+    pool = WorkerPool(["idle"], 1)
+    try:
+        worker = pool.acquire()
+        worker.process.kill()
+        worker.process.wait()
+        pool.release(worker)  # returns before the replacement is ready
+        replacement = pool.acquire()
+        assert replacement is not worker and replacement.alive()
+        pool.release(replacement)
+    finally:
+        pool.close()
+
+
+def test_acquire_fails_once_no_worker_can_start(idle_workers):
+    pool = WorkerPool(["idle"], 1)
+    worker = pool.acquire()
+    worker.process.kill()
+    worker.process.wait()
+    idle_workers.failures = agent_server.WORKER_START_ATTEMPTS
+    pool.release(worker)
+    wait_for(lambda: pool.size == 0)
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    pool.close()
@@ -243,12 +243,12 @@ class CaseStudyAgent:
             "case_study": case_study
         }
 
-def main():
+def main(argv=None):
     """Main function to run the Case Study Agent from command line"""
     parser = argparse.ArgumentParser(description="Generate professional case studies on any topic")
     parser.add_argument("topic", help="Case study topic or focus")
     parser.add_argument("--context", "-c", help="Optional URL to fetch additional context from")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Initialize and run the case study agent
     agent = CaseStudyAgent()
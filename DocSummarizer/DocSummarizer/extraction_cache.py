@@ -0,0 +1,181 @@
+"""
+On-disk cache of extracted PDF text.
+
+Re-summarizing the same PDF with a different summary length or focus areas
+used to run pypdf over the whole file again. Extraction results are keyed by
+sha256(file contents) + max_pages + EXTRACTOR_VERSION and stored as one
+zlib-compressed row per page in a small SQLite database, so a cache hit never
+opens the PDF with pypdf. The least recently used extractions are evicted once
+the compressed text exceeds the size budget. Bump EXTRACTOR_VERSION whenever
+extraction output changes so stale entries are never served; extractions with
+the OCR stage enabled are stored under their own extractor version.
+
+Pages can also be read and recorded one at a time (iter_pages / record), so the
+streaming summarizer never holds the whole document; a recording only becomes
+visible once its source iterator has been exhausted.
+"""
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+EXTRACTOR_VERSION = "pypdf-1"
+DEFAULT_EXTRACTION_CACHE_MB = 256
+
+
+def file_sha256(path: str, block_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extraction_key(doc_hash: str, max_pages: Optional[int], extractor_version: str = EXTRACTOR_VERSION) -> str:
+    return f"{doc_hash}:{max_pages if max_pages else 'all'}:{extractor_version}"
+
+
+class ExtractionCache:
+    """SQLite-backed per-page text store with size-bounded LRU eviction."""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_EXTRACTION_CACHE_MB * 1024 * 1024,
+                 extractor_version: str = EXTRACTOR_VERSION):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.extractor_version = extractor_version
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            " key TEXT PRIMARY KEY,"
+            " total_pages INTEGER NOT NULL,"
+            " processed_pages INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " key TEXT NOT NULL,"
+            " page INTEGER NOT NULL,"
+            " text BLOB NOT NULL,"
+            " PRIMARY KEY (key, page))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS extractions_last_used ON extractions (last_used)")
+        self._conn.commit()
+
+    def info(self, doc_hash: str, max_pages: Optional[int]) -> Optional[Dict]:
+        """total_pages/processed_pages of a cached extraction, or None."""
+        key = extraction_key(doc_hash, max_pages, self.extractor_version)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT total_pages, processed_pages FROM extractions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE extractions SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return {"total_pages": row[0], "processed_pages": row[1]}
+
+    def iter_pages(self, doc_hash: str, max_pages: Optional[int]) -> Iterator[Tuple[int, str]]:
+        """Cached (page_number, text) pairs, decompressed one page at a time."""
+        key = extraction_key(doc_hash, max_pages, self.extractor_version)
+        last_page = -1
+        while True:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT page, text FROM pages WHERE key = ? AND page > ? ORDER BY page LIMIT 1",
+                    (key, last_page)
+                ).fetchone()
+            if row is None:
+                return
+            last_page = row[0]
+            yield row[0], zlib.decompress(row[1]).decode("utf-8")
+
+    def get(self, doc_hash: str, max_pages: Optional[int]) -> Optional[Dict]:
+        """Cached extraction in the shape extract_text_from_pdf returns, or None."""
+        info = self.info(doc_hash, max_pages)
+        if info is None:
+            return None
+        pages = list(self.iter_pages(doc_hash, max_pages))
+        return {
+            "success": True,
+            "text": "\n\n".join(text for _, text in pages),
+            "pages": pages,
+            "total_pages": info["total_pages"],
+            "processed_pages": info["processed_pages"],
+            "elapsed_time": 0.0,
+            "cached": True,
+        }
+
+    def put(self, doc_hash: str, max_pages: Optional[int], result: Dict) -> None:
+        """Store a successful extraction and evict the least recently used ones if over budget."""
+        for _ in self.record(doc_hash, max_pages, result["pages"], result):
+            pass
+
+    def record(self, doc_hash: str, max_pages: Optional[int], pages: Iterable[Tuple[int, str]],
+               stats: Dict) -> Iterator[Tuple[int, str]]:
+        """Pass pages through while storing them; committed when pages is exhausted.
+
+        stats must hold total_pages and processed_pages by then (extraction fills it in).
+        If the generator is closed early or pages raises, the pages stored so far are
+        removed again.
+        """
+        key = extraction_key(doc_hash, max_pages, self.extractor_version)
+        with self._lock:
+            self._conn.execute("DELETE FROM extractions WHERE key = ?", (key,))
+            self._conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            self._conn.commit()
+        size = 0
+        completed = False
+        try:
+            for page, text in pages:
+                blob = zlib.compress(text.encode("utf-8"), 6)
+                size += len(blob)
+                with self._lock:
+                    self._conn.execute("INSERT OR REPLACE INTO pages (key, page, text) VALUES (?, ?, ?)",
+                                       (key, page, blob))
+                yield page, text
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO extractions (key, total_pages, processed_pages, size, last_used)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, stats["total_pages"], stats["processed_pages"], size, time.time())
+                )
+                self._evict()
+                self._conn.commit()
+            completed = True
+        finally:
+            if not completed:
+                # Closed early or failed: drop the partial pages, including any that another
+                # call's commit on this connection already made durable
+                with self._lock:
+                    self._conn.rollback()
+                    self._conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+                    self._conn.commit()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM extractions ORDER BY last_used ASC"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM pages WHERE key = ?", doomed)
+        self._conn.executemany("DELETE FROM extractions WHERE key = ?", doomed)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,93 @@
+"""
+Deadlines and cooperative cancellation for a summarization job.
+
+Gemini calls used to run without any timeout, so one hung request could stall
+the whole job until the Node route killed the process. A JobControl carries
+the job's overall deadline and a cancellation flag shared by every worker
+thread. Each API call gets a timeout capped by the time the job has left, retry
+back-off sleeps wake up as soon as the job is cancelled, and workers check the
+flag before starting a call, so a failed, expired or terminated job releases
+its workers within one request timeout.
+
+phase() derives a control for one part of the job (e.g. the map phase) with its
+own, earlier deadline that still shares the job's cancellation flag, so the
+time budget is spread across map and reduce calls instead of the map phase
+consuming all of it.
+"""
+import time
+import threading
+from typing import Optional
+
+
+class JobCancelled(Exception):
+    """Raised when a job was cancelled or ran out of time."""
+
+
+class JobControl:
+    """Overall deadline plus a cancellation flag shared by a job's threads."""
+
+    def __init__(self, timeout: Optional[float] = None, parent: Optional["JobControl"] = None,
+                 request_timeout: Optional[float] = None):
+        self.parent = parent
+        self.request_timeout = request_timeout or (parent.request_timeout if parent is not None else None)
+        self._deadline = time.monotonic() + timeout if timeout else None
+        if parent is not None and parent._deadline is not None:
+            self._deadline = min(self._deadline or parent._deadline, parent._deadline)
+        self._cancelled = parent._cancelled if parent is not None else threading.Event()
+        self._reason = None
+
+    def phase(self, share: float) -> "JobControl":
+        """A control for part of this job, ending after share of the remaining time."""
+        remaining = self.remaining()
+        return JobControl(remaining * share if remaining is not None else None, parent=self)
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """Cancel the whole job (all phases)."""
+        root = self
+        while root.parent is not None:
+            root = root.parent
+        if root._reason is None:
+            root._reason = reason
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None without one."""
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def reason(self) -> Optional[str]:
+        """Why the job stopped (None while it may continue)."""
+        if self.cancelled:
+            root = self
+            while root.parent is not None:
+                root = root.parent
+            return root._reason or "cancelled"
+        if self.expired():
+            return "timed out"
+        return None
+
+    def check(self) -> None:
+        """Raise JobCancelled if the job was cancelled or its deadline passed."""
+        reason = self.reason()
+        if reason:
+            raise JobCancelled(reason)
+
+    def call_timeout(self, timeout: float) -> float:
+        """timeout capped by the time left; raises JobCancelled if none is left."""
+        self.check()
+        remaining = self.remaining()
+        return timeout if remaining is None else min(timeout, remaining)
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep up to seconds, waking early (with JobCancelled) on cancellation or the deadline."""
+        remaining = self.remaining()
+        self._cancelled.wait(seconds if remaining is None else min(seconds, remaining))
+        self.check()
@@ -0,0 +1,152 @@
+"""
+Process-wide registry of Gemini model handles.
+
+generate_summary_with_model used to build a new genai.GenerativeModel for every
+chunk, the reduce steps and the final summary, walking the fallback list each
+time. Constructing a GenerativeModel never fails for an unknown name (the error
+only surfaces on the first request), so that loop never actually fell back.
+
+The registry keeps one GenerativeModel per model name for the whole process.
+A model creates its API client on the first request and keeps it, so every
+later call reuses the same warm HTTP/gRPC channel. The working model is
+resolved once: the first caller tries the names in order while concurrent
+callers wait for it, models answering "not found" are skipped, and the choice
+is recorded in a small JSON file so later runs start with the working model
+instead of probing the list again (until the record expires).
+"""
+import os
+import sys
+import json
+import time
+import threading
+from typing import Dict, List, Optional
+
+DEFAULT_RESOLUTION_TTL = 24 * 60 * 60  # seconds before the primary model is probed again
+
+
+def is_model_unavailable(error: Exception) -> bool:
+    """Whether a Gemini error means the model itself does not exist or is not served."""
+    message = str(error).lower()
+    if type(error).__name__ == "NotFound":
+        return True
+    return "model" in message and ("not found" in message or "not supported" in message)
+
+
+class ModelRegistry:
+    """Thread-safe cache of GenerativeModel handles with one-time fallback resolution."""
+
+    def __init__(self, model_options: List[str], state_path: Optional[str] = None,
+                 ttl: float = DEFAULT_RESOLUTION_TTL):
+        self.model_options = list(model_options)
+        self.state_path = state_path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._resolve_lock = threading.Lock()
+        self._models: Dict[str, object] = {}
+        self._api_key = None
+        self._resolved = None
+        self._unavailable: Dict[str, str] = {}  # model name -> error that ruled it out
+        self._load_state()
+
+    def configure(self, genai, api_key: str) -> None:
+        """Configure genai once per API key; a new key drops the cached handles."""
+        with self._lock:
+            if api_key == self._api_key:
+                return
+            genai.configure(api_key=api_key)
+            self._api_key = api_key
+            self._models.clear()
+
+    def model_name(self) -> str:
+        """The resolved model, or the first usable option before resolution."""
+        with self._lock:
+            return self._resolved or self._candidates()[0]
+
+    def model(self, genai, name: str):
+        """Shared GenerativeModel handle for name."""
+        with self._lock:
+            handle = self._models.get(name)
+            if handle is None:
+                handle = self._models[name] = genai.GenerativeModel(name)
+            return handle
+
+    def generate(self, genai, prompt, **kwargs):
+        """generate_content on the working model; returns (response, model_name)."""
+        if self._resolved is None:
+            with self._resolve_lock:
+                if self._resolved is None:
+                    return self._resolve(genai, prompt, **kwargs)
+        name = self._resolved
+        try:
+            return self.model(genai, name).generate_content(prompt, **kwargs), name
+        except Exception as e:
+            if not is_model_unavailable(e):
+                raise
+            # The recorded model went away (e.g. retired): resolve again without it
+            print(f"Model {name} is unavailable: {e}", file=sys.stderr)
+            with self._lock:
+                self._unavailable[name] = str(e)
+                self._models.pop(name, None)
+                if self._resolved == name:
+                    self._resolved = None
+            return self.generate(genai, prompt, **kwargs)
+
+    def _resolve(self, genai, prompt, **kwargs):
+        with self._lock:
+            candidates = self._candidates()
+        last_error = None
+        for name in candidates:
+            try:
+                print(f"Trying model: {name}", file=sys.stderr)
+                response = self.model(genai, name).generate_content(prompt, **kwargs)
+            except Exception as e:
+                if not is_model_unavailable(e):
+                    raise
+                print(f"Model {name} is unavailable: {e}", file=sys.stderr)
+                last_error = e
+                with self._lock:
+                    self._unavailable[name] = str(e)
+                    self._models.pop(name, None)
+                continue
+            with self._lock:
+                self._resolved = name
+                self._save_state()
+            if name != self.model_options[0]:
+                print(f"Using fallback model {name}", file=sys.stderr)
+            return response, name
+        raise last_error or ValueError("Failed to initialize any Gemini model")
+
+    def _candidates(self) -> List[str]:
+        usable = [name for name in self.model_options if name not in self._unavailable]
+        return usable or self.model_options
+
+    def _load_state(self) -> None:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("model_options") != self.model_options or time.time() - state.get("resolved_at", 0) > self.ttl:
+            return
+        if state.get("model") in self.model_options:
+            self._resolved = state["model"]
+            self._unavailable = dict(state.get("unavailable", {}))
+
+    def _save_state(self) -> None:
+        if not self.state_path:
+            return
+        state = {
+            "model": self._resolved,
+            "model_options": self.model_options,
+            "unavailable": self._unavailable,
+            "resolved_at": time.time(),
+        }
+        try:
+            temp_path = f"{self.state_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.state_path)
+        except OSError as e:
+            print(f"Warning: Could not record the resolved model: {e}", file=sys.stderr)
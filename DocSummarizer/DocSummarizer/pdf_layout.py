@@ -0,0 +1,194 @@
+"""
+Layout-aware page extraction.
+
+page.extract_text() flattens a page into running text: table columns come out
+as ragged runs of words and headings are indistinguishable from the sentences
+around them, which bloats prompts and hides section boundaries from the
+chunker. In layout mode each text run is collected with its position, font
+size and weight (via pypdf's visitor_text hook) and the page is rebuilt as
+structured blocks:
+
+    heading    larger or bold short lines, rendered as markdown headings so the
+               chunker starts new chunks at sections
+    paragraph  consecutive body lines, re-joined (including hyphenated words)
+    table      consecutive lines split into aligned cells, rendered as compact
+               TSV with repeated rows dropped and long tables cut short
+    caption    lines starting with "Figure n" / "Table n"
+
+Every block keeps its page number and bounding box (x0, y0, x1, y1) in PDF
+user space (origin at the bottom left). Widths are estimated from the font
+size, so cell and word boundaries are heuristics; pages without any positioned
+text fall back to plain extract_text().
+"""
+import re
+import math
+import statistics
+from typing import Dict, List
+
+LAYOUT_VERSION = "layout-1"
+CHAR_WIDTH = 0.5  # average glyph width as a share of the font size
+CELL_GAP = 1.0  # horizontal gap, in font sizes, that separates table cells
+PARAGRAPH_GAP = 1.6  # vertical distance, in line heights, that still continues a paragraph
+HEADING_SCALE = 1.15  # font size relative to the body text that marks a heading
+MAX_HEADING_CHARS = 120
+MAX_TABLE_ROWS = 40  # rows kept per table before it is cut short
+MAX_CELL_CHARS = 60
+
+CAPTION = re.compile(r"^(figure|fig\.|table|chart|exhibit)\s*\d+", re.IGNORECASE)
+BOLD_FONT = re.compile(r"bold|black|heavy|semibold", re.IGNORECASE)
+
+
+def _collect_runs(page) -> List[Dict]:
+    """Positioned text runs of a pypdf page."""
+    runs = []
+
+    def visitor(text, cm, tm, font_dict, font_size):
+        if not text or not text.strip():
+            return
+        # Text space -> user space: the text matrix combined with the current transformation matrix
+        x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+        y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+        scale = math.hypot(tm[2], tm[3]) * math.hypot(cm[2], cm[3])
+        size = abs(font_size * scale) or abs(font_size) or 10.0
+        font = str(font_dict.get("/BaseFont", "")) if font_dict else ""
+        for offset, line in enumerate(text.split("\n")):
+            if line.strip():
+                runs.append({"x": x, "y": y - offset * size * 1.2, "size": size,
+                             "bold": bool(BOLD_FONT.search(font)), "text": line})
+
+    page.extract_text(visitor_text=visitor)
+    return runs
+
+
+def _lines(runs: List[Dict]) -> List[Dict]:
+    """Runs grouped into lines (top to bottom), each split into cells at wide gaps."""
+    lines = []
+    for run in sorted(runs, key=lambda r: (-r["y"], r["x"])):
+        if lines and abs(lines[-1]["y"] - run["y"]) <= 0.5 * min(lines[-1]["size"], run["size"]):
+            lines[-1]["runs"].append(run)
+        else:
+            lines.append({"y": run["y"], "size": run["size"], "runs": [run]})
+    for line in lines:
+        cells, end = [], None
+        for run in sorted(line["runs"], key=lambda r: r["x"]):
+            width = len(run["text"]) * run["size"] * CHAR_WIDTH
+            gap = run["x"] - end if end is not None else None
+            if gap is None or gap > CELL_GAP * run["size"]:
+                cells.append({"x": run["x"], "text": run["text"].strip()})
+            elif gap < 0.1 * run["size"] and not cells[-1]["text"].endswith(" "):
+                cells[-1]["text"] += run["text"].rstrip()
+            else:
+                cells[-1]["text"] = f"{cells[-1]['text']} {run['text'].strip()}"
+            end = run["x"] + width if end is None else max(end, run["x"] + width)
+        line["cells"] = cells
+        line["text"] = " ".join(cell["text"] for cell in cells)
+        line["size"] = max(run["size"] for run in line["runs"])
+        line["bold"] = all(run["bold"] for run in line["runs"])
+        line["x0"] = cells[0]["x"]
+        line["x1"] = end
+    return lines
+
+
+def _body_size(lines: List[Dict]) -> float:
+    sizes = [line["size"] for line in lines for _ in range(len(line["text"]))]
+    return statistics.median(sizes) if sizes else 10.0
+
+
+def _kind(line: Dict, body_size: float) -> str:
+    text = line["text"]
+    if CAPTION.match(text):
+        return "caption"
+    if len(line["cells"]) > 1:
+        return "table"
+    if len(text) <= MAX_HEADING_CHARS and not text.endswith((".", ",", ";")):
+        if line["size"] >= body_size * HEADING_SCALE or (line["bold"] and len(text) <= 80):
+            return "heading"
+    return "paragraph"
+
+
+def _join_lines(texts: List[str]) -> str:
+    joined = ""
+    for text in texts:
+        if joined.endswith("-") and text[:1].islower():
+            joined = joined[:-1] + text
+        else:
+            joined = f"{joined} {text}" if joined else text
+    return joined
+
+
+def extract_blocks(page, page_number: int) -> List[Dict]:
+    """Structured blocks of a pypdf page.
+
+    Each block has type (heading, paragraph, table, caption), text, page, bbox and,
+    for tables, rows (lists of cell strings); headings also have level (1-3).
+    """
+    lines = _lines(_collect_runs(page))
+    if not lines:
+        return []
+    body_size = _body_size(lines)
+    blocks = []
+    for line in lines:
+        kind = _kind(line, body_size)
+        previous = blocks[-1] if blocks else None
+        continues = (previous is not None and previous["type"] == kind and kind != "caption"
+                     and previous["_bottom"] - line["y"] <= PARAGRAPH_GAP * 1.2 * line["size"])
+        if continues and kind == "heading" and abs(previous["_size"] - line["size"]) > 0.5:
+            continues = False
+        if continues and kind == "table" and abs(len(previous["rows"][-1]) - len(line["cells"])) > 1:
+            continues = False
+        if not continues:
+            previous = {"type": kind, "page": page_number, "_lines": [], "rows": [], "_size": line["size"],
+                        "_bottom": line["y"], "bbox": [line["x0"], line["y"], line["x1"], line["y"] + line["size"]]}
+            blocks.append(previous)
+        previous["_lines"].append(line["text"])
+        previous["rows"].append([cell["text"] for cell in line["cells"]])
+        previous["_bottom"] = line["y"]
+        bbox = previous["bbox"]
+        previous["bbox"] = [min(bbox[0], line["x0"]), min(bbox[1], line["y"]),
+                            max(bbox[2], line["x1"]), max(bbox[3], line["y"] + line["size"])]
+
+    for block in blocks:
+        if block["type"] == "table" and len(block["rows"]) < 2:
+            block["type"] = "paragraph"  # one line with a wide gap is not a table
+        if block["type"] == "heading":
+            block["level"] = 1 if block["_size"] >= body_size * 1.5 else 2 if block["_size"] >= body_size * HEADING_SCALE else 3
+        block["text"] = _join_lines(block.pop("_lines"))
+        if block["type"] != "table":
+            del block["rows"]
+        del block["_size"], block["_bottom"]
+    return blocks
+
+
+def render_table(rows: List[List[str]]) -> str:
+    """Compact TSV of table rows: whitespace collapsed, long cells and repeated rows dropped."""
+    kept, seen = [], set()
+    for row in rows:
+        cells = tuple(" ".join(cell.split())[:MAX_CELL_CHARS] for cell in row)
+        if not any(cells) or cells in seen:
+            continue
+        seen.add(cells)
+        kept.append("\t".join(cells))
+    if len(kept) > MAX_TABLE_ROWS:
+        kept = kept[:MAX_TABLE_ROWS] + [f"... ({len(kept) - MAX_TABLE_ROWS} more rows)"]
+    return "\n".join(kept)
+
+
+def render_blocks(blocks: List[Dict]) -> str:
+    """Prompt text for blocks: markdown headings, paragraphs, TSV tables and captions."""
+    parts = []
+    for block in blocks:
+        if block["type"] == "heading":
+            parts.append(f"{'#' * block['level']} {block['text']}")
+        elif block["type"] == "table":
+            parts.append(render_table(block["rows"]))
+        else:
+            parts.append(block["text"])
+    return "\n\n".join(parts)
+
+
+def layout_page_text(page, page_number: int = 0) -> str:
+    """Layout-mode text of a page, or its plain text if no positioned runs were found."""
+    blocks = extract_blocks(page, page_number)
+    if not blocks:
+        return page.extract_text() or ""
+    return render_blocks(blocks)
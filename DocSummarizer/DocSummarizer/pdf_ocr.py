@@ -0,0 +1,217 @@
+"""
+Optional OCR stage for image-only PDF pages.
+
+Scanned PDFs have no text layer, so pypdf returns nothing (or a few stray
+glyphs) for their pages and the summary used to fail with EmptyContent. When
+the poppler `pdftoppm` and `tesseract` command line tools are installed, pages
+whose extracted text is empty or mostly unreadable are rasterized and run
+through Tesseract; pages with a usable text layer never are.
+
+Each page is rendered at a DPI chosen from its size (aiming for about 3300
+pixels along the long side, within 150-400 DPI) and re-rendered once at the
+maximum DPI if that OCR pass is still unreadable. Tesseract runs as one
+single-threaded subprocess per page on a pool as large as the CPU count, and
+results are yielded in page order with a bounded number of pages in flight, so
+the stage streams like extraction itself. OCR text is cached by a hash of the
+page's content stream and images (not of the file), so the same scanned page
+in another upload or at another page limit is never OCRed twice.
+"""
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple
+
+OCR_VERSION = "tesseract-1"
+DEFAULT_OCR_LANGUAGES = "eng"
+DEFAULT_MAX_OCR_PAGES = 5000
+MIN_TEXT_CHARS = 20  # pages with fewer non-space characters count as empty
+MIN_READABLE_RATIO = 0.5  # share of letters and digits below which text counts as garbage
+TARGET_LONG_SIDE_PX = 3300  # about 300 DPI for a letter or A4 page
+MIN_DPI = 150
+MAX_DPI = 400
+OCR_TIMEOUT = 120  # seconds per rasterize or tesseract call
+
+
+def ocr_available() -> bool:
+    return bool(shutil.which("tesseract") and shutil.which("pdftoppm"))
+
+
+def readable_chars(text: str) -> int:
+    return sum(ch.isalnum() for ch in text) if text else 0
+
+
+def needs_ocr(text: str) -> bool:
+    """Whether extracted page text is empty or mostly unreadable."""
+    visible = len("".join(text.split())) if text else 0
+    if visible < MIN_TEXT_CHARS:
+        return True
+    return readable_chars(text) / visible < MIN_READABLE_RATIO
+
+
+def page_hash(page) -> str:
+    """sha256 of a pypdf page's content stream and image data."""
+    digest = hashlib.sha256()
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources is not None else None
+    if xobjects is not None:
+        xobjects = xobjects.get_object()
+        for name in sorted(xobjects):
+            digest.update(name.encode("utf-8"))
+            digest.update(xobjects[name].get_object().get_data())
+    return digest.hexdigest()
+
+
+def choose_dpi(page) -> int:
+    """DPI that renders the page at about TARGET_LONG_SIDE_PX pixels, within MIN_DPI..MAX_DPI."""
+    long_side_points = max(float(page.mediabox.width), float(page.mediabox.height), 1.0)
+    dpi = round(TARGET_LONG_SIDE_PX * 72 / long_side_points)
+    return max(MIN_DPI, min(MAX_DPI, dpi))
+
+
+def rasterize(pdf_path: str, page_number: int, dpi: int) -> bytes:
+    """PNG of one page (1-based) rendered by pdftoppm."""
+    result = subprocess.run(
+        ["pdftoppm", "-f", str(page_number), "-l", str(page_number), "-r", str(dpi), "-gray", "-png", pdf_path],
+        capture_output=True, timeout=OCR_TIMEOUT, check=True
+    )
+    return result.stdout
+
+
+def run_tesseract(image: bytes, dpi: int, languages: str = DEFAULT_OCR_LANGUAGES) -> str:
+    # One thread per process; the pool provides the parallelism
+    env = dict(os.environ, OMP_THREAD_LIMIT="1")
+    result = subprocess.run(
+        ["tesseract", "stdin", "stdout", "-l", languages, "--dpi", str(dpi)],
+        input=image, capture_output=True, timeout=OCR_TIMEOUT, check=True, env=env
+    )
+    return result.stdout.decode("utf-8", errors="replace").strip()
+
+
+def ocr_page(pdf_path: str, page_number: int, dpi: int, languages: str = DEFAULT_OCR_LANGUAGES) -> str:
+    """OCR text of one page, retried once at MAX_DPI if the first pass is unreadable."""
+    text = run_tesseract(rasterize(pdf_path, page_number, dpi), dpi, languages)
+    if needs_ocr(text) and dpi < MAX_DPI:
+        retry = run_tesseract(rasterize(pdf_path, page_number, MAX_DPI), MAX_DPI, languages)
+        if readable_chars(retry) > readable_chars(text):
+            text = retry
+    return text
+
+
+class OcrCache:
+    """SQLite-backed page hash -> OCR text store with LRU eviction by entry count."""
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_OCR_PAGES):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_pages ("
+            " key TEXT PRIMARY KEY,"
+            " text TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ocr_pages_last_used ON ocr_pages (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(page_digest: str, languages: str) -> str:
+        return f"{page_digest}:{languages}:{OCR_VERSION}"
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM ocr_pages WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE ocr_pages SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return row[0]
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO ocr_pages (key, text, last_used) VALUES (?, ?, ?)",
+                               (key, text, time.time()))
+            count = self._conn.execute("SELECT COUNT(*) FROM ocr_pages").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM ocr_pages WHERE key IN"
+                    " (SELECT key FROM ocr_pages ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class OcrStage:
+    """Replaces the text of empty or garbage pages with Tesseract output."""
+
+    def __init__(self, cache: Optional[OcrCache] = None, languages: str = DEFAULT_OCR_LANGUAGES,
+                 workers: Optional[int] = None):
+        self.cache = cache
+        self.languages = languages
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.ocr_pages = 0
+        self.cached_pages = 0
+
+    def _ocr(self, pdf_path: str, page_number: int, dpi: int, key: Optional[str], text: str) -> str:
+        try:
+            ocr_text = ocr_page(pdf_path, page_number, dpi, self.languages)
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Warning: OCR failed for page {page_number}: {e}", file=sys.stderr)
+            return text
+        if key and self.cache:
+            self.cache.put(key, ocr_text)
+        return ocr_text if readable_chars(ocr_text) > readable_chars(text) else text
+
+    def apply(self, pdf_path: str, reader, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        """(page_index, text) pages in order, OCRing those that need it on the pool.
+
+        reader is the caller's pypdf reader; it is only used from this thread.
+        """
+        start_time = time.time()
+        pending = deque()  # (page_index, text or Future), in page order
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for index, text in pages:
+                if needs_ocr(text):
+                    page = reader.pages[index]
+                    key = None
+                    if self.cache:
+                        try:
+                            key = OcrCache.key(page_hash(page), self.languages)
+                        except Exception as e:
+                            print(f"Warning: Could not hash page {index+1} for the OCR cache: {e}", file=sys.stderr)
+                    cached = self.cache.get(key) if key else None
+                    if cached is not None:
+                        self.cached_pages += 1
+                        text = cached if readable_chars(cached) > readable_chars(text) else text
+                    else:
+                        self.ocr_pages += 1
+                        text = executor.submit(self._ocr, pdf_path, index + 1, choose_dpi(page), key, text)
+                pending.append((index, text))
+                while pending and (not isinstance(pending[0][1], Future) or len(pending) > 2 * self.workers):
+                    index, result = pending.popleft()
+                    yield index, result.result() if isinstance(result, Future) else result
+            while pending:
+                index, result = pending.popleft()
+                yield index, result.result() if isinstance(result, Future) else result
+        finally:
+            # A consumer that stops early (e.g. a failed first chunk) does not wait for queued pages
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self.ocr_pages or self.cached_pages:
+            print(f"OCR: {self.ocr_pages} pages recognized, {self.cached_pages} from cache "
+                  f"in {time.time() - start_time:.2f} seconds", file=sys.stderr)
@@ -0,0 +1,81 @@
+"""
+Process pool for extracting PDF page text with pypdf.
+
+pypdf is pure Python, so long PDFs only get faster on several cores with
+processes. The worker functions live at module level in this small module, so
+they can be pickled and spawned workers only import pypdf. Each worker parses
+the PDF once in its initializer and then extracts contiguous page ranges,
+rather than re-opening the file for every page. Ranges are submitted a few at
+a time and yielded in page order, so a slow consumer (the summarizer) bounds
+how much extracted text is held in memory. In layout mode workers rebuild each
+page with pdf_layout instead of page.extract_text().
+"""
+import os
+import sys
+import math
+import multiprocessing
+from collections import deque
+from typing import Iterator, List, Optional, Tuple
+
+MIN_PAGES_PER_WORKER = 8  # below this a worker costs more to start than it saves
+RANGES_PER_WORKER = 3  # a few ranges per worker evens out slow pages
+
+_reader = None
+_layout = False
+
+
+def _init_worker(pdf_path: str, layout: bool = False) -> None:
+    global _reader, _layout
+    from pypdf import PdfReader
+    _reader = PdfReader(pdf_path)
+    _layout = layout
+
+
+def _extract_range(page_range: Tuple[int, int]) -> List[Tuple[int, str]]:
+    """(page_index, text) for pages start..end-1 of the worker's reader."""
+    results = []
+    for index in range(*page_range):
+        try:
+            if _layout:
+                from pdf_layout import layout_page_text
+                text = layout_page_text(_reader.pages[index], index + 1)
+            else:
+                text = _reader.pages[index].extract_text()
+        except Exception as e:
+            print(f"Warning: Could not extract text from page {index+1}: {e}", file=sys.stderr)
+            text = ""
+        results.append((index, text if text and text.strip() else ""))
+    return results
+
+
+def choose_worker_count(page_count: int, max_workers: Optional[int] = None) -> int:
+    """Workers for a document: bounded by the CPUs and by MIN_PAGES_PER_WORKER pages each."""
+    cpus = max_workers or os.cpu_count() or 1
+    return max(1, min(cpus, page_count // MIN_PAGES_PER_WORKER))
+
+
+def page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Contiguous [start, end) ranges covering page_count pages."""
+    size = max(1, math.ceil(page_count / (workers * RANGES_PER_WORKER)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def iter_pages_parallel(pdf_path: str, page_count: int, workers: int,
+                        max_pending: Optional[int] = None, layout: bool = False) -> Iterator[Tuple[int, str]]:
+    """(page_index, text) for the first page_count pages, in page order, with at most
+    max_pending ranges extracted ahead of the consumer."""
+    ranges = page_ranges(page_count, workers)
+    max_pending = max_pending or workers * 2
+    with multiprocessing.Pool(processes=workers, initializer=_init_worker, initargs=(pdf_path, layout)) as pool:
+        pending, submitted = deque(), 0
+        while pending or submitted < len(ranges):
+            while submitted < len(ranges) and len(pending) < max_pending:
+                pending.append(pool.apply_async(_extract_range, (ranges[submitted],)))
+                submitted += 1
+            yield from pending.popleft().get()
+
+
+def extract_pages_parallel(pdf_path: str, page_count: int, workers: int,
+                           layout: bool = False) -> List[Tuple[int, str]]:
+    """(page_index, text) for the first page_count pages, in page order."""
+    return list(iter_pages_parallel(pdf_path, page_count, workers, layout=layout))
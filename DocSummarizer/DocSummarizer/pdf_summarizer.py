@@ -4,10 +4,17 @@ import warnings
 import sys
 import uuid
 import time
+import signal
 import traceback
-import multiprocessing
-import re
+import threading
+import itertools
+import importlib
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
+
+_MODULE_START = time.perf_counter()  # start of the startup window shown by --import_report
+
 from dotenv import load_dotenv
 
 # Suppress deprecation warnings
@@ -32,24 +39,85 @@ if not os.path.exists(env_path):
 else:
     load_dotenv(dotenv_path=env_path)
 
+# Helpers shared with the other agents live in the root AgentCommon directory
+sys.path.append(os.path.join(root_dir, "AgentCommon"))
+from request_budget import RequestBudget, estimate_tokens
+from text_chunker import chunk_pages, iter_chunks
+from extraction_cache import ExtractionCache, DEFAULT_EXTRACTION_CACHE_MB, EXTRACTOR_VERSION, file_sha256
+from summary_cache import SummaryCache, chunk_key, final_key
+from pdf_page_pool import choose_worker_count, iter_pages_parallel
+from pdf_layout import LAYOUT_VERSION, layout_page_text
+from pdf_ocr import OcrCache, OcrStage, DEFAULT_OCR_LANGUAGES, OCR_VERSION, ocr_available
+from model_registry import ModelRegistry
+from job_control import JobCancelled, JobControl
+
 # Set timeout values for API calls
 DEFAULT_API_TIMEOUT = 60  # seconds
 MAX_API_TIMEOUT = 120  # seconds
+DEFAULT_JOB_TIMEOUT = 540  # seconds for a whole summary, below the route's 10 minute process timeout
+MAP_PHASE_SHARE = 0.7  # share of the remaining job time the map phase may use; the rest is for reducing
 MAX_TEXT_LENGTH = 25000  # Maximum text length to process
+MAX_CHUNK_TOKENS = MAX_TEXT_LENGTH // 4  # Estimated tokens per map-phase chunk
+DEFAULT_MAP_CONCURRENCY = 4  # Chunks summarized at the same time
+DEFAULT_MAP_QPS = 2.0  # Gemini calls started per second during the map phase
+DEFAULT_EXTRACTION_CACHE_PATH = os.path.join(script_dir, "extraction_cache.sqlite")
+DEFAULT_SUMMARY_CACHE_PATH = os.path.join(script_dir, "summary_cache.sqlite")
+DEFAULT_OCR_CACHE_PATH = os.path.join(script_dir, "ocr_cache.sqlite")
+OCR_HINT = " Install Tesseract and poppler (pdftoppm) to summarize scanned documents with --ocr."
+MODEL_OPTIONS = ['gemini-1.5-flash', 'gemini-2.5-flash', 'gemini-1.0-pro']  # Tried in order
+DEFAULT_MODEL_STATE_PATH = os.path.join(script_dir, "model_state.json")  # Records the resolved model
+REDUCE_BATCH_TOKENS = 6000  # Estimated tokens of partial summaries combined per reduce call
+
+# Heavy third-party stacks are imported on first use (see lazy_import and load_langchain):
+# the direct Gemini path never needs LangChain or a vector store, and importing them
+# used to dominate CLI start-up.
+HEAVY_MODULES = ['google.generativeai', 'pypdf', 'langchain', 'langchain_core', 'langchain_community',
+                 'langchain_google_genai', 'langchain_chroma', 'chromadb', 'faiss', 'numpy']
+_import_times = {}  # module name -> seconds spent importing it through lazy_import
+
+def lazy_import(name):
+    """Import a module on first use, recording how long the import took."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    import_start = time.perf_counter()
+    module = importlib.import_module(name)
+    _import_times.setdefault(name, time.perf_counter() - import_start)
+    return module
+
+def module_available(name):
+    """Whether a module can be imported, found without importing it (only parent packages are)."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+def print_import_report(startup_seconds=None, startup_modules=None, file=sys.stderr):
+    """Print an -X importtime style summary of start-up and deferred imports."""
+    print("Import report:", file=file)
+    if startup_seconds is not None:
+        print(f"  start-up (module load to parsed arguments): {startup_seconds * 1000:.1f} ms, "
+              f"{startup_modules} modules loaded", file=file)
+    print(f"  total: {(time.perf_counter() - _MODULE_START) * 1000:.1f} ms, "
+          f"{len(sys.modules)} modules loaded", file=file)
+    print("  lazy import time [us] | module", file=file)
+    for name, seconds in sorted(_import_times.items(), key=lambda item: -item[1]):
+        print(f"  {int(seconds * 1e6):>21} | {name}", file=file)
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    skipped = [name for name in HEAVY_MODULES if name not in sys.modules]
+    print(f"  heavy modules loaded: {', '.join(loaded) or 'none'}", file=file)
+    print(f"  heavy modules never imported: {', '.join(skipped) or 'none'}", file=file)
 
 # Function to check dependencies
 def check_dependencies():
+    """Probe the optional stacks with find_spec; nothing heavy is imported here."""
     missing_deps = []
     
     # Check for core dependencies
-    try:
-        import google.generativeai
-    except ImportError:
+    if not module_available("google.generativeai"):
         missing_deps.append("google-generativeai")
     
-    try:
-        import pypdf
-    except ImportError:
+    if not module_available("pypdf"):
         missing_deps.append("pypdf")
     
     if missing_deps:
@@ -59,67 +127,45 @@ def check_dependencies():
         sys.exit(1)
     
     # Continue with checking LangChain dependencies - but don't fail if they're inconsistent
-    print("Checking LangChain dependencies...", file=sys.stderr)
-    
     langchain_deps = []
     has_langchain = True
     
-    try:
-        from langchain_community.document_loaders import PyPDFLoader
-    except ImportError:
+    if not module_available("langchain_community"):
         langchain_deps.append("langchain-community")
         has_langchain = False
     
-    try:
-        from langchain.text_splitter import RecursiveCharacterTextSplitter
-    except ImportError:
+    if not module_available("langchain"):
         langchain_deps.append("langchain")
         has_langchain = False
     
-    try:
-        import google.generativeai as genai
-        has_genai = True
-    except ImportError:
-        has_genai = False
-        langchain_deps.append("google-generativeai")
+    has_genai = True
     
-    try:
-        from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-        has_langchain_genai = True
-    except (ImportError, Exception) as e:
-        has_langchain_genai = False
-        print(f"Warning: langchain-google-genai import error: {e}", file=sys.stderr)
+    # Incompatible versions only show up when load_langchain actually imports them
+    has_langchain_genai = module_available("langchain_google_genai")
+    if not has_langchain_genai:
         langchain_deps.append("langchain-google-genai")
     
     vector_store_available = False
-    try:
-        from langchain_chroma import Chroma
+    if module_available("langchain_chroma"):
         vector_store_available = "chroma"
-    except (ImportError, Exception):
-        try:
-            from langchain_community.vectorstores import FAISS
-            vector_store_available = "faiss"
-        except (ImportError, Exception):
-            if not any(x in langchain_deps for x in ["langchain-chroma", "faiss-cpu"]):
-                langchain_deps.append("langchain-chroma or faiss-cpu")
-    
-    if langchain_deps:
-        print("Warning: Some LangChain dependencies may be missing or incompatible:", ", ".join(langchain_deps), file=sys.stderr)
-        print("The script will attempt to run with limited functionality.", file=sys.stderr)
+    elif module_available("faiss") and module_available("langchain_community"):
+        vector_store_available = "faiss"
+    else:
+        langchain_deps.append("langchain-chroma or faiss-cpu")
     
     return {
         'has_genai': has_genai,
         'has_langchain': has_langchain,
         'has_langchain_genai': has_langchain_genai,
-        'vector_store_available': vector_store_available
+        'vector_store_available': vector_store_available,
+        'missing_langchain_deps': langchain_deps
     }
 
 # Function to validate PDF file and extract page count
 def validate_pdf(pdf_path):
     """Validate a PDF file and return basic info about it."""
     try:
-        from pypdf import PdfReader
-        reader = PdfReader(pdf_path)
+        reader = lazy_import("pypdf").PdfReader(pdf_path)
         return {
             "valid": True,
             "page_count": len(reader.pages),
@@ -132,113 +178,104 @@ def validate_pdf(pdf_path):
             "error": str(e)
         }
 
-# Optimized PDF text extraction function
-def extract_text_from_pdf(pdf_path, max_pages=None):
-    """Extract text from PDF with improved performance and memory usage."""
-    try:
-        from pypdf import PdfReader
-        start_time = time.time()
-        
-        # Get PDF info
-        reader = PdfReader(pdf_path)
-        total_pages = len(reader.pages)
-        
-        # Limit pages if specified
-        if max_pages and max_pages < total_pages:
-            process_pages = max_pages
-            print(f"Processing only first {max_pages} of {total_pages} pages", file=sys.stderr)
-        else:
-            process_pages = total_pages
-            
-        # Define a worker function for parallel processing
-        def extract_text_from_page(page_info):
-            page_num, reader_path = page_info
-            try:
-                # We need to create a new reader for each process to avoid sharing resources
-                local_reader = PdfReader(reader_path)
-                page = local_reader.pages[page_num]
-                text = page.extract_text()
-                return page_num, text if text and text.strip() else ""
-            except Exception as e:
-                print(f"Warning: Could not extract text from page {page_num+1}: {e}", file=sys.stderr)
-                return page_num, ""
-        
+def iter_pdf_pages(pdf_path, max_pages=None, stats=None, ocr=None, layout=False):
+    """Yield (page_number, text) for each non-empty page, in order, as soon as it is extracted.
+    
+    stats, if given, is filled with total_pages and processed_pages. ocr (a pdf_ocr.OcrStage),
+    if given, replaces the text of empty or unreadable pages with OCR output. With layout,
+    pages are rebuilt from headings, paragraphs, TSV tables and captions (see pdf_layout).
+    """
+    start_time = time.time()
+    
+    # Get PDF info
+    reader = lazy_import("pypdf").PdfReader(pdf_path)
+    total_pages = len(reader.pages)
+    
+    # Limit pages if specified
+    if max_pages and max_pages < total_pages:
+        process_pages = max_pages
+        print(f"Processing only first {max_pages} of {total_pages} pages", file=sys.stderr)
+    else:
+        process_pages = total_pages
+    if stats is not None:
+        stats.update(total_pages=total_pages, processed_pages=process_pages)
+    
+    def extracted():
+        """(page_index, text) for every page, empty ones included."""
         # Determine if we should use multiprocessing
         # For small documents, sequential processing may be faster due to overhead
-        use_parallel = process_pages > 10 and multiprocessing.cpu_count() > 1
+        workers = choose_worker_count(process_pages)
+        next_page = 0
         
-        if use_parallel:
-            # Prepare the arguments for parallel processing
+        if workers > 1:
             try:
-                print(f"Using parallel processing with {min(multiprocessing.cpu_count(), 4)} workers", file=sys.stderr)
-                page_args = [(i, pdf_path) for i in range(process_pages)]
-                
-                # Use a smaller chunk size for more even distribution of work
-                chunk_size = max(1, process_pages // (multiprocessing.cpu_count() * 4))
-                
-                # Create a pool with a reasonable number of processes
-                with multiprocessing.Pool(processes=min(multiprocessing.cpu_count(), 4)) as pool:
-                    # Process pages in parallel and collect results
-                    results = list(pool.imap_unordered(extract_text_from_page, page_args, chunk_size))
-                
-                # Sort results by page number to maintain document order
-                results.sort(key=lambda x: x[0])
-                all_text = [text for _, text in results if text]
-                
-                print(f"Processed {len(results)} pages in parallel", file=sys.stderr)
+                print(f"Using parallel processing with {workers} workers", file=sys.stderr)
+                for page_num, text in iter_pages_parallel(pdf_path, process_pages, workers, layout=layout):
+                    next_page = page_num + 1
+                    yield page_num, text
+                print(f"Processed {process_pages} pages in parallel", file=sys.stderr)
             except Exception as mp_error:
                 print(f"Parallel processing failed: {mp_error}. Falling back to sequential processing.", file=sys.stderr)
-                use_parallel = False
         
         # Sequential processing (fallback or default for small documents)
-        if not use_parallel:
+        if next_page < process_pages:
             print("Using sequential processing", file=sys.stderr)
-            # Process pages in smaller batches to avoid memory issues
-            batch_size = 10
-            all_text = []
-            
-            for batch_start in range(0, process_pages, batch_size):
-                batch_end = min(batch_start + batch_size, process_pages)
-                batch_text = []
-                
-                for i in range(batch_start, batch_end):
-                    if i % 10 == 0:
-                        print(f"Extracting text from page {i+1}/{process_pages}...", file=sys.stderr)
-                    try:
-                        page = reader.pages[i]
-                        text = page.extract_text()
-                        if text and text.strip():
-                            batch_text.append(text)
-                    except Exception as e:
-                        print(f"Warning: Could not extract text from page {i+1}: {e}", file=sys.stderr)
-                
-                # Join text from this batch
-                all_text.extend(batch_text)
-                
-                # Report progress
-                print(f"Processed pages {batch_start+1}-{batch_end} ({batch_end}/{process_pages})", file=sys.stderr)
+            for i in range(next_page, process_pages):
+                if i % 10 == 0:
+                    print(f"Extracting text from page {i+1}/{process_pages}...", file=sys.stderr)
+                try:
+                    if layout:
+                        text = layout_page_text(reader.pages[i], i + 1)
+                    else:
+                        text = reader.pages[i].extract_text()
+                except Exception as e:
+                    print(f"Warning: Could not extract text from page {i+1}: {e}", file=sys.stderr)
+                    text = ""
+                yield i, text or ""
+    
+    pages = extracted()
+    if ocr:
+        pages = ocr.apply(pdf_path, reader, pages)
+    for i, text in pages:
+        if text and text.strip():
+            yield i + 1, text
+    
+    print(f"PDF text extraction completed in {time.time() - start_time:.2f} seconds", file=sys.stderr)
+
+def extractor_version(ocr=None, layout=False):
+    """Version tag of the extracted text, used in extraction and summary cache keys."""
+    version = f"{EXTRACTOR_VERSION}+{LAYOUT_VERSION}" if layout else EXTRACTOR_VERSION
+    return f"{version}+{OCR_VERSION}" if ocr else version
+
+# Optimized PDF text extraction function
+def extract_text_from_pdf(pdf_path, max_pages=None, ocr=None, layout=False):
+    """Extract text from PDF with improved performance and memory usage."""
+    try:
+        start_time = time.time()
+        stats = {}
+        all_pages = list(iter_pdf_pages(pdf_path, max_pages, stats, ocr, layout))
         
         # Join all text with double newlines
-        result = "\n\n".join(all_text)
+        result = "\n\n".join(text for _, text in all_pages)
         
         elapsed = time.time() - start_time
-        print(f"PDF text extraction completed in {elapsed:.2f} seconds", file=sys.stderr)
-        print(f"Extracted {len(result)} characters from {process_pages} pages", file=sys.stderr)
+        print(f"Extracted {len(result)} characters from {stats['processed_pages']} pages", file=sys.stderr)
         
         # Check if we actually extracted content
         if not result.strip():
             print("WARNING: No text content extracted from PDF.", file=sys.stderr)
             return {
                 "success": False,
-                "error": "No text content could be extracted from the PDF.",
+                "error": "No text content could be extracted from the PDF." + ("" if ocr else OCR_HINT),
                 "error_type": "EmptyContent"
             }
         
         return {
             "success": True,
             "text": result,
-            "total_pages": total_pages,
-            "processed_pages": process_pages,
+            "pages": all_pages,
+            "total_pages": stats["total_pages"],
+            "processed_pages": stats["processed_pages"],
             "elapsed_time": elapsed
         }
     except Exception as e:
@@ -253,13 +290,42 @@ def extract_text_from_pdf(pdf_path, max_pages=None):
 # Check dependencies first
 dependencies = check_dependencies()
 
-def direct_summary_with_genai(pdf_path, summary_length="standard", focus_areas=None, max_pages=None):
-    """Generate a summary directly from a PDF file using Google GenerativeAI."""
+def check_pdf(pdf_path, max_pages=None):
+    """Validate a PDF; returns the page limit to extract with (None for all) or an error string."""
+    # Validate the PDF first
+    print("Validating PDF file...", file=sys.stderr)
+    pdf_info = validate_pdf(pdf_path)
+    if not pdf_info["valid"]:
+        return f"Error: Invalid PDF file - {pdf_info['error']}"
+    
+    print(f"PDF validation successful. Document has {pdf_info['page_count']} pages.", file=sys.stderr)
+    
+    if pdf_info["is_encrypted"]:
+        return "Error: Cannot process encrypted PDF files"
+    
+    # Apply page limit if specified
+    effective_max_pages = max_pages
+    if effective_max_pages is None and pdf_info["page_count"] > 50:
+        effective_max_pages = 50
+        print(f"PDF has {pdf_info['page_count']} pages, limiting to first {effective_max_pages} pages for performance", file=sys.stderr)
+    return effective_max_pages
+
+def direct_summary_with_genai(pdf_path, summary_length="standard", focus_areas=None, max_pages=None,
+                              max_concurrency=DEFAULT_MAP_CONCURRENCY, max_qps=DEFAULT_MAP_QPS,
+                              extraction_cache=None, summary_cache=None, queue_depth=None, job=None, ocr=None,
+                              layout=False):
+    """Generate a summary directly from a PDF file using Google GenerativeAI.
+    
+    job (a JobControl) bounds the whole summary; by default it gets DEFAULT_JOB_TIMEOUT.
+    ocr (a pdf_ocr.OcrStage) recognizes the text of image-only pages; layout extracts
+    structured blocks so chunks follow sections and tables are condensed.
+    """
     start_time = time.time()
+    job = job or JobControl(DEFAULT_JOB_TIMEOUT)
     try:
         # Import required packages inside function to handle import errors gracefully
         try:
-            import google.generativeai as genai
+            genai = lazy_import("google.generativeai")
         except ImportError as e:
             print(f"Error importing necessary packages: {e}", file=sys.stderr)
             return f"Error: Missing dependencies - {e}"
@@ -285,112 +351,81 @@ def direct_summary_with_genai(pdf_path, summary_length="standard", focus_areas=N
         
         # Configure the API with explicit error handling
         try:
-            genai.configure(api_key=api_key)
+            model_registry.configure(genai, api_key)
         except Exception as config_error:
             print(f"ERROR: Failed to configure Google API: {config_error}", file=sys.stderr)
             return f"Error: Failed to configure Google API - {str(config_error)}"
         
-        # Validate the PDF first
-        print("Validating PDF file...", file=sys.stderr)
-        pdf_info = validate_pdf(pdf_path)
-        if not pdf_info["valid"]:
-            return f"Error: Invalid PDF file - {pdf_info['error']}"
-        
-        print(f"PDF validation successful. Document has {pdf_info['page_count']} pages.", file=sys.stderr)
-        
-        if pdf_info["is_encrypted"]:
-            return "Error: Cannot process encrypted PDF files"
-        
-        # Apply page limit if specified
-        effective_max_pages = max_pages
-        if effective_max_pages is None and pdf_info["page_count"] > 50:
-            effective_max_pages = 50
-            print(f"PDF has {pdf_info['page_count']} pages, limiting to first {effective_max_pages} pages for performance", file=sys.stderr)
-            
-        # Extract text from PDF with better memory management
-        print(f"Extracting text from PDF (max pages: {effective_max_pages})...", file=sys.stderr)
-        extraction_result = extract_text_from_pdf(pdf_path, effective_max_pages)
-        if not extraction_result["success"]:
-            return f"Error: Failed to extract text from PDF - {extraction_result['error']}"
+        # An identical earlier request is answered from the summary cache
+        doc_hash = file_sha256(pdf_path)
+        model_name = summary_model_name()
+        request_key = final_key(doc_hash, max_pages, summary_length, focus_areas, model_name,
+                                extractor_version(ocr, layout))
+        cached_summary = summary_cache.get(request_key) if summary_cache else None
+        if cached_summary:
+            print("Using cached summary for this document and request", file=sys.stderr)
+            print_summary_markers(cached_summary)
+            return cached_summary
         
-        text = extraction_result["text"]
+        # Pages flow through the chunker into the summarizer as they are extracted, so memory is
+        # bounded by the chunks in flight rather than by the document size. Repeat summaries of
+        # the same file read its cached text without opening it with pypdf.
+        stats = extraction_cache.info(doc_hash, max_pages) if extraction_cache else None
+        if stats:
+            print(f"Using cached text of {stats['processed_pages']} pages", file=sys.stderr)
+            pages = extraction_cache.iter_pages(doc_hash, max_pages)
+        else:
+            effective_max_pages = check_pdf(pdf_path, max_pages)
+            if isinstance(effective_max_pages, str):
+                return effective_max_pages
+            print(f"Extracting text from PDF (max pages: {effective_max_pages})...", file=sys.stderr)
+            stats = {}
+            pages = iter_pdf_pages(pdf_path, effective_max_pages, stats, ocr, layout)
+            if extraction_cache:
+                pages = extraction_cache.record(doc_hash, max_pages, pages, stats)
         
-        if not text.strip():
-            return "Error: Could not extract text from the PDF. The document may be scanned or secured."
-            
-        # Log time taken for PDF extraction
-        extraction_time = time.time() - start_time
-        print(f"PDF extraction completed in {extraction_time:.2f} seconds", file=sys.stderr)
-        print(f"Extracted {len(text)} characters from {extraction_result['processed_pages']} pages", file=sys.stderr)
+        # Token-budgeted chunks that break at headings, paragraphs or sentences
+        chunks = iter_chunks(pages, MAX_CHUNK_TOKENS)
+        run_stats = {}  # skipped chunks and unmerged reduce batches, filled in by the map and reduce phases
+        first_chunk = next(chunks, None)
+        if first_chunk is None or not first_chunk["text"].strip():
+            return "Error: Could not extract text from the PDF. The document may be scanned or secured." + (
+                "" if ocr else OCR_HINT)
+        second_chunk = next(chunks, None)
         
-        # Handle large documents by splitting into chunks if needed
-        max_chunk_size = MAX_TEXT_LENGTH
-        if len(text) > max_chunk_size:
-            print(f"Document is large ({len(text)} chars). Processing in chunks...", file=sys.stderr)
-            
-            # Split into roughly equal chunks, trying to break at paragraph boundaries
-            chunks = []
-            # Find paragraph or sentence boundaries
-            boundaries = [m.start() for m in re.finditer(r'\n\s*\n|\.\s+[A-Z]', text)]
-            
-            if not boundaries:
-                # If no good boundaries found, just split by character count
-                boundaries = list(range(0, len(text), max_chunk_size))
-            
-            # Create chunks
-            current_pos = 0
-            for next_boundary in boundaries:
-                if next_boundary - current_pos >= max_chunk_size:
-                    # Find a good place to break (prefer paragraph breaks)
-                    break_pos = text.rfind('\n\n', current_pos, current_pos + max_chunk_size)
-                    if break_pos == -1:
-                        # Try to break at a sentence boundary
-                        break_pos = text.rfind('. ', current_pos, current_pos + max_chunk_size)
-                        if break_pos == -1:
-                            # Last resort: just break at the maximum length
-                            break_pos = current_pos + max_chunk_size
-                    
-                    # Add a small overlap to ensure context continuity
-                    chunks.append(text[current_pos:break_pos + 2])
-                    current_pos = break_pos
-                    
-            # Add the last chunk
-            if current_pos < len(text):
-                chunks.append(text[current_pos:])
-                
-            print(f"Split document into {len(chunks)} chunks for processing", file=sys.stderr)
+        # Handle large documents by summarizing chunks while later pages are still extracted
+        if second_chunk is not None:
+            print("Document is large. Processing in chunks as pages are extracted...", file=sys.stderr)
             
-            # Process each chunk and aggregate results
-            partial_summaries = []
-            for i, chunk in enumerate(chunks):
-                print(f"Processing chunk {i+1}/{len(chunks)} ({len(chunk)} chars)...", file=sys.stderr)
-                
-                # Create a partial summary for this chunk
-                chunk_summary = summarize_chunk(chunk, genai, summary_length, focus_areas, i+1, len(chunks))
-                
-                if chunk_summary.startswith("Error:"):
-                    print(f"Error processing chunk {i+1}: {chunk_summary}", file=sys.stderr)
-                    # If it's the first chunk and fails, that's a problem
-                    if i == 0:
-                        return chunk_summary
-                    # Otherwise, try to continue with what we have
-                    continue
-                    
-                partial_summaries.append(chunk_summary)
+            # Summarize the chunks concurrently and aggregate the results in chunk order
+            try:
+                partial_summaries = summarize_chunks_parallel(
+                    itertools.chain([first_chunk, second_chunk], chunks), genai, summary_length, focus_areas,
+                    max_concurrency, max_qps, summary_cache, doc_hash, queue_depth, job.phase(MAP_PHASE_SHARE),
+                    run_stats
+                )
+            finally:
+                chunks.close()
+            if isinstance(partial_summaries, str):
+                return partial_summaries
                 
             if not partial_summaries:
                 return "Error: Failed to generate any summaries from the document chunks"
                 
             # If we have only one partial summary, just return it
             if len(partial_summaries) == 1:
-                return partial_summaries[0]
-                
-            # Otherwise, we need to create a combined summary
-            print("Generating final summary from partial summaries...", file=sys.stderr)
-            combined_text = "\n\n".join(partial_summaries)
-            return generate_final_summary(combined_text, genai, summary_length, focus_areas)
+                summary = partial_summaries[0]
+            else:
+                # Otherwise, we need to create a combined summary
+                print("Generating final summary from partial summaries...", file=sys.stderr)
+                summary = tree_reduce_summaries(partial_summaries, genai, summary_length, focus_areas,
+                                                max_concurrency, max_qps, job=job, stats=run_stats)
         else:
             # Document is small enough to process in one go
+            text = first_chunk["text"]
+            print(f"PDF extraction completed in {time.time() - start_time:.2f} seconds", file=sys.stderr)
+            print(f"Extracted {len(text)} characters from {stats['processed_pages']} pages", file=sys.stderr)
+            
             # Define newline character first
             newline = '\n'
             
@@ -435,23 +470,150 @@ def direct_summary_with_genai(pdf_path, summary_length="standard", focus_areas=N
             SUMMARY:
             """
             
-            return generate_summary_with_model(prompt, genai)
+            summary = generate_summary_with_model(prompt, genai, job=job)
+        
+        # A summary that is missing chunks or was cut short must not be served later as the full one
+        incomplete = job.reason() or run_stats.get("skipped_chunks") or run_stats.get("unmerged_batches")
+        if summary_cache and incomplete and not summary.startswith("Error:"):
+            print(f"Not caching the summary: incomplete ({run_stats.get('skipped_chunks', 0)} chunks skipped, "
+                  f"{run_stats.get('unmerged_batches', 0)} batches unmerged, job {job.reason() or 'finished'})",
+                  file=sys.stderr)
+        elif summary_cache and not summary.startswith("Error:"):
+            # Keyed by the model that actually answered, which may be a fallback
+            summary_cache.put(final_key(doc_hash, max_pages, summary_length, focus_areas, summary_model_name(),
+                                        extractor_version(ocr, layout)), summary)
+        return summary
     except Exception as e:
         error_msg = f"Error: {str(e)}"
         print(f"ERROR: {error_msg}", file=sys.stderr)
         traceback.print_exc(file=sys.stderr)
         return error_msg
 
-def summarize_chunk(text_chunk, genai, summary_length="standard", focus_areas=None, chunk_num=1, total_chunks=1):
+# One set of Gemini model handles (and API connections) shared by every call in the process
+model_registry = ModelRegistry(MODEL_OPTIONS, DEFAULT_MODEL_STATE_PATH)
+
+def summary_model_name():
+    """Model summaries are generated with, used in summary cache keys."""
+    return model_registry.model_name()
+
+def summarize_chunks_parallel(chunks, genai, summary_length="standard", focus_areas=None,
+                              max_concurrency=DEFAULT_MAP_CONCURRENCY, max_qps=DEFAULT_MAP_QPS,
+                              summary_cache=None, doc_hash=None, queue_depth=None, job=None, stats=None):
+    """Map phase: summarize text_chunker chunks on a bounded thread pool under a QPS limit.
+    
+    chunks may be a list or a lazy iterator (e.g. iter_chunks over pages still being
+    extracted); at most queue_depth chunks (default: twice max_concurrency) are taken
+    from it before earlier ones finish, which bounds memory. Returns the successful
+    partial summaries in chunk order, or the error string if the first chunk fails
+    (no further chunks are taken and pending ones are cancelled). Failures of later
+    chunks are logged and skipped, as in the serial loop this replaces. With a
+    summary_cache, chunks summarized before (for any summary length) are reused.
+    
+    With a job (JobControl), no chunk is started once it is cancelled or past its
+    deadline: the chunks summarized by then are returned, or an error string if it
+    stopped before the first chunk was started. A failing first chunk
+    cancels the job, so chunk calls still in flight stop retrying. A stats dict gets
+    skipped_chunks: chunks that failed or were never started, so the caller can tell a
+    partial result from a complete one.
+    """
+    budget = RequestBudget(max_qps)
+    total = len(chunks) if hasattr(chunks, "__len__") else None
+    slots = threading.BoundedSemaphore(queue_depth or 2 * max(1, max_concurrency))
+    
+    def run(index, chunk):
+        position = f"{index+1}/{total}" if total else str(index + 1)
+        key = chunk_key(doc_hash, chunk["text"], summary_model_name(), focus_areas) if summary_cache else None
+        cached = summary_cache.get(key) if key else None
+        if cached:
+            return cached, 0.0, True
+        if job and job.reason():
+            return f"Error: Chunk {position} skipped - summarization {job.reason()}", 0.0, False
+        budget.acquire(estimate_tokens(chunk["text"]))
+        page_range = (f"{chunk['start_page']}-{chunk['end_page']}"
+                      if chunk["end_page"] != chunk["start_page"] else str(chunk["start_page"]))
+        print(f"Processing chunk {position} ({len(chunk['text'])} chars, pages {page_range})...",
+              file=sys.stderr)
+        chunk_start = time.time()
+        summary = summarize_chunk(chunk["text"], genai, summary_length, focus_areas, index+1, total,
+                                  emit_markers=False, page_range=page_range, job=job)
+        latency = time.time() - chunk_start
+        print(f"Chunk {position} finished in {latency:.2f} seconds", file=sys.stderr)
+        if summary_cache and not summary.startswith("Error:"):
+            summary_cache.put(chunk_key(doc_hash, chunk["text"], summary_model_name(), focus_areas), summary)
+        return summary, latency, False
+    
+    def first_chunk_failed(futures):
+        return futures and futures[0].done() and futures[0].result()[0].startswith("Error:")
+    
+    map_start = time.time()
+    executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency))
+    stopped = False
+    try:
+        futures = []
+        for index, chunk in enumerate(chunks):
+            slots.acquire()
+            if first_chunk_failed(futures):
+                slots.release()
+                break
+            if job and job.reason():
+                slots.release()
+                stopped = True
+                print(f"Map phase stopped ({job.reason()}) after {len(futures)} chunks", file=sys.stderr)
+                break
+            future = executor.submit(run, index, chunk)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+        
+        partial_summaries, latencies, reused = [], [], 0
+        for i, future in enumerate(futures):
+            chunk_summary, latency, cached = future.result()
+            latencies.append(latency)
+            reused += cached
+            if chunk_summary.startswith("Error:"):
+                print(f"Error processing chunk {i+1}: {chunk_summary}", file=sys.stderr)
+                # If it's the first chunk and fails, that's a problem
+                if i == 0:
+                    if job:
+                        job.cancel("first chunk failed")
+                    for pending in futures:
+                        pending.cancel()
+                    return chunk_summary
+                # Otherwise, try to continue with what we have
+                continue
+            partial_summaries.append(chunk_summary)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    if not futures and stopped:
+        return f"Error: Summarization {job.reason()} before any chunk was started"
+    if stats is not None:
+        # Chunks left in the stream after a stop count once: their number is unknown
+        stats["skipped_chunks"] = len(futures) - len(partial_summaries) + stopped
+    
+    # Chunk summaries are printed after the map phase so concurrent output never interleaves
+    for summary in partial_summaries:
+        print_summary_markers(summary)
+    map_time = time.time() - map_start
+    print(f"Map phase: {len(futures)} chunks in {map_time:.2f} seconds (sum of chunk latencies "
+          f"{sum(latencies):.2f} seconds, slowest {max(latencies, default=0.0):.2f} seconds, {reused} from cache)",
+          file=sys.stderr)
+    return partial_summaries
+
+def summarize_chunk(text_chunk, genai, summary_length="standard", focus_areas=None, chunk_num=1, total_chunks=1,
+                    emit_markers=True, page_range=None, job=None):
     """Generate a summary for a single chunk of text."""
     # Define newline character first
     newline = '\n'
     
     # Create prompt for this chunk
-    chunk_specific = f"This is part {chunk_num} of {total_chunks} from the document." if total_chunks > 1 else ""
+    # total_chunks is None while the document is still being chunked as it streams in
+    multi_chunk = total_chunks is None or total_chunks > 1
+    part = f"part {chunk_num} of {total_chunks}" if total_chunks else f"part {chunk_num}"
+    chunk_specific = f"This is {part} from the document." if multi_chunk else ""
+    if chunk_specific and page_range:
+        chunk_specific = f"This is {part} (pages {page_range}) from the document."
     
     # Determine length instructions based on the summary_length parameter and chunk context
-    if total_chunks > 1:
+    if multi_chunk:
         # For multi-chunk documents, make each chunk summary shorter
         length_guide = "Create a concise summary of this section of the document that captures the key information."
     else:
@@ -491,9 +653,9 @@ def summarize_chunk(text_chunk, genai, summary_length="standard", focus_areas=No
     SUMMARY:
     """
     
-    return generate_summary_with_model(prompt, genai)
+    return generate_summary_with_model(prompt, genai, emit_markers, job)
 
-def generate_final_summary(combined_summaries, genai, summary_length="standard", focus_areas=None):
+def generate_final_summary(combined_summaries, genai, summary_length="standard", focus_areas=None, job=None):
     """Generate a final summary from multiple partial summaries."""
     # Define newline character first
     newline = '\n'
@@ -536,50 +698,119 @@ def generate_final_summary(combined_summaries, genai, summary_length="standard",
     INTEGRATED SUMMARY:
     """
     
-    return generate_summary_with_model(prompt, genai)
+    return generate_summary_with_model(prompt, genai, job=job)
 
-def generate_summary_with_model(prompt, genai):
-    """Generate a summary using the Google Generative AI model with error handling and retries."""
-    # Initialize the model with retry mechanism
-    max_retries = 2
-    retry_count = 0
-    last_error = None
+def print_summary_markers(summary):
+    """Print a summary between the markers the frontend parses from stdout."""
+    print("###SUMMARY_START###", file=sys.stdout)
+    print(summary, file=sys.stdout)
+    print("###SUMMARY_END###", file=sys.stdout)
+
+def batch_by_tokens(summaries, max_tokens=REDUCE_BATCH_TOKENS):
+    """Group consecutive summaries into batches of at most max_tokens (an oversized one stays alone)."""
+    batches, current, current_tokens = [], [], 0
+    for summary in summaries:
+        tokens = estimate_tokens(summary)
+        if current and current_tokens + tokens > max_tokens:
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(summary)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def reduce_summary_batch(summaries, genai, focus_areas=None, job=None):
+    """Merge a batch of consecutive partial summaries into one intermediate summary."""
+    focus_instruction = ""
+    if focus_areas and focus_areas.strip():
+        focus_instruction = f"Pay special attention to these specific areas: {focus_areas}"
     
-    while retry_count <= max_retries:
-        try:
-            print(f"Initializing Gemini model (attempt {retry_count + 1}/{max_retries + 1})...", file=sys.stderr)
-            # Try models in order until one works
-            model_options = ['gemini-1.5-flash', 'gemini-2.5-flash', 'gemini-1.0-pro']
-            model = None
-            
-            for model_name in model_options:
-                try:
-                    print(f"Trying model: {model_name}", file=sys.stderr)
-                    model = genai.GenerativeModel(model_name)
-                    print(f"Successfully initialized {model_name}", file=sys.stderr)
-                    break
-                except Exception as model_init_error:
-                    print(f"Failed to initialize {model_name}: {model_init_error}", file=sys.stderr)
-                    if model_name == model_options[-1]:  # If this was the last model option
-                        raise model_init_error
-                        
-            if model is None:
-                raise ValueError("Failed to initialize any Gemini model")
+    combined_summaries = "\n\n".join(summaries)
+    prompt = f"""
+    You are an expert document analyst and summarizer. The following text consists of summaries of
+    consecutive parts of a longer document.
+    
+    Merge them into one concise summary of this part of the document. Keep the key points, main
+    arguments, significant evidence or data and any conclusions, in document order. Remove repetition.
+    
+    {focus_instruction}
+    
+    Do not include phrases like "According to the summaries" or "The document discusses".
+    
+    PARTIAL SUMMARIES:
+    {combined_summaries}
+    
+    MERGED SUMMARY:
+    """
+    
+    return generate_summary_with_model(prompt, genai, emit_markers=False, job=job)
+
+def tree_reduce_summaries(partial_summaries, genai, summary_length="standard", focus_areas=None,
+                          max_concurrency=DEFAULT_MAP_CONCURRENCY, max_qps=DEFAULT_MAP_QPS,
+                          batch_tokens=REDUCE_BATCH_TOKENS, job=None, stats=None):
+    """Reduce partial summaries level by level until they fit one final summary call.
+    
+    Each level groups consecutive summaries into token-budgeted batches and merges the
+    batches in parallel, so every call stays bounded in size and the number of levels
+    grows logarithmically with the document. The last level goes through
+    generate_final_summary. Once the job is cancelled or out of time no further
+    level is started. A stats dict gets unmerged_batches: batches passed on unmerged
+    because their merge failed or the job stopped.
+    """
+    level = list(partial_summaries)
+    depth = 0
+    budget = RequestBudget(max_qps)
+    unmerged = []
+    
+    def run(batch):
+        if len(batch) == 1:
+            return batch[0]
+        if job and job.reason():
+            unmerged.append(len(batch))
+            return "\n\n".join(batch)
+        budget.acquire(sum(estimate_tokens(summary) for summary in batch))
+        merged = reduce_summary_batch(batch, genai, focus_areas, job)
+        if merged.startswith("Error:"):
+            # Keep the inputs rather than lose that part of the document
+            print(f"Warning: Could not merge {len(batch)} summaries: {merged}", file=sys.stderr)
+            unmerged.append(len(batch))
+            return "\n\n".join(batch)
+        return merged
+    
+    while len(level) > 1 and sum(estimate_tokens(summary) for summary in level) > batch_tokens:
+        if job and job.reason():
             break
-        except Exception as model_error:
-            last_error = model_error
-            retry_count += 1
-            print(f"ERROR: Failed to initialize Gemini model (attempt {retry_count}/{max_retries + 1}): {model_error}", file=sys.stderr)
-            if retry_count <= max_retries:
-                print(f"Retrying in 2 seconds...", file=sys.stderr)
-                time.sleep(2)
-            else:
-                print(f"ERROR: Max retries exceeded for model initialization", file=sys.stderr)
-                return f"Error: Failed to initialize Gemini model after {max_retries + 1} attempts - {str(last_error)}"
+        batches = batch_by_tokens(level, batch_tokens)
+        if len(batches) == len(level):
+            # Every summary already fills a batch on its own; merging cannot shrink the level
+            break
+        depth += 1
+        level_start = time.time()
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(batches)))) as executor:
+            level = list(executor.map(run, batches))
+        print(f"Reduce level {depth}: {sum(len(batch) for batch in batches)} summaries merged into "
+              f"{len(level)} in {time.time() - level_start:.2f} seconds", file=sys.stderr)
+    
+    if stats is not None:
+        stats["unmerged_batches"] = len(unmerged)
+    return generate_final_summary("\n\n".join(level), genai, summary_length, focus_areas, job)
+
+def generate_summary_with_model(prompt, genai, emit_markers=True, job=None):
+    """Generate a summary using the Google Generative AI model with error handling and retries.
+    
+    The model is taken from model_registry, which resolves the fallback list once and
+    reuses the same handle (and connection) for every call. Every request is sent with
+    a timeout, capped by the time the job (a JobControl) has left; a cancelled or
+    expired job returns an error instead of starting or retrying a request.
+    """
+    max_retries = 2
+    last_error = None
     
     # Generate response with retry mechanism
     retry_count = 0
-    api_timeout = DEFAULT_API_TIMEOUT
+    api_timeout = job.request_timeout if job and job.request_timeout else DEFAULT_API_TIMEOUT
+    max_api_timeout = max(api_timeout, MAX_API_TIMEOUT)
     
     print(f"Starting summary generation...", file=sys.stderr)
     start_time = time.time()
@@ -587,7 +818,8 @@ def generate_summary_with_model(prompt, genai):
     while retry_count <= max_retries:
         try:
             print(f"Generating summary using Gemini (attempt {retry_count + 1}/{max_retries + 1})...", file=sys.stderr)
-            print(f"Using timeout of {api_timeout} seconds", file=sys.stderr)
+            request_timeout = job.call_timeout(api_timeout) if job else api_timeout
+            print(f"Using timeout of {request_timeout:.0f} seconds", file=sys.stderr)
             
             generation_start = time.time()
             
@@ -601,10 +833,8 @@ def generate_summary_with_model(prompt, genai):
             
             # Generate response (with timeout handling)
             try:
-                response = model.generate_content(
-                    prompt,
-                    generation_config=generation_config
-                )
+                response, model_name = model_registry.generate(genai, prompt, generation_config=generation_config,
+                                                               request_options={"timeout": request_timeout})
                 
                 generation_time = time.time() - generation_start
                 print(f"Summary generated in {generation_time:.2f} seconds", file=sys.stderr)
@@ -620,16 +850,15 @@ def generate_summary_with_model(prompt, genai):
                     print("ERROR: Empty summary returned", file=sys.stderr)
                     raise ValueError("Empty summary returned")
                 
-                print(f"Generated summary with {len(summary)} characters", file=sys.stderr)
+                print(f"Generated summary with {len(summary)} characters using {model_name}", file=sys.stderr)
                 
                 # Calculate and log total process time
                 total_time = time.time() - start_time
                 print(f"Total processing time: {total_time:.2f} seconds", file=sys.stderr)
                 
                 # Return the summary with success indicators
-                print("###SUMMARY_START###", file=sys.stdout)
-                print(summary, file=sys.stdout)
-                print("###SUMMARY_END###", file=sys.stdout)
+                if emit_markers:
+                    print_summary_markers(summary)
                 
                 return summary
                 
@@ -639,6 +868,9 @@ def generate_summary_with_model(prompt, genai):
                     return f"Error: Google API quota or rate limit exceeded - {str(api_error)}"
                 raise api_error
                 
+        except JobCancelled as cancelled:
+            print(f"ERROR: Summary generation stopped - summarization {cancelled}", file=sys.stderr)
+            return f"Error: Summary generation stopped - summarization {cancelled}"
         except Exception as gen_error:
             last_error = gen_error
             retry_count += 1
@@ -647,47 +879,68 @@ def generate_summary_with_model(prompt, genai):
             if retry_count <= max_retries:
                 wait_time = 2 * retry_count  # Exponential backoff
                 print(f"Retrying in {wait_time} seconds...", file=sys.stderr)
-                time.sleep(wait_time)
+                try:
+                    if job:
+                        job.sleep(wait_time)
+                    else:
+                        time.sleep(wait_time)
+                except JobCancelled as cancelled:
+                    print(f"ERROR: Retry abandoned - summarization {cancelled}", file=sys.stderr)
+                    return f"Error: Summary generation stopped - summarization {cancelled}"
                 
                 # Increase timeout for retry
-                api_timeout = min(api_timeout * 1.5, MAX_API_TIMEOUT)
+                api_timeout = min(api_timeout * 1.5, max_api_timeout)
             else:
                 print(f"ERROR: Max retries exceeded for summary generation", file=sys.stderr)
                 return f"Error: Failed to generate summary after {max_retries + 1} attempts - {str(last_error)}"
 
-# Now conditionally import LangChain components based on availability
-if dependencies['has_langchain_genai']:
+# LangChain components, bound by load_langchain() the first time the LangChain path runs
+ChatGoogleGenerativeAI = GoogleGenerativeAIEmbeddings = ChatPromptTemplate = None
+create_stuff_documents_chain = create_retrieval_chain = None
+vector_store_type = None
+_langchain_loaded = None
+
+def load_langchain():
+    """Import the LangChain and vector store stack once; returns whether it is usable."""
+    global ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings, ChatPromptTemplate
+    global create_stuff_documents_chain, create_retrieval_chain, vector_store_type, _langchain_loaded
+    if _langchain_loaded is not None:
+        return _langchain_loaded
+    _langchain_loaded = False
+    if not dependencies['has_langchain_genai']:
+        return False
+    if dependencies['missing_langchain_deps']:
+        print("Warning: Some LangChain dependencies may be missing or incompatible:",
+              ", ".join(dependencies['missing_langchain_deps']), file=sys.stderr)
+        print("The script will attempt to run with limited functionality.", file=sys.stderr)
     try:
         # Import LangChain components with careful error handling
-        from langchain_community.document_loaders import PyPDFLoader
-        from langchain.text_splitter import RecursiveCharacterTextSplitter
-        from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-        from langchain.prompts import ChatPromptTemplate
-        from langchain.chains.combine_documents import create_stuff_documents_chain
-        from langchain.chains import create_retrieval_chain
+        langchain_genai = lazy_import("langchain_google_genai")
+        ChatGoogleGenerativeAI = langchain_genai.ChatGoogleGenerativeAI
+        GoogleGenerativeAIEmbeddings = langchain_genai.GoogleGenerativeAIEmbeddings
+        ChatPromptTemplate = lazy_import("langchain.prompts").ChatPromptTemplate
+        create_stuff_documents_chain = lazy_import("langchain.chains.combine_documents").create_stuff_documents_chain
+        create_retrieval_chain = lazy_import("langchain.chains").create_retrieval_chain
         
         # Set a global variable for vector store type based on what's available
-        vector_store_type = dependencies['vector_store_available']
+        vector_store_type = dependencies['vector_store_available'] or None
         if vector_store_type == 'chroma':
-            from langchain_chroma import Chroma
+            lazy_import("langchain_chroma")
         elif vector_store_type == 'faiss':
-            from langchain_community.vectorstores import FAISS
-        else:
-            vector_store_type = None
+            lazy_import("langchain_community.vectorstores")
     except Exception as import_error:
         print(f"WARNING: Failed to import LangChain components: {import_error}", file=sys.stderr)
         dependencies['has_langchain_genai'] = False
         vector_store_type = None
-else:
-    vector_store_type = None
+        return False
+    _langchain_loaded = True
+    return True
 
 def load_pdf(pdf_path: str) -> List[Dict]:
     """Load PDF document and return list of page contents."""
     try:
-        from pypdf import PdfReader
-        
         print(f"Loading PDF file: {pdf_path}", file=sys.stderr)
-        reader = PdfReader(pdf_path)
+        reader = lazy_import("pypdf").PdfReader(pdf_path)
         documents = []
         
         for i, page in enumerate(reader.pages):
@@ -714,32 +967,24 @@ def load_pdf(pdf_path: str) -> List[Dict]:
         raise
 
 def split_documents(documents: List[Dict], chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Dict]:
-    """Split documents into chunks for processing without relying on LangChain."""
+    """Split page documents into chunks for processing without relying on LangChain.
+    
+    chunk_size and chunk_overlap are in characters; chunks may span pages and record
+    the page range they cover.
+    """
     chunks = []
+    by_source = {}
     for doc in documents:
-        text = doc["page_content"]
-        metadata = doc["metadata"]
-        
-        # Simple chunk splitting - could be improved
-        start = 0
-        while start < len(text):
-            end = min(start + chunk_size, len(text))
-            if end < len(text) and end - start < chunk_size:
-                # Find the last period or newline to make a more natural break
-                last_period = text.rfind(".", start, end)
-                last_newline = text.rfind("\n", start, end)
-                break_point = max(last_period, last_newline)
-                if break_point > start:
-                    end = break_point + 1
-            
+        by_source.setdefault(doc["metadata"].get("source"), []).append(doc)
+    
+    for source, docs in by_source.items():
+        pages = [(doc["metadata"].get("page", i + 1), doc["page_content"]) for i, doc in enumerate(docs)]
+        for chunk in chunk_pages(pages, max(1, chunk_size // 4), chunk_overlap // 4):
             chunks.append({
-                "page_content": text[start:end],
-                "metadata": metadata.copy()
+                "page_content": chunk["text"],
+                "metadata": {"source": source, "page": chunk["start_page"],
+                             "start_page": chunk["start_page"], "end_page": chunk["end_page"]}
             })
-            
-            start = end - chunk_overlap
-            if start < 0:
-                start = 0
     
     print(f"Split content into {len(chunks)} chunks.", file=sys.stderr)
     return chunks
@@ -753,10 +998,25 @@ def convert_to_langchain_docs(documents: List[Dict]) -> List:
         print(f"Error converting to LangChain documents: {e}", file=sys.stderr)
         return None
 
-def create_vectorstore(documents):
-    """Create vector store from documents for retrieval."""
+def create_vectorstore(documents, batch_size=None, max_concurrency=None, max_qps=None, index_type="flat"):
+    """Create vector store from documents for retrieval.
+    
+    Chunks are embedded in parallel batches with rate-limit backoff instead of one big request.
+    index_type selects the FAISS index (flat, float16, ivf, hnsw, pq) when FAISS is used.
+    Batching defaults come from the embedding pipeline.
+    """
     try:
-        embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+        if not load_langchain():
+            raise ImportError("LangChain Google GenAI integration is not available")
+        # The embedding pipeline imports LangChain, so only the LangChain path loads it
+        from embedding_pipeline import (BatchedEmbeddings, DEFAULT_BATCH_SIZE, DEFAULT_MAX_CONCURRENCY,
+                                        DEFAULT_MAX_QPS)
+        embeddings = BatchedEmbeddings(
+            GoogleGenerativeAIEmbeddings(model="models/embedding-001"),
+            batch_size=batch_size or DEFAULT_BATCH_SIZE,
+            max_concurrency=max_concurrency or DEFAULT_MAX_CONCURRENCY,
+            max_qps=max_qps or DEFAULT_MAX_QPS
+        )
         
         # Use the appropriate vector store based on what's available
         if vector_store_type == "chroma":
@@ -764,7 +1024,11 @@ def create_vectorstore(documents):
             return Chroma.from_documents(documents, embeddings)
         elif vector_store_type == "faiss":
             from langchain_community.vectorstores import FAISS
-            return FAISS.from_documents(documents, embeddings)
+            store = FAISS.from_documents(documents, embeddings)
+            if index_type != "flat":
+                from vector_index import convert_store
+                convert_store(store, index_type)
+            return store
         else:
             # Fallback to simple list-based store
             print("No vector store available. Using simple in-memory list store.", file=sys.stderr)
@@ -859,7 +1123,7 @@ def summarize_pdf(pdf_path: str, summary_length="standard", focus_areas=None) ->
         os.environ["GOOGLE_API_KEY"] = api_key
         
         # If LangChain integration is not available, fall back to direct API usage
-        if not dependencies['has_langchain_genai']:
+        if not load_langchain():
             print("LangChain integration not available. Using direct Google Generative AI...", file=sys.stderr)
             summary = direct_summary_with_genai(pdf_path, summary_length, focus_areas)
             return summary
@@ -905,7 +1169,8 @@ def summarize_pdf(pdf_path: str, summary_length="standard", focus_areas=None) ->
             
             # Try multiple model options in case the primary one fails
             llm = None
-            model_options = ['gemini-1.5-flash', 'gemini-2.5-flash', 'gemini-1.0-pro']
+            resolved_model = summary_model_name()
+            model_options = [resolved_model] + [name for name in MODEL_OPTIONS if name != resolved_model]
             for model_name in model_options:
                 try:
                     print(f"Trying model: {model_name}", file=sys.stderr)
@@ -961,7 +1226,12 @@ def summarize_pdf(pdf_path: str, summary_length="standard", focus_areas=None) ->
         traceback.print_exc(file=sys.stderr)
         return f"Error: Failed to summarize document - {str(e)}"
 
-if __name__ == "__main__":
+def main(argv=None, job=None):
+    """Command line entry point; returns the process exit code.
+    
+    Callers that run it on another thread pass their own job (a JobControl) and cancel
+    it directly; signal handlers can only be installed from the main thread.
+    """
     parser = argparse.ArgumentParser(description='Summarize a PDF document using LangChain and Gemini')
     parser.add_argument('pdf_path', type=str, help='Path to the PDF file')
     parser.add_argument('--summary_length', type=str, choices=['brief', 'standard', 'comprehensive'], 
@@ -970,8 +1240,38 @@ if __name__ == "__main__":
                         help='Comma-separated list of areas to focus on in the summary')
     parser.add_argument('--max_pages', type=int, default=None,
                         help='Maximum number of pages to process (default: all pages)')
+    parser.add_argument('--max_concurrency', type=int, default=DEFAULT_MAP_CONCURRENCY,
+                        help=f'Chunks summarized in parallel (default: {DEFAULT_MAP_CONCURRENCY})')
+    parser.add_argument('--max_qps', type=float, default=DEFAULT_MAP_QPS,
+                        help=f'Maximum Gemini calls started per second (default: {DEFAULT_MAP_QPS})')
+    parser.add_argument('--queue_depth', type=int, default=None,
+                        help='Chunks buffered ahead of the summarizers (default: twice --max_concurrency)')
+    parser.add_argument('--extraction_cache', type=str, default=DEFAULT_EXTRACTION_CACHE_PATH,
+                        help='SQLite file caching extracted PDF text')
+    parser.add_argument('--extraction_cache_mb', type=int, default=DEFAULT_EXTRACTION_CACHE_MB,
+                        help=f'Size budget of the extraction cache (default: {DEFAULT_EXTRACTION_CACHE_MB} MB)')
+    parser.add_argument('--no_extraction_cache', action='store_true', help='Disable the extraction cache')
+    parser.add_argument('--summary_cache', type=str, default=DEFAULT_SUMMARY_CACHE_PATH,
+                        help='SQLite file caching chunk and final summaries')
+    parser.add_argument('--no_summary_cache', action='store_true', help='Disable the summary cache')
+    parser.add_argument('--extraction_mode', type=str, choices=['plain', 'layout'], default='plain',
+                        help='plain page text, or layout: headings, paragraphs, TSV tables and captions')
+    parser.add_argument('--ocr', type=str, choices=['auto', 'on', 'off'], default='auto',
+                        help='OCR pages without a usable text layer (auto: when tesseract and pdftoppm are installed)')
+    parser.add_argument('--ocr_languages', type=str, default=DEFAULT_OCR_LANGUAGES,
+                        help=f'Tesseract languages, e.g. eng+deu (default: {DEFAULT_OCR_LANGUAGES})')
+    parser.add_argument('--ocr_cache', type=str, default=DEFAULT_OCR_CACHE_PATH,
+                        help='SQLite file caching OCR text by page content')
+    parser.add_argument('--no_ocr_cache', action='store_true', help='Disable the OCR cache')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_JOB_TIMEOUT,
+                        help=f'Seconds the whole summary may take, 0 for no limit (default: {DEFAULT_JOB_TIMEOUT})')
+    parser.add_argument('--request_timeout', type=float, default=DEFAULT_API_TIMEOUT,
+                        help=f'Seconds a single Gemini request may take (default: {DEFAULT_API_TIMEOUT})')
+    parser.add_argument('--import_report', action='store_true',
+                        help='Print start-up and deferred import timings to stderr when done')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    startup_seconds, startup_modules = time.perf_counter() - _MODULE_START, len(sys.modules)
     
     # Redirect warning messages to stderr
     import warnings
@@ -980,16 +1280,28 @@ if __name__ == "__main__":
         print(message, file=sys.stderr)
     warnings.showwarning = _showwarning
     
+    # The route stops the script with SIGTERM (process timeout or client disconnect): cancel the job so
+    # in-flight chunk calls stop retrying and no new ones start; a second signal exits immediately
+    job = job or JobControl(args.timeout or None, request_timeout=args.request_timeout)
+    def _terminate(signum, frame):
+        if job.cancelled:
+            raise SystemExit(1)
+        print("Received termination signal, cancelling summarization...", file=sys.stderr)
+        job.cancel("terminated")
+    in_main_thread = threading.current_thread() is threading.main_thread()
+    if in_main_thread:
+        previous_handler = signal.signal(signal.SIGTERM, _terminate)
+    
     try:
         # Check if the PDF file exists
         if not os.path.exists(args.pdf_path):
             print(f"ERROR: PDF file not found: {args.pdf_path}", file=sys.stderr)
-            sys.exit(1)
+            return 1
         
         # Check if the file is actually a PDF
         if not args.pdf_path.lower().endswith('.pdf'):
             print(f"ERROR: File does not appear to be a PDF: {args.pdf_path}", file=sys.stderr)
-            sys.exit(1)
+            return 1
             
         # Print start time for performance tracking
         start_time = time.time()
@@ -1002,12 +1314,40 @@ if __name__ == "__main__":
             print(f"Focus areas: {args.focus_areas}", file=sys.stderr)
             
         # Always use direct_summary_with_genai for better reliability and performance
-        summary = direct_summary_with_genai(args.pdf_path, args.summary_length, args.focus_areas, args.max_pages)
+        layout = args.extraction_mode == 'layout'
+        ocr = None
+        if args.ocr != 'off':
+            if ocr_available():
+                ocr_cache = None
+                if not args.no_ocr_cache:
+                    try:
+                        ocr_cache = OcrCache(args.ocr_cache)
+                    except Exception as cache_error:
+                        print(f"Warning: OCR cache unavailable: {cache_error}", file=sys.stderr)
+                ocr = OcrStage(ocr_cache, args.ocr_languages)
+            elif args.ocr == 'on':
+                print("Warning: OCR requested but tesseract or pdftoppm was not found on PATH", file=sys.stderr)
+        extraction_cache = None
+        if not args.no_extraction_cache:
+            try:
+                extraction_cache = ExtractionCache(args.extraction_cache, args.extraction_cache_mb * 1024 * 1024,
+                                                   extractor_version(ocr, layout))
+            except Exception as cache_error:
+                print(f"Warning: Extraction cache unavailable: {cache_error}", file=sys.stderr)
+        summary_cache = None
+        if not args.no_summary_cache:
+            try:
+                summary_cache = SummaryCache(args.summary_cache)
+            except Exception as cache_error:
+                print(f"Warning: Summary cache unavailable: {cache_error}", file=sys.stderr)
+        summary = direct_summary_with_genai(args.pdf_path, args.summary_length, args.focus_areas, args.max_pages,
+                                            args.max_concurrency, args.max_qps, extraction_cache, summary_cache,
+                                            args.queue_depth, job, ocr, layout)
         
         # Check if the summary starts with "Error:"
         if summary.startswith("Error:"):
             print(f"ERROR: {summary[7:]}", file=sys.stderr)
-            sys.exit(1)
+            return 1
         
         # Print elapsed time for performance tracking
         elapsed_time = time.time() - start_time
@@ -1029,8 +1369,17 @@ if __name__ == "__main__":
             sys.stdout.flush()
             print("###SUMMARY_END###")
             sys.stdout.flush()
-        sys.exit(0)
+        return 0
     except Exception as e:
         print(f"ERROR: Failed to summarize document: {str(e)}", file=sys.stderr)
         traceback.print_exc(file=sys.stderr)
-        sys.exit(1)
+        return 1
+    finally:
+        # A warm agent server runs main() repeatedly in one process; don't leave this job's handler behind
+        if in_main_thread:
+            signal.signal(signal.SIGTERM, previous_handler or signal.SIG_DFL)
+        if args.import_report:
+            print_import_report(startup_seconds, startup_modules)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+On-disk cache of generated summaries.
+
+Map-phase chunk summaries do not depend on the requested summary length, so
+they are keyed by (document hash, chunk hash, model, focus areas): asking for a
+"brief" and then a "comprehensive" summary of the same PDF only pays for the
+reduce step the second time. Final summaries are keyed by the whole request
+(document hash, page limit, summary length, focus areas, model, extractor), so an
+identical request is answered without extraction or any Gemini call. Bump
+PROMPT_VERSION when the prompts change; the least recently used entries are
+evicted once the cache holds too many.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+
+PROMPT_VERSION = "1"
+DEFAULT_MAX_SUMMARIES = 5000
+
+
+def _key(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in (PROMPT_VERSION,) + parts:
+        digest.update(str(part if part is not None else "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _focus(focus_areas: Optional[str]) -> str:
+    return " ".join((focus_areas or "").lower().split())
+
+
+def chunk_key(doc_hash: str, chunk_text: str, model_name: str, focus_areas: Optional[str]) -> str:
+    chunk_hash = hashlib.sha256(chunk_text.encode("utf-8")).hexdigest()
+    return _key("chunk", doc_hash, chunk_hash, model_name, _focus(focus_areas))
+
+
+def final_key(doc_hash: str, max_pages: Optional[int], summary_length: str, focus_areas: Optional[str],
+              model_name: str, extractor_version: str = "") -> str:
+    return _key("final", doc_hash, max_pages or "all", summary_length, _focus(focus_areas), model_name,
+                extractor_version)
+
+
+class SummaryCache:
+    """SQLite-backed key -> summary store with LRU eviction by entry count."""
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_SUMMARIES):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY,"
+            " summary TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return row[0]
+
+    def put(self, key: str, summary: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO summaries (key, summary, last_used) VALUES (?, ?, ?)",
+                               (key, summary, time.time()))
+            count = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM summaries WHERE key IN"
+                    " (SELECT key FROM summaries ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
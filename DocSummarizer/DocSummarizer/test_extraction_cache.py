@@ -0,0 +1,48 @@
+"""An extraction is only stored when record() runs to the end."""
+import pytest
+
+from extraction_cache import ExtractionCache, extraction_key
+
+PAGES = [(index, f"Page {index + 1} text") for index in range(4)]
+STATS = {"total_pages": 4, "processed_pages": 4}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extractions.sqlite"))
+    yield cache
+    cache.close()
+
+
+def stored_pages(cache, doc_hash):
+    key = extraction_key(doc_hash, None, cache.extractor_version)
+    return cache._conn.execute("SELECT COUNT(*) FROM pages WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_complete_recording_is_stored(cache):
+    assert list(cache.record("doc-hash", None, PAGES, STATS)) == PAGES
+    assert cache.get("doc-hash", None)["pages"] == PAGES
+
+
+@pytest.mark.parametrize("commit_between", [False, True])
+def test_recording_closed_early_leaves_no_pages(cache, commit_between):
+    recording = cache.record("doc-hash", None, PAGES, STATS)
+    next(recording)
+    next(recording)
+    if commit_between:
+        # Another call on the same connection commits while the recording is open
+        cache.put("other-hash", None, {"pages": PAGES[:1], "total_pages": 1, "processed_pages": 1})
+    recording.close()
+    assert stored_pages(cache, "doc-hash") == 0
+    assert cache.get("doc-hash", None) is None
+    assert stored_pages(cache, "other-hash") == int(commit_between)
+
+
+def test_failed_extraction_leaves_no_pages(cache):
+    def pages():
+        yield PAGES[0]
+        raise RuntimeError("pypdf failed")
+
+    with pytest.raises(RuntimeError):
+        list(cache.record("doc-hash", None, pages(), STATS))
+    assert stored_pages(cache, "doc-hash") == 0
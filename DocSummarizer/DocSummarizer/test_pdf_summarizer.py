@@ -0,0 +1,136 @@
+"""Final summaries are only cached when every chunk made it into them; stopped jobs end cleanly."""
+import re
+import sys
+import time
+import types
+import importlib.machinery
+import importlib.util
+
+import pytest
+
+if importlib.util.find_spec("google") is None or importlib.util.find_spec("google.generativeai") is None:
+    # pdf_summarizer checks for the SDK at import time; the tests replace it with FakeGenai anyway
+    for name in ("google", "google.generativeai"):
+        module = types.ModuleType(name)
+        module.__spec__ = importlib.machinery.ModuleSpec(name, None, is_package=name == "google")
+        sys.modules[name] = module
+    sys.modules["google"].generativeai = sys.modules["google.generativeai"]
+
+import pdf_summarizer
+from job_control import JobControl
+from model_registry import ModelRegistry
+from summary_cache import SummaryCache
+
+PAGES = 7
+PART = re.compile(r"This is part (\d+)")
+
+
+class FakeGenai:
+    """google.generativeai stand-in: chunk parts in slow_parts run into their request timeout."""
+
+    def __init__(self, slow_parts=(), failing_parts=()):
+        self.slow_parts = set(slow_parts)
+        self.failing_parts = set(failing_parts)
+
+    def configure(self, api_key):
+        pass
+
+    def GenerativeModel(self, name):
+        fake = self
+
+        class Model:
+            def generate_content(self, prompt, request_options=None, **kwargs):
+                match = PART.search(prompt)
+                part = int(match.group(1)) if match else None
+                if part in fake.slow_parts:
+                    time.sleep(request_options["timeout"])
+                    raise TimeoutError("Deadline exceeded")
+                if part in fake.failing_parts:
+                    raise RuntimeError("Internal error")
+                return types.SimpleNamespace(text=f"summary of part {part}" if part else "final summary")
+
+        return Model()
+
+
+@pytest.fixture
+def summarize(tmp_path, monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(pdf_summarizer, "model_registry", ModelRegistry(pdf_summarizer.MODEL_OPTIONS))
+    monkeypatch.setattr(pdf_summarizer, "MAX_CHUNK_TOKENS", 100)  # one chunk per page
+    monkeypatch.setattr(pdf_summarizer, "file_sha256", lambda path: "doc-hash")
+    monkeypatch.setattr(pdf_summarizer, "check_pdf", lambda path, max_pages: max_pages)
+    monkeypatch.setattr(pdf_summarizer, "iter_pdf_pages", lambda *args: (
+        (index, f"Page {index + 1}. " + "words " * 60) for index in range(PAGES)))
+    cache = SummaryCache(str(tmp_path / "summaries.sqlite"))
+
+    def run(genai, job):
+        monkeypatch.setitem(sys.modules, "google.generativeai", genai)
+        summary = pdf_summarizer.direct_summary_with_genai("doc.pdf", summary_cache=cache, max_concurrency=1,
+                                                           max_qps=1000, job=job)
+        cached = cache.get(pdf_summarizer.final_key("doc-hash", None, "standard", None,
+                                                    pdf_summarizer.summary_model_name(),
+                                                    pdf_summarizer.extractor_version()))
+        return summary, cached
+
+    yield run
+    cache.close()
+
+
+def test_complete_summary_is_cached(summarize):
+    summary, cached = summarize(FakeGenai(), JobControl())
+    assert summary == "final summary"
+    assert cached == summary
+
+
+def test_summary_with_failed_chunks_is_not_cached(summarize, monkeypatch):
+    monkeypatch.setattr(pdf_summarizer.JobControl, "sleep", lambda self, seconds: None)  # no retry back-off
+    summary, cached = summarize(FakeGenai(failing_parts={6, 7}), JobControl())
+    assert summary == "final summary"
+    assert cached is None
+
+
+def test_summary_after_map_deadline_is_not_cached(summarize):
+    # The map phase gets 70% of the 2 seconds: chunk 6 times out and chunk 7 is skipped,
+    # while the final summary still fits in the time that is left
+    job = JobControl(2.0)
+    summary, cached = summarize(FakeGenai(slow_parts={6}), job)
+    assert summary == "final summary"
+    assert not job.expired()
+    assert cached is None
+
+
+def test_map_phase_stopped_before_any_chunk():
+    job = JobControl()
+    job.cancel("cancelled by client")
+    stats = {}
+    chunks = iter([{"text": "words " * 60, "start_page": 1, "end_page": 1}] * 3)
+    result = pdf_summarizer.summarize_chunks_parallel(chunks, FakeGenai(), job=job, stats=stats)
+    assert result == "Error: Summarization cancelled by client before any chunk was started"
+    assert pdf_summarizer.summarize_chunks_parallel([], FakeGenai(), stats=stats) == []
+    assert stats == {"skipped_chunks": 0}
+
+
+@pytest.fixture
+def expired_job():
+    job = JobControl(0.001)
+    time.sleep(0.01)
+    assert job.expired()
+    return job
+
+
+def test_job_expired_before_map_phase(summarize, expired_job):
+    summary, cached = summarize(FakeGenai(), expired_job)
+    assert summary.startswith("Error: Summarization timed out")
+    assert cached is None
+
+
+def test_main_exits_cleanly_when_job_expired(summarize, expired_job, tmp_path, monkeypatch, capsys):
+    monkeypatch.setitem(sys.modules, "google.generativeai", FakeGenai())
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    assert pdf_summarizer.main([str(pdf), "--no_extraction_cache", "--no_summary_cache", "--ocr", "off"],
+                               job=expired_job) == 1
+    captured = capsys.readouterr()
+    assert "###SUMMARY_START###" not in captured.out
+    assert "ERROR: Summarization timed out" in captured.err
+    assert "Traceback" not in captured.err
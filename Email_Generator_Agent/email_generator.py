@@ -243,11 +243,14 @@ def generate_email_from_prompt(prompt_text):
         
         raise
 
-def main():
+def main(argv=None):
     """Main function to run the email generator application."""
+    if argv is None:
+        argv = sys.argv[1:]
+    
     # Check if a prompt file is provided as command-line argument
-    if len(sys.argv) > 1:
-        prompt_file = sys.argv[1]
+    if argv:
+        prompt_file = argv[0]
         print(f"{Fore.CYAN}Reading prompt from file: {prompt_file}{Style.RESET_ALL}")
         
         if os.path.exists(prompt_file):
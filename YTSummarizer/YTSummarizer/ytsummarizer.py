@@ -212,6 +212,9 @@ def main(youtube_link: Optional[str] = None) -> Dict[str, Any]:
     print("YouTube Transcript to Detailed Notes Converter")
     print("=" * 50)
     
+    # Only offer to save when the link was entered interactively
+    interactive = not youtube_link
+    
     # If no YouTube link provided as argument, prompt the user
     if not youtube_link:
         youtube_link = input("\nEnter YouTube Video Link: ")
@@ -250,7 +253,7 @@ def main(youtube_link: Optional[str] = None) -> Dict[str, Any]:
         result["summary"] = summary
         
         # Ask if user wants to save the summary (only in interactive mode)
-        if len(sys.argv) <= 1:
+        if interactive:
             save_option = input("\nDo you want to save these notes to a file? (y/n): ")
             if save_option.lower() == 'y':
                 filename = input("Enter filename (default: summary.txt): ") or "summary.txt"
@@ -265,14 +268,18 @@ def main(youtube_link: Optional[str] = None) -> Dict[str, Any]:
         result["error"] = error_msg
         return result
 
-if __name__ == "__main__":
+def cli(argv=None) -> int:
+    """Command line entry point; returns the process exit code."""
+    if argv is None:
+        argv = sys.argv[1:]
+    
     # Check if a video URL is provided as a command-line argument
     try:
         result = {}
         
-        if len(sys.argv) > 1:
+        if argv:
             # If a file path is provided, read the URL from the file
-            file_path = sys.argv[1]
+            file_path = argv[0]
             if os.path.exists(file_path):
                 try:
                     with open(file_path, 'r', encoding='utf-8') as f:
@@ -283,17 +290,18 @@ if __name__ == "__main__":
                     result = {"success": False, "error": f"Error reading URL from file: {str(e)}"}
             else:
                 # If it's not a file, assume it's a direct URL
-                result = main(sys.argv[1])
+                result = main(argv[0])
         else:
             # No command-line argument, run in interactive mode
             result = main()
         
         # If running in non-interactive mode, output the result as JSON
-        if len(sys.argv) > 1:
+        if argv:
             # Print the result in a format that can be easily parsed
             print("\nRESULT_JSON_START")
             print(json.dumps(result))
             print("RESULT_JSON_END")
+        return 0
             
     except Exception as e:
         print(f"Fatal error: {str(e)}")
@@ -302,8 +310,7 @@ if __name__ == "__main__":
         print("\nRESULT_JSON_START")
         print(json.dumps(result))
         print("RESULT_JSON_END")
-        sys.exit(1)
-
-
-
+        return 1
 
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -213,6 +213,44 @@ async def main():
 
     console.print("\n[bold green]Thank you for using AI Blog Generator![/]")
 
+def api_main(argv=None) -> int:
+    """Non-interactive entry point used by the API: reads the topic from a file and prints JSON."""
+    import asyncio
+    import sys
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print(json.dumps({"error": "Usage: api_main <topic_file>"}))
+        return 2
+
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        print(json.dumps({"error": "GROQ API key not found"}))
+        return 1
+
+    try:
+        with open(argv[0], 'r') as f:
+            topic = f.read().strip()
+    except OSError as e:
+        print(json.dumps({"error": f"Could not read topic file: {e}"}))
+        return 1
+    if not topic:
+        print(json.dumps({"error": "Topic file is empty"}))
+        return 1
+
+    generator = BlogGenerator(api_key)
+    try:
+        blog_post = asyncio.run(generator.generate_blog(
+            topic=topic,
+            style="technical",
+            tone="informative",
+            length="medium"
+        ))
+        print(json.dumps(blog_post))
+    except Exception as e:
+        print(json.dumps({"error": str(e)}))
+        return 1
+    return 0
+
 # Run the script
 if __name__ == "__main__":
     import asyncio
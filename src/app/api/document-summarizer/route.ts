@@ -27,7 +27,9 @@ async function executePythonScript(scriptPath: string, filePath: string, options
   return new Promise((resolve, reject) => {
     console.log(`Executing Python script: ${scriptPath} with file: ${filePath}`);
     
-    const args = [scriptPath, filePath];
+    // Run through the warm agent server when an agent is named; `call` falls back to
+    // running the script locally when no server is listening
+    const args = options.agent ? [scriptPath, 'call', options.agent, filePath] : [scriptPath, filePath];
     
     // Add additional arguments if provided
     if (options.summaryLength) {
@@ -64,6 +66,11 @@ async function executePythonScript(scriptPath: string, filePath: string, options
       }
     });
     
+    // Stop the summarization when the client disconnects; the script cancels its Gemini calls on SIGTERM
+    if (options.signal) {
+      options.signal.addEventListener('abort', () => childProcess.kill('SIGTERM'), { once: true });
+    }
+    
     let stdout = '';
     let stderr = '';
     
@@ -379,14 +386,16 @@ export async function POST(request: NextRequest) {
     const fileBuffer = Buffer.from(await file.arrayBuffer());
     fs.writeFileSync(filePath, fileBuffer);
     
-    // Path to the Python script
+    // Path to the Python script and the agent server client that runs it
     const scriptPath = path.join(process.cwd(), 'DocSummarizer', 'DocSummarizer', 'pdf_summarizer.py');
+    const agentServerPath = path.join(process.cwd(), 'AgentServer', 'agent_server.py');
     
     // Check if the script exists
     if (!fs.existsSync(scriptPath)) {
       console.error(`Document summarizer script not found at path: ${scriptPath}`);
       return NextResponse.json({ error: 'Document summarizer script not found' }, { status: 500 });
     }
+    const useAgentServer = fs.existsSync(agentServerPath);
     
     // Map summary length from UI to script options
     let summaryLengthFlag = '';
@@ -411,12 +420,14 @@ export async function POST(request: NextRequest) {
       
       // Execute with more robust handling
       const { stdout, stderr } = await executePythonScript(
-        scriptPath, 
+        useAgentServer ? agentServerPath : scriptPath, 
         filePath, 
         {
+          agent: useAgentServer ? 'pdf_summarizer' : undefined,
           summaryLength: summaryLengthFlag,
           focusAreas: focusAreas,
-          maxPages: maxPages
+          maxPages: maxPages,
+          signal: request.signal
         }
       );
       
@@ -671,8 +671,7 @@ from website_agent import WebsiteQueryAgent
 parser = argparse.ArgumentParser(description="Website Query Agent Wrapper")
 parser.add_argument("--url_file", help="File containing the URL to analyze")
 parser.add_argument("--query_file", help="File containing the question to ask")
-parser.add_argument("--save_path", help="Path to save vector store")
-parser.add_argument("--load_path", help="Path to load existing vector store")
+parser.add_argument("--store_root", help="Vector store registry root (one versioned index per URL set)")
 args = parser.parse_args()
 
 # Load URL and query from files
@@ -685,18 +684,9 @@ with open(args.query_file, 'r') as f:
 # Initialize agent
 agent = WebsiteQueryAgent()
 
-# Load vector store if path provided
-if args.load_path and os.path.exists(args.load_path):
-    print(f"Loading vector store from {args.load_path}")
-    agent.load_vector_store(args.load_path)
-else:
-    # Load website
-    print(f"Loading website: {url}")
-    agent.load_website([url])
-    
-    # Save vector store
-    if args.save_path:
-        agent.save_vector_store(args.save_path)
+# The registry resolves this URL's current index version and only rebuilds it when pages changed
+print(f"Loading website: {url}")
+agent.load_website([url], store_root=args.store_root or None)
 
 # Query
 print(f"Processing question: {query}")
@@ -709,17 +699,15 @@ print(result.get("result", "No answer found"))
                 const pythonFile = path.join(os.tmpdir(), `web_crawler_wrapper_${questionId}.py`);
                 fs.writeFileSync(pythonFile, pythonCode);
                 
-                // Check if vector store exists
+                // Same registry root as the main script, so both share the per-site indexes
                 const vectorStorePath = path.join(scriptDir, 'vector_store');
-                const loadPath = fs.existsSync(vectorStorePath) ? vectorStorePath : '';
                 
                 // Run the wrapper script
                 const wrapperOutput = await runCommand(PYTHON_COMMAND, [
                   pythonFile,
                   '--url_file', tempFile,
                   '--query_file', questionFile,
-                  '--save_path', vectorStorePath,
-                  ...(loadPath ? ['--load_path', loadPath] : [])
+                  '--store_root', vectorStorePath
                 ], {
                   cwd: scriptDir,
                   env: PYTHON_ENV,
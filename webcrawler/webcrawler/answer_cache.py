@@ -0,0 +1,132 @@
+"""
+On-disk answer cache for WebsiteQueryAgent.query.
+
+Answers are keyed on (index version, normalized question), so an identical
+question against the same published index is answered without retrieval or a
+Gemini call, and rebuilding the index naturally invalidates its answers. The
+agent's version string also carries the model and retrieval settings (k,
+fusion, reranker, context budget), so answers built from a different context
+are never reused.
+Optionally, a question that misses exactly is embedded and compared against
+recently answered questions for the same index; the best match above the
+similarity threshold is returned instead. Entries expire after a TTL and the
+least recently used ones are evicted once the cache holds too many.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_ANSWER_TTL = 24 * 60 * 60  # seconds
+DEFAULT_MAX_ENTRIES = 2000
+SIMILARITY_CANDIDATES = 200  # recently used answers compared per similarity lookup
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", question).strip().lower().rstrip("?!. ")
+
+
+class AnswerCache:
+    """SQLite-backed answer cache with TTL expiry and LRU eviction."""
+
+    def __init__(self, path: str, ttl: float = DEFAULT_ANSWER_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " index_version TEXT NOT NULL,"
+            " question_key TEXT NOT NULL,"
+            " question TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " embedding BLOB,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (index_version, question_key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def question_key(question: str) -> str:
+        return hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+
+    def get(self, index_version: str, question: str) -> Optional[Dict]:
+        """Exact lookup; returns the stored response dict or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM answers WHERE index_version = ? AND question_key = ? AND created_at > ?",
+                (index_version, self.question_key(question), time.time() - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touch(index_version, self.question_key(question))
+        return json.loads(row[0])
+
+    def get_similar(self, index_version: str, embedding: List[float], threshold: float) -> Optional[Dict]:
+        """Best cosine match among recently answered questions, if at or above threshold."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question_key, response, embedding FROM answers"
+                " WHERE index_version = ? AND embedding IS NOT NULL AND created_at > ?"
+                " ORDER BY last_used DESC LIMIT ?",
+                (index_version, time.time() - self.ttl, SIMILARITY_CANDIDATES)
+            ).fetchall()
+            if not rows:
+                return None
+            query = np.asarray(embedding, dtype=np.float32)
+            matrix = np.stack([np.frombuffer(blob, dtype=np.float32) for _, _, blob in rows])
+            norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+            scores = matrix @ query / np.where(norms == 0, 1.0, norms)
+            best = int(np.argmax(scores))
+            if scores[best] < threshold:
+                return None
+            self._touch(index_version, rows[best][0])
+        response = json.loads(rows[best][1])
+        response["similarity"] = float(scores[best])
+        return response
+
+    def put(self, index_version: str, question: str, response: Dict,
+            embedding: Optional[List[float]] = None) -> None:
+        now = time.time()
+        blob = np.asarray(embedding, dtype=np.float32).tobytes() if embedding is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers"
+                " (index_version, question_key, question, response, embedding, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (index_version, self.question_key(question), question, json.dumps(response), blob, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _touch(self, index_version: str, question_key: str) -> None:
+        self._conn.execute(
+            "UPDATE answers SET last_used = ? WHERE index_version = ? AND question_key = ?",
+            (time.time(), index_version, question_key)
+        )
+        self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM answers WHERE created_at <= ?", (now - self.ttl,))
+        count = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM answers WHERE rowid IN"
+                " (SELECT rowid FROM answers ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
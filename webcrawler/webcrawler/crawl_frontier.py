@@ -0,0 +1,239 @@
+"""
+Same-domain crawl frontier for the website agent.
+
+Starting from the given URLs (plus any sitemap.xml entries), pages are crawled
+breadth first, one depth level at a time, staying on the seed hosts and
+honouring robots.txt. Every level is fetched concurrently over one pooled
+session, and the crawl stops at the depth or page budget, whichever comes
+first, so the cost of indexing a site is predictable.
+"""
+import math
+import time
+import asyncio
+import hashlib
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from urllib.robotparser import RobotFileParser
+import xml.etree.ElementTree as ElementTree
+
+import page_fetcher
+from vector_store_registry import normalize_url
+
+DEFAULT_MAX_PAGES = 50
+MAX_SITEMAP_FILES = 5  # Nested sitemap indexes can be huge; follow only a few
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".zip", ".gz", ".tar", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico",
+    ".mp3", ".mp4", ".avi", ".mov", ".css", ".js", ".json", ".xml", ".rss", ".woff", ".woff2",
+)
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL and drop tracking parameters so one page is visited once."""
+    parts = urlsplit(normalize_url(url))
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+             if not name.lower().startswith(TRACKING_PARAMS)]
+    path = parts.path
+    while "//" in path:
+        path = path.replace("//", "/")
+    return urlunsplit((parts.scheme, parts.netloc, path, urlencode(sorted(query)), ""))
+
+
+def site_host(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class BloomFilter:
+    """Fixed-size probabilistic set used for the visited URLs."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.sha256(item.encode("utf-8")).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:16], "big") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> bool:
+        """Add an item; returns False if it was (probably) already present."""
+        added = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position // 8] & (1 << (position % 8)) for position in self._positions(item))
+
+
+def parse_sitemap(xml_text: str) -> Tuple[List[str], List[str]]:
+    """Return (page URLs, nested sitemap URLs) from a sitemap or sitemap index."""
+    try:
+        root = ElementTree.fromstring(xml_text.encode("utf-8"))
+    except ElementTree.ParseError:
+        return [], []
+    locations = [element.text.strip() for element in root.iter()
+                 if element.tag.rsplit("}", 1)[-1] == "loc" and element.text]
+    if root.tag.endswith("sitemapindex"):
+        return [], locations
+    return locations, []
+
+
+class CrawlFrontier:
+    """Breadth-first frontier with depth and page budgets, limited to the seed hosts."""
+
+    def __init__(self, seeds: List[str], max_depth: int, max_pages: int = DEFAULT_MAX_PAGES):
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.hosts = {site_host(url) for url in seeds}
+        # Links discovered per page are many times the page budget
+        self.visited = BloomFilter(capacity=max_pages * 20)
+        self.queue = deque()
+        self.robots: Dict[str, RobotFileParser] = {}
+        self.scheduled = 0
+        for url in seeds:
+            self.add(url, 0, check_robots=False)
+
+    def allowed(self, url: str) -> bool:
+        if site_host(url) not in self.hosts:
+            return False
+        if urlsplit(url).path.lower().endswith(SKIPPED_EXTENSIONS):
+            return False
+        robots = self.robots.get(site_host(url))
+        return robots is None or robots.can_fetch(page_fetcher.DEFAULT_HEADERS["User-Agent"], url)
+
+    def add(self, url: str, depth: int, check_robots: bool = True) -> bool:
+        """Schedule a URL unless it is off-site, disallowed, too deep or already seen."""
+        if depth > self.max_depth or self.scheduled >= self.max_pages:
+            return False
+        url = canonicalize_url(url)
+        if check_robots and not self.allowed(url):
+            return False
+        if not self.visited.add(url):
+            return False
+        self.queue.append((url, depth))
+        self.scheduled += 1
+        return True
+
+    def next_level(self) -> List[Tuple[str, int]]:
+        """Pop every queued URL at the shallowest depth."""
+        if not self.queue:
+            return []
+        depth = self.queue[0][1]
+        level = []
+        while self.queue and self.queue[0][1] == depth:
+            level.append(self.queue.popleft())
+        return level
+
+    def add_robots(self, url: str, robots_text: Optional[str]) -> List[str]:
+        """Register robots.txt rules for a URL's host and return the sitemaps it lists."""
+        parser = RobotFileParser()
+        parser.parse((robots_text or "").splitlines())
+        self.robots[site_host(url)] = parser
+        return list(parser.site_maps() or [])
+
+    def add_links(self, result: Dict, depth: int) -> None:
+        links = (result.get("meta") or {}).get("links") or []
+        for link in links:
+            if self.scheduled >= self.max_pages:
+                break
+            self.add(link, depth + 1)
+
+
+def _seed_roots(seeds: List[str]) -> List[str]:
+    roots = []
+    for url in seeds:
+        parts = urlsplit(canonicalize_url(url))
+        root = f"{parts.scheme}://{parts.netloc}"
+        if root not in roots:
+            roots.append(root)
+    return roots
+
+
+def _sitemap_candidates(root: str, listed: List[str]) -> List[str]:
+    return listed or [f"{root}/sitemap.xml"]
+
+
+async def _crawl_async(frontier: CrawlFrontier, seeds: List[str], previous_pages: Dict[str, Dict],
+                       on_result: Optional[Callable[[Dict], None]]) -> List[Dict]:
+    results = []
+    async with page_fetcher.create_async_session() as session:
+        # Seed rules and sitemap entries before the first level is fetched
+        for root in _seed_roots(seeds):
+            listed = frontier.add_robots(root, await page_fetcher.fetch_text_async(session, f"{root}/robots.txt"))
+            pending = _sitemap_candidates(root, listed)
+            for _ in range(MAX_SITEMAP_FILES):
+                if not pending:
+                    break
+                text = await page_fetcher.fetch_text_async(session, pending.pop(0))
+                pages, nested = parse_sitemap(text or "")
+                pending.extend(nested)
+                for url in pages:
+                    frontier.add(url, 1)
+
+        while True:
+            level = frontier.next_level()
+            if not level:
+                break
+            level_results = await asyncio.gather(*[
+                page_fetcher.fetch_page_async(session, url, previous_pages.get(normalize_url(url)))
+                for url, _ in level
+            ])
+            for (url, depth), result in zip(level, level_results):
+                results.append(result)
+                if on_result:
+                    on_result(result)
+                frontier.add_links(result, depth)
+    return results
+
+
+def _crawl_sequential(frontier: CrawlFrontier, seeds: List[str], previous_pages: Dict[str, Dict],
+                      on_result: Optional[Callable[[Dict], None]]) -> List[Dict]:
+    results = []
+    with page_fetcher.create_session() as session:
+        for root in _seed_roots(seeds):
+            listed = frontier.add_robots(root, page_fetcher.fetch_text(session, f"{root}/robots.txt"))
+            pending = _sitemap_candidates(root, listed)
+            for _ in range(MAX_SITEMAP_FILES):
+                if not pending:
+                    break
+                pages, nested = parse_sitemap(page_fetcher.fetch_text(session, pending.pop(0)) or "")
+                pending.extend(nested)
+                for url in pages:
+                    frontier.add(url, 1)
+
+        while True:
+            level = frontier.next_level()
+            if not level:
+                break
+            for url, depth in level:
+                result = page_fetcher.fetch_page(session, url, previous_pages.get(normalize_url(url)))
+                results.append(result)
+                if on_result:
+                    on_result(result)
+                frontier.add_links(result, depth)
+    return results
+
+
+def crawl_site(seeds: List[str], max_depth: int, max_pages: int = DEFAULT_MAX_PAGES,
+               previous_pages: Optional[Dict[str, Dict]] = None,
+               on_result: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+    """Crawl the seed hosts breadth first; returns page results like page_fetcher.fetch_pages."""
+    previous_pages = previous_pages or {}
+    start_time = time.time()
+    frontier = CrawlFrontier(seeds, max_depth, max_pages)
+    if page_fetcher.aiohttp is not None:
+        results = asyncio.run(_crawl_async(frontier, seeds, previous_pages, on_result))
+    else:
+        results = _crawl_sequential(frontier, seeds, previous_pages, on_result)
+    print(f"Crawled {len(results)} pages (depth {max_depth}, budget {max_pages}) "
+          f"in {time.time() - start_time:.2f} seconds")
+    return results
@@ -0,0 +1,256 @@
+"""
+Hybrid BM25 + vector retrieval for the website agent.
+
+Pure embedding search misses exact matches on code identifiers and API names,
+so a BM25 inverted index is maintained next to the FAISS index (saved as
+bm25.json.gz in the same store directory) and updated by document ID together
+with it. At query time both rankings are fused with reciprocal-rank fusion,
+optionally reranked (lexically, or with a local cross-encoder when
+sentence-transformers is installed) and trimmed to a context token budget, so
+fewer but better chunks are stuffed into the prompt.
+"""
+import os
+import re
+import gzip
+import json
+import math
+import heapq
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from embedding_pipeline import estimate_tokens
+
+BM25_FILE = "bm25.json.gz"
+RRF_K = 60  # standard reciprocal-rank fusion constant
+DEFAULT_FETCH_K = 20  # candidates taken from each ranking before fusion
+DEFAULT_K = 4
+DEFAULT_CONTEXT_TOKENS = 2000
+RERANKERS = ("lexical", "cross-encoder", "none")
+DEFAULT_CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or that the this to "
+    "was what when where which who why will with you your do does can".split()
+)
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+(?:\.[a-z0-9_]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; dotted and snake_case identifiers also yield their parts."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "." in token or "_" in token:
+            tokens.extend(part for part in re.split(r"[._]", token) if part and part not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index keyed by the vector store's document IDs."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.doc_length: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.total_length = 0
+        self._loader = None
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self.doc_terms)
+
+    def _ensure_loaded(self) -> None:
+        if self._loader is not None:
+            loader, self._loader = self._loader, None
+            loaded = loader()
+            self.k1, self.b = loaded.k1, loaded.b
+            self.doc_terms, self.doc_length = loaded.doc_terms, loaded.doc_length
+            self.postings, self.total_length = loaded.postings, loaded.total_length
+
+    def add(self, doc_ids: Iterable[str], texts: Iterable[str]) -> None:
+        self._ensure_loaded()
+        for doc_id, text in zip(doc_ids, texts):
+            self.remove([doc_id])
+            terms = Counter(tokenize(text))
+            self.doc_terms[doc_id] = dict(terms)
+            self.doc_length[doc_id] = sum(terms.values())
+            self.total_length += self.doc_length[doc_id]
+            for term, count in terms.items():
+                self.postings.setdefault(term, {})[doc_id] = count
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        self._ensure_loaded()
+        for doc_id in doc_ids:
+            terms = self.doc_terms.pop(doc_id, None)
+            if terms is None:
+                continue
+            self.total_length -= self.doc_length.pop(doc_id)
+            for term in terms:
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self.postings[term]
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Top-k (doc_id, score) pairs for a query."""
+        self._ensure_loaded()
+        if not self.doc_terms:
+            return []
+        doc_count = len(self.doc_terms)
+        average_length = self.total_length / doc_count or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, count in postings.items():
+                norm = count + self.k1 * (1 - self.b + self.b * self.doc_length[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * count * (self.k1 + 1) / norm
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def save(self, directory: str) -> None:
+        self._ensure_loaded()
+        with gzip.open(os.path.join(directory, BM25_FILE), "wt", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "docs": self.doc_terms}, f)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["BM25Index"]:
+        path = os.path.join(directory, BM25_FILE)
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(data.get("k1", 1.5), data.get("b", 0.75))
+        for doc_id, terms in data["docs"].items():
+            index.doc_terms[doc_id] = terms
+            index.doc_length[doc_id] = sum(terms.values())
+            index.total_length += index.doc_length[doc_id]
+            for term, count in terms.items():
+                index.postings.setdefault(term, {})[doc_id] = count
+        return index
+
+    @classmethod
+    def lazy(cls, directory: Optional[str] = None, store=None) -> "BM25Index":
+        """Index read from directory, or built from store's docstore, on first use.
+
+        Keeps loading a saved store independent of its size; queries that never
+        touch BM25 never pay for it.
+        """
+        index = cls()
+
+        def load():
+            loaded = cls.load(directory) if directory else None
+            if loaded is None:
+                loaded = cls.from_vector_store(store) if store is not None else cls()
+            return loaded
+
+        index._loader = load
+        return index
+
+    @classmethod
+    def from_vector_store(cls, store) -> "BM25Index":
+        """Build the index from an existing FAISS docstore (stores saved before BM25 existed)."""
+        index = cls()
+        doc_ids = list(store.index_to_docstore_id.values())
+        index.add(doc_ids, (store.docstore.search(doc_id).page_content for doc_id in doc_ids))
+        return index
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], rrf_k: int = RRF_K) -> List[Tuple[str, float]]:
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def lexical_rerank(query: str, candidates: List[Tuple[Document, float]]) -> List[Document]:
+    """Order by share of query terms present in the chunk plus the normalized fusion score."""
+    query_terms = set(tokenize(query))
+    best_fused = max((score for _, score in candidates), default=0.0) or 1.0
+    scored = []
+    for doc, fused in candidates:
+        coverage = len(query_terms & set(tokenize(doc.page_content))) / len(query_terms) if query_terms else 0.0
+        scored.append((coverage + fused / best_fused, doc))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [doc for _, doc in scored]
+
+
+_cross_encoders: Dict[str, Any] = {}
+
+
+def cross_encoder_rerank(query: str, candidates: List[Tuple[Document, float]],
+                         model_name: str = DEFAULT_CROSS_ENCODER) -> List[Document]:
+    """Rerank with a local cross-encoder; falls back to lexical reranking if unavailable."""
+    try:
+        if model_name not in _cross_encoders:
+            from sentence_transformers import CrossEncoder
+            _cross_encoders[model_name] = CrossEncoder(model_name)
+        scores = _cross_encoders[model_name].predict([(query, doc.page_content) for doc, _ in candidates])
+    except Exception as e:
+        print(f"Warning: Cross-encoder reranking unavailable ({str(e)}), using lexical reranking")
+        return lexical_rerank(query, candidates)
+    order = sorted(range(len(candidates)), key=lambda i: float(scores[i]), reverse=True)
+    return [candidates[i][0] for i in order]
+
+
+def trim_to_budget(documents: List[Document], k: int, token_budget: Optional[int]) -> List[Document]:
+    """Keep the best documents up to k and the token budget (always at least one)."""
+    kept, used = [], 0
+    for doc in documents[:k]:
+        tokens = estimate_tokens(doc.page_content)
+        if kept and token_budget and used + tokens > token_budget:
+            break
+        kept.append(doc)
+        used += tokens
+    return kept
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuses FAISS and BM25 rankings, reranks and trims the context to a token budget."""
+
+    vectorstore: Any
+    bm25: Any
+    embeddings: Any
+    k: int = DEFAULT_K
+    fetch_k: int = DEFAULT_FETCH_K
+    reranker: str = "lexical"
+    context_tokens: Optional[int] = DEFAULT_CONTEXT_TOKENS
+
+    def _vector_ranking(self, query: str) -> List[str]:
+        vector = np.asarray([self.embeddings.embed_query(query)], dtype=np.float32)
+        if getattr(self.vectorstore, "_normalize_L2", False):
+            vector /= np.linalg.norm(vector, axis=1, keepdims=True)
+        _, positions = self.vectorstore.index.search(vector, self.fetch_k)
+        return [self.vectorstore.index_to_docstore_id[int(position)]
+                for position in positions[0] if position >= 0]
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        rankings = [self._vector_ranking(query)]
+        if self.bm25 is not None:
+            rankings.append([doc_id for doc_id, _ in self.bm25.search(query, self.fetch_k)])
+        fused = reciprocal_rank_fusion(rankings)[:self.fetch_k]
+
+        candidates = []
+        for doc_id, score in fused:
+            doc = self.vectorstore.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                candidates.append((doc, score))
+
+        if self.reranker == "cross-encoder":
+            documents = cross_encoder_rerank(query, candidates)
+        elif self.reranker == "lexical":
+            documents = lexical_rerank(query, candidates)
+        else:
+            documents = [doc for doc, _ in candidates]
+        return trim_to_budget(documents, self.k, self.context_tokens)
@@ -0,0 +1,198 @@
+"""
+Pickle-free, memory-mapped vector store format for the website agent.
+
+FAISS.load_local unpickles the whole docstore on every process start, so load
+time and memory grow with the index. This format splits a store into:
+
+    store.json     small manifest (format, count, dimension, index type, metric)
+    vectors.npy    float32 vectors in index position order, opened with mmap
+    docs.sqlite    document ID, text and JSON metadata per position
+    index.faiss    the FAISS index itself, only for non-flat index types
+
+Loading reads the manifest and the ID list and nothing else. The FAISS index
+is built (flat, straight from the mmapped vectors) or read on the first
+search, and document texts are fetched from SQLite only for the chunks a
+query actually returns. Stores saved in the old pickle format still load and
+are written in this format the next time they are saved.
+"""
+import os
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Union
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+from vector_index import all_vectors, index_type_of
+
+STORE_FORMAT = "agenix-mmap-v1"
+STORE_FILE = "store.json"
+VECTORS_FILE = "vectors.npy"
+DOCS_FILE = "docs.sqlite"
+INDEX_FILE = "index.faiss"
+
+
+class SqliteDocstore(Docstore, AddableMixin):
+    """Read-only SQLite document table with an in-memory overlay for additions and deletions.
+
+    The overlay keeps a published store untouched while it is updated; saving writes
+    a complete new table.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False) if path else None
+        self._added: Dict[str, Document] = {}
+        self._deleted = set()
+
+    def search(self, search: str) -> Union[str, Document]:
+        if search in self._added:
+            return self._added[search]
+        if search in self._deleted or self._conn is None:
+            return f"ID {search} not found."
+        with self._lock:
+            row = self._conn.execute("SELECT text, metadata FROM docs WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        self._added.update(texts)
+        self._deleted.difference_update(texts)
+
+    def delete(self, ids: List) -> None:
+        for doc_id in ids:
+            self._added.pop(doc_id, None)
+            self._deleted.add(doc_id)
+
+    def ids(self) -> List[str]:
+        """Stored document IDs in index position order."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT id FROM docs ORDER BY position")]
+
+
+class MmapFAISS(FAISS):
+    """LangChain FAISS store that saves without pickle and loads its index on first use."""
+
+    _index = None
+    _index_loader = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.info: Dict = {}  # manifest of the saved store, set by load and save_local
+
+    @property
+    def index(self):
+        if self._index is None and self._index_loader is not None:
+            loader, self._index_loader = self._index_loader, None
+            self._index = loader()
+        return self._index
+
+    @index.setter
+    def index(self, value) -> None:
+        self._index = value
+        self._index_loader = None
+
+    @property
+    def index_type(self) -> str:
+        """Index type without forcing a lazily loaded index into memory."""
+        if self._index is None and self.info:
+            return self.info["index_type"]
+        return index_type_of(self.index)
+
+    @classmethod
+    def from_store(cls, store: FAISS) -> "MmapFAISS":
+        """Wrap a regular FAISS store (e.g. from FAISS.from_embeddings) without copying it."""
+        if isinstance(store, cls):
+            return store
+        return cls(store.embedding_function, store.index, store.docstore, store.index_to_docstore_id,
+                   normalize_L2=store._normalize_L2, distance_strategy=store.distance_strategy)
+
+    @staticmethod
+    def is_store(folder_path: str) -> bool:
+        return os.path.exists(os.path.join(folder_path, STORE_FILE))
+
+    def save_local(self, folder_path: str, index_name: str = "index") -> None:
+        """Write the store in the mmap format (index_name is accepted for FAISS compatibility).
+
+        Every file is written under a temporary name and renamed into place, so saving
+        over the directory the store was loaded from never touches the mmapped vectors
+        or the SQLite file that are still being read.
+        """
+        os.makedirs(folder_path, exist_ok=True)
+        index = self.index
+        index_type = index_type_of(index)
+        vectors = np.ascontiguousarray(all_vectors(index), dtype=np.float32)
+        with open(os.path.join(folder_path, VECTORS_FILE + ".tmp"), "wb") as f:
+            np.save(f, vectors)
+        if index_type != "flat":
+            faiss.write_index(index, os.path.join(folder_path, INDEX_FILE + ".tmp"))
+
+        docs_path = os.path.join(folder_path, DOCS_FILE + ".tmp")
+        if os.path.exists(docs_path):
+            os.remove(docs_path)
+        conn = sqlite3.connect(docs_path)
+        try:
+            conn.execute("CREATE TABLE docs (position INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL,"
+                         " text TEXT NOT NULL, metadata TEXT NOT NULL)")
+            rows = []
+            for position, doc_id in sorted(self.index_to_docstore_id.items()):
+                doc = self.docstore.search(doc_id)
+                if not isinstance(doc, Document):
+                    raise ValueError(f"Document {doc_id} is missing from the docstore")
+                rows.append((position, doc_id, doc.page_content, json.dumps(doc.metadata)))
+            conn.executemany("INSERT INTO docs VALUES (?, ?, ?, ?)", rows)
+            conn.commit()
+        finally:
+            conn.close()
+
+        info = {
+            "format": STORE_FORMAT,
+            "count": int(vectors.shape[0]),
+            "dimension": int(index.d),
+            "index_type": index_type,
+            "metric": int(index.metric_type),
+            "normalize_L2": bool(self._normalize_L2),
+            "distance_strategy": str(getattr(self.distance_strategy, "value", self.distance_strategy)),
+        }
+        with open(os.path.join(folder_path, STORE_FILE + ".tmp"), "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2)
+        for name in (VECTORS_FILE, DOCS_FILE, INDEX_FILE, STORE_FILE):
+            if os.path.exists(os.path.join(folder_path, name + ".tmp")):
+                os.replace(os.path.join(folder_path, name + ".tmp"), os.path.join(folder_path, name))
+        if index_type == "flat" and os.path.exists(os.path.join(folder_path, INDEX_FILE)):
+            os.remove(os.path.join(folder_path, INDEX_FILE))
+        self.info = info
+
+    @classmethod
+    def load(cls, folder_path: str, embeddings) -> "MmapFAISS":
+        """Open a saved store; vectors are mmapped and the index is read on first search."""
+        with open(os.path.join(folder_path, STORE_FILE), "r", encoding="utf-8") as f:
+            info = json.load(f)
+        if info.get("format") != STORE_FORMAT:
+            raise ValueError(f"Unsupported vector store format: {info.get('format')}")
+
+        docstore = SqliteDocstore(os.path.join(folder_path, DOCS_FILE))
+        kwargs = {"normalize_L2": info.get("normalize_L2", False)}
+        if info.get("distance_strategy"):
+            kwargs["distance_strategy"] = DistanceStrategy(info["distance_strategy"])
+        store = cls(embeddings, None, docstore, dict(enumerate(docstore.ids())), **kwargs)
+        store.info = info
+        store.vectors = np.load(os.path.join(folder_path, VECTORS_FILE), mmap_mode="r")
+
+        def read_index():
+            if info["index_type"] == "flat":
+                index = faiss.IndexFlat(info["dimension"], info.get("metric", faiss.METRIC_L2))
+                if len(store.vectors):
+                    index.add(np.ascontiguousarray(store.vectors))
+                return index
+            return faiss.read_index(os.path.join(folder_path, INDEX_FILE))
+
+        store._index_loader = read_index
+        return store
@@ -0,0 +1,221 @@
+"""
+Page fetching for the website agent.
+
+Pages are fetched with conditional requests (If-None-Match / If-Modified-Since)
+against the metadata recorded for the previous build, and the extracted text is
+hashed so callers can tell which pages actually changed and need re-embedding.
+
+When aiohttp is installed, pages are fetched concurrently over one pooled
+session with a per-host connection limit, so a multi-URL crawl takes about as
+long as its slowest page. Otherwise pages are fetched one by one with requests.
+"""
+import time
+import asyncio
+import hashlib
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urljoin, urldefrag
+
+import requests
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import brotli  # noqa: F401  (lets aiohttp decode "br" responses)
+    HAS_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        HAS_BROTLI = True
+    except ImportError:
+        HAS_BROTLI = False
+
+DEFAULT_TIMEOUT = 30  # seconds
+DEFAULT_CONNECT_TIMEOUT = 10  # seconds
+DEFAULT_PER_HOST_LIMIT = 4  # concurrent connections per host
+DEFAULT_TOTAL_LIMIT = 16  # concurrent connections overall
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; AgenixWebCrawler/1.0)",
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+    "Accept-Encoding": "gzip, deflate, br" if HAS_BROTLI else "gzip, deflate",
+}
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def html_to_document(url: str, html: str, soup: Optional[BeautifulSoup] = None) -> Document:
+    """Convert an HTML page into a Document the same way WebBaseLoader does."""
+    soup = soup or BeautifulSoup(html, "html.parser")
+    metadata = {"source": url}
+    title = soup.find("title")
+    if title:
+        metadata["title"] = title.get_text()
+    description = soup.find("meta", attrs={"name": "description"})
+    if description:
+        metadata["description"] = description.get("content", "No description found.")
+    html_tag = soup.find("html")
+    if html_tag:
+        metadata["language"] = html_tag.get("lang", "No language found.")
+    return Document(page_content=soup.get_text(), metadata=metadata)
+
+
+def extract_links(url: str, soup: BeautifulSoup) -> List[str]:
+    """Absolute http(s) links on a page, without fragments, in document order."""
+    links = []
+    seen = set()
+    for anchor in soup.find_all("a", href=True):
+        link = urldefrag(urljoin(url, anchor["href"].strip()))[0]
+        if link.startswith(("http://", "https://")) and link not in seen:
+            seen.add(link)
+            links.append(link)
+    return links
+
+
+def conditional_headers(previous: Optional[Dict]) -> Dict[str, str]:
+    """Validators from the previous fetch, so unchanged pages can answer 304."""
+    headers = {}
+    if previous:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    return headers
+
+
+def page_result(url: str, html: Optional[str], headers, previous: Optional[Dict]) -> Dict:
+    """Build a fetch result; html=None means the server answered 304 Not Modified."""
+    now = time.time()
+    if html is None:
+        return {"url": url, "status": "unchanged", "meta": {**previous, "fetched_at": now}}
+
+    soup = BeautifulSoup(html, "html.parser")
+    document = html_to_document(url, html, soup)
+    digest = content_hash(document.page_content)
+    meta = {
+        "url": url,
+        "fetched_at": now,
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "content_hash": digest,
+        "title": document.metadata.get("title"),
+        # Kept so a crawl can follow links from pages that answer 304 next time
+        "links": extract_links(url, soup),
+    }
+    # Some servers ignore validators; fall back to comparing the extracted text
+    status = "unchanged" if previous and previous.get("content_hash") == digest else "changed"
+    return {"url": url, "status": status, "document": document, "meta": meta}
+
+
+def fetch_page(session: requests.Session, url: str, previous: Optional[Dict] = None,
+               timeout: float = DEFAULT_TIMEOUT) -> Dict:
+    """Fetch one page. Returns a dict with status 'changed', 'unchanged' or 'failed'."""
+    try:
+        response = session.get(url, headers=conditional_headers(previous), timeout=timeout)
+        if response.status_code == 304 and previous:
+            return page_result(url, None, response.headers, previous)
+        response.raise_for_status()
+        return page_result(url, response.text, response.headers, previous)
+    except Exception as e:
+        return {"url": url, "status": "failed", "error": str(e)}
+
+
+async def fetch_page_async(session, url: str, previous: Optional[Dict] = None) -> Dict:
+    """Async variant of fetch_page; HTML parsing runs in a worker thread to keep the loop free."""
+    loop = asyncio.get_running_loop()
+    try:
+        async with session.get(url, headers=conditional_headers(previous)) as response:
+            if response.status == 304 and previous:
+                return page_result(url, None, response.headers, previous)
+            response.raise_for_status()
+            html = await response.text(errors="replace")
+            headers = response.headers  # case-insensitive, unlike a plain dict
+        return await loop.run_in_executor(None, page_result, url, html, headers, previous)
+    except Exception as e:
+        return {"url": url, "status": "failed", "error": str(e) or type(e).__name__}
+
+
+def create_async_session(timeout: float = DEFAULT_TIMEOUT,
+                         per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+                         total_limit: int = DEFAULT_TOTAL_LIMIT):
+    """One pooled aiohttp session with per-host and total connection limits."""
+    connector = aiohttp.TCPConnector(limit=total_limit, limit_per_host=per_host_limit)
+    client_timeout = aiohttp.ClientTimeout(total=timeout, connect=DEFAULT_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=client_timeout, headers=DEFAULT_HEADERS)
+
+
+def create_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+async def fetch_text_async(session, url: str) -> Optional[str]:
+    """Fetch a small text resource (robots.txt, sitemap.xml); None if unavailable."""
+    try:
+        async with session.get(url) as response:
+            if response.status != 200:
+                return None
+            return await response.text(errors="replace")
+    except Exception:
+        return None
+
+
+def fetch_text(session: requests.Session, url: str, timeout: float = DEFAULT_TIMEOUT) -> Optional[str]:
+    """Fetch a small text resource (robots.txt, sitemap.xml); None if unavailable."""
+    try:
+        response = session.get(url, timeout=timeout)
+        return response.text if response.status_code == 200 else None
+    except Exception:
+        return None
+
+
+async def fetch_pages_async(urls: List[str], previous_pages: Dict[str, Dict], key: Callable,
+                            on_result: Optional[Callable[[Dict], None]] = None,
+                            timeout: float = DEFAULT_TIMEOUT,
+                            per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+                            total_limit: int = DEFAULT_TOTAL_LIMIT) -> List[Dict]:
+    """Fetch all pages concurrently over one pooled session, returning results in input order."""
+    async with create_async_session(timeout, per_host_limit, total_limit) as session:
+        async def fetch(index, url):
+            return index, await fetch_page_async(session, url, previous_pages.get(key(url)))
+
+        results = [None] * len(urls)
+        for next_done in asyncio.as_completed([fetch(i, url) for i, url in enumerate(urls)]):
+            index, result = await next_done
+            results[index] = result
+            if on_result:
+                on_result(result)
+        return results
+
+
+def fetch_pages(urls: List[str], previous_pages: Optional[Dict[str, Dict]] = None,
+                key=None, on_result: Optional[Callable[[Dict], None]] = None,
+                timeout: float = DEFAULT_TIMEOUT) -> List[Dict]:
+    """Fetch a list of pages, using previous metadata (looked up by key(url)) for freshness checks.
+    
+    on_result is called with each result as soon as its page is ready, so callers can start
+    splitting documents while slower pages are still downloading.
+    """
+    previous_pages = previous_pages or {}
+    key = key or (lambda url: url)
+    start_time = time.time()
+
+    if aiohttp is not None:
+        results = asyncio.run(fetch_pages_async(urls, previous_pages, key, on_result, timeout))
+    else:
+        results = []
+        with create_session() as session:
+            for url in urls:
+                results.append(fetch_page(session, url, previous_pages.get(key(url)), timeout))
+                if on_result:
+                    on_result(results[-1])
+
+    print(f"Fetched {len(urls)} pages in {time.time() - start_time:.2f} seconds"
+          f"{'' if aiohttp is not None else ' (sequential, install aiohttp for concurrent fetching)'}")
+    return results
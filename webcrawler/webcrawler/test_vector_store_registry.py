@@ -0,0 +1,42 @@
+"""Publishing keeps the versions that stores in this process are still reading from."""
+import gc
+import os
+import time
+
+from vector_store_registry import KEEP_VERSIONS, VectorStoreRegistry, mark_open
+
+URLS = ["https://example.com/docs"]
+
+
+class FakeStore:
+    def save_local(self, folder_path):
+        os.makedirs(folder_path, exist_ok=True)
+        with open(os.path.join(folder_path, "store.json"), "w", encoding="utf-8") as f:
+            f.write("{}")
+
+
+def publish(registry):
+    time.sleep(0.002)  # versions are ordered by their millisecond timestamp
+    return registry.publish(URLS, FakeStore(), {})
+
+
+def test_superseded_versions_are_removed(tmp_path):
+    registry = VectorStoreRegistry(str(tmp_path))
+    paths = [publish(registry) for _ in range(KEEP_VERSIONS + 2)]
+    assert [os.path.isdir(path) for path in paths] == [False, False] + [True] * KEEP_VERSIONS
+    assert registry.current_path(URLS) == paths[-1]
+
+
+def test_open_version_is_kept_until_its_store_is_gone(tmp_path):
+    registry = VectorStoreRegistry(str(tmp_path))
+    first = publish(registry)
+    reader = FakeStore()
+    mark_open(first, reader)
+    for _ in range(KEEP_VERSIONS + 1):
+        publish(registry)
+    assert os.path.isdir(first)
+
+    del reader
+    gc.collect()
+    publish(registry)
+    assert not os.path.isdir(first)
@@ -0,0 +1,85 @@
+"""The CLI streams answers to plain (unquoted) questions as ###STREAM_CHUNK### lines."""
+import json
+import sys
+import types
+import importlib.machinery
+import importlib.util
+
+import pytest
+
+
+class _StubModule(types.ModuleType):
+    """Stands in for an SDK that is not installed: every name is an empty class."""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = type(name, (), {"__init__": lambda self, *args, **kwargs: None})
+        setattr(self, name, value)
+        return value
+
+
+def _installed(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ModuleNotFoundError:
+        return False
+
+
+# website_agent imports the LangChain, Gemini and scraping SDKs at import time; main() is tested
+# with a fake agent, so none of them is called
+for name in ("google", "google.generativeai", "requests", "bs4", "langchain", "langchain.chains",
+             "langchain_text_splitters", "langchain_google_genai", "langchain_community",
+             "langchain_community.vectorstores", "langchain_community.vectorstores.utils",
+             "langchain_community.docstore", "langchain_community.docstore.base", "langchain_core",
+             "langchain_core.documents", "langchain_core.embeddings", "langchain_core.prompts",
+             "langchain_core.retrievers"):
+    if name not in sys.modules and not _installed(name):
+        module = _StubModule(name)
+        module.__spec__ = importlib.machinery.ModuleSpec(name, None, is_package="." not in name)
+        sys.modules[name] = module
+        if "." in name:
+            parent, _, child = name.rpartition(".")
+            setattr(sys.modules[parent], child, module)
+
+import website_agent
+
+
+class FakeAgent:
+    """WebsiteQueryAgent stand-in with a loaded store that streams a fixed answer."""
+
+    questions = []
+
+    def __init__(self, **kwargs):
+        self.qa_chain = None
+        self.last_stream = None
+
+    def load_vector_store(self, path):
+        self.qa_chain = object()
+
+    def stream_query(self, question):
+        FakeAgent.questions.append(question)
+        self.last_stream = {"cached": False, "first_token_seconds": 0.1, "seconds": 0.2}
+        yield "Streaming "
+        yield "works."
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    FakeAgent.questions = []
+    monkeypatch.setattr(website_agent, "WebsiteQueryAgent", FakeAgent)
+    return FakeAgent
+
+
+@pytest.mark.parametrize("query,question", [("plain question", "plain question"),
+                                            ('"quoted question"', "quoted question")])
+def test_stream_prints_chunks_and_answer(agent, capsys, query, question):
+    assert website_agent.main(["--stream", "--load_path", "store", "--query", query]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert agent.questions == [question]
+    assert lines[0] == "###STREAM_START###"
+    chunks = [json.loads(line.split(" ", 1)[1]) for line in lines if line.startswith("###STREAM_CHUNK### ")]
+    assert chunks == ["Streaming ", "works."]
+    end = next(line for line in lines if line.startswith("###STREAM_END### "))
+    assert json.loads(end.split(" ", 1)[1])["cached"] is False
+    assert lines[lines.index("Answer:") + 1] == "Streaming works."
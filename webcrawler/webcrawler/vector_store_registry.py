@@ -0,0 +1,172 @@
+"""
+Per-site vector store registry for the website agent.
+
+Each normalized set of URLs gets its own directory under the registry root:
+
+    <root>/<host>_<hash>/
+        CURRENT                  name of the published version (swapped atomically)
+        v<timestamp>-<id>/       a complete FAISS index plus manifest.json
+
+Builds are written to a hidden temporary directory, renamed into place and then
+published by atomically replacing CURRENT, so readers always see either the old
+or the new index and never a half-written one. The manifest records fetch time,
+ETag, Last-Modified, content hash and the IDs of its chunks in the index for
+every page, so the next build only re-crawls and re-embeds pages that changed
+and can delete a page's old vectors by ID.
+
+Stores are read lazily from their version directory (the FAISS index and the
+keyword index on first search), so publishing keeps the last KEEP_VERSIONS
+versions plus every version marked open (mark_open) by a live store in this
+process. Other processes holding an older version must reload it after a swap
+once KEEP_VERSIONS newer versions have been published.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import weakref
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+KEEP_VERSIONS = 2  # Published versions kept around for readers still loading them
+STALE_BUILD_SECONDS = 60 * 60
+
+# Loaded store -> real path of the version directory it reads from
+_open_versions: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form used to identify a page: lowercase host, no fragment or default port."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "http").lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    path = parts.path or "/"
+    return urlunsplit((scheme, host, path, parts.query, ""))
+
+
+def site_key(urls: List[str], variant: str = "") -> str:
+    """Directory name for a set of URLs, e.g. en_wikipedia_org_3f2a9c1b7d.
+
+    variant distinguishes builds of the same URLs with different settings (e.g. crawl depth).
+    """
+    normalized = sorted(set(normalize_url(url) for url in urls))
+    key = "\n".join(normalized + ([f"#{variant}"] if variant else []))
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:10]
+    host = (urlsplit(normalized[0]).hostname if normalized else None) or "site"
+    return f"{re.sub(r'[^a-z0-9]+', '_', host.lower())}_{digest}"
+
+
+def resolve_store_path(path: str) -> str:
+    """Return the directory holding index files for a plain store or a registry site directory."""
+    pointer = os.path.join(path, CURRENT_FILE)
+    if os.path.exists(pointer):
+        with open(pointer, "r", encoding="utf-8") as f:
+            return os.path.join(path, f.read().strip())
+    return path
+
+
+def mark_open(path: str, owner) -> None:
+    """Keep the version directory at path from being cleaned up while owner (e.g. its store) is alive."""
+    _open_versions[owner] = os.path.realpath(path)
+
+
+def write_atomic(path: str, content: str) -> None:
+    """Write a small file so readers see either the old or the new content."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_manifest(directory: str, urls: List[str], pages: Dict[str, Dict], variant: str = "",
+                   version: Optional[str] = None) -> None:
+    """Record the URLs and per-page metadata (including chunk IDs) next to an index."""
+    manifest = {
+        "urls": sorted(set(normalize_url(url) for url in urls)),
+        "variant": variant,
+        "built_at": time.time(),
+        "version": version,
+        "pages": pages,
+    }
+    write_atomic(os.path.join(directory, MANIFEST_FILE), json.dumps(manifest, indent=2))
+
+
+def read_manifest(directory: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class VectorStoreRegistry:
+    """Maps URL sets to their own versioned FAISS index directories."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def site_dir(self, urls: List[str], variant: str = "") -> str:
+        return os.path.join(self.root, site_key(urls, variant))
+
+    def current_path(self, urls: List[str], variant: str = "") -> Optional[str]:
+        """Directory of the published index for these URLs, if any."""
+        site_dir = self.site_dir(urls, variant)
+        path = resolve_store_path(site_dir)
+        if path == site_dir or not os.path.isdir(path):
+            return None
+        return path
+
+    def load_manifest(self, urls: List[str], variant: str = "") -> Optional[Dict]:
+        path = self.current_path(urls, variant)
+        return read_manifest(path) if path else None
+
+    def publish(self, urls: List[str], vector_store, pages: Dict[str, Dict], variant: str = "",
+                save_extras: Optional[Callable[[str], None]] = None) -> str:
+        """Save a vector store and its manifest as the new current version for these URLs.
+        
+        save_extras(directory) can write side files (e.g. a keyword index) into the version.
+        """
+        site_dir = self.site_dir(urls, variant)
+        os.makedirs(site_dir, exist_ok=True)
+        build_id = uuid.uuid4().hex[:8]
+        build_dir = os.path.join(site_dir, f".build-{build_id}")
+        version = f"v{int(time.time() * 1000)}-{build_id}"
+
+        try:
+            vector_store.save_local(build_dir)
+            if save_extras:
+                save_extras(build_dir)
+            write_manifest(build_dir, urls, pages, variant, version)
+            os.rename(build_dir, os.path.join(site_dir, version))
+        except Exception:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+
+        write_atomic(os.path.join(site_dir, CURRENT_FILE), version)
+        self._cleanup(site_dir, version)
+        return os.path.join(site_dir, version)
+
+    def _cleanup(self, site_dir: str, current: str) -> None:
+        """Remove superseded versions that are not open in this process, and abandoned builds."""
+        versions = sorted(name for name in os.listdir(site_dir) if name.startswith("v"))
+        keep = set(versions[-KEEP_VERSIONS:]) | {current}
+        open_paths = set(_open_versions.values())
+        keep |= {name for name in versions if os.path.realpath(os.path.join(site_dir, name)) in open_paths}
+        now = time.time()
+        for name in os.listdir(site_dir):
+            path = os.path.join(site_dir, name)
+            if name.startswith("v") and name not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+            elif name.startswith(".build-") and now - os.path.getmtime(path) > STALE_BUILD_SECONDS:
+                shutil.rmtree(path, ignore_errors=True)
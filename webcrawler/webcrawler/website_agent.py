@@ -1,8 +1,8 @@
 import os
+import json
 import argparse
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional
 from dotenv import load_dotenv
-from langchain_community.document_loaders import WebBaseLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
 from langchain_community.vectorstores import FAISS
@@ -11,7 +11,15 @@ from langchain.chains import RetrievalQA
 import google.generativeai as genai
 import time
 import sys
+import uuid
+import hashlib
 from datetime import datetime
+from embedding_cache import EmbeddingCache, CachedEmbeddings, DEFAULT_CACHE_MAX_MB
+from answer_cache import AnswerCache, DEFAULT_ANSWER_TTL, DEFAULT_MAX_ENTRIES
+from page_fetcher import fetch_pages
+from crawl_frontier import crawl_site, DEFAULT_MAX_PAGES
+from vector_store_registry import (VectorStoreRegistry, normalize_url, resolve_store_path,
+                                   read_manifest, write_manifest, mark_open, CURRENT_FILE)
 
 # Load environment variables from root .env file
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -31,57 +39,21 @@ if not os.path.exists(env_path):
 else:
     load_dotenv(dotenv_path=env_path)
 
-class WebsiteQueryAgent:
-    def __init__(self, api_key: str = None, model_name: str = "models/gemini-2.5-flash"):
-        """Initialize the website query agent with Google API key and model"""
-        # Use provided API key or get from environment
-        self.api_key = api_key or os.environ.get("GOOGLE_API_KEY")
-        if not self.api_key:
-            raise ValueError("Google API key is required. Provide it directly or set in .env file.")
-            
-        os.environ["GOOGLE_API_KEY"] = self.api_key
-        genai.configure(api_key=self.api_key)
-        self.model_name = model_name
-        self.embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-        self.vector_store = None
-        self.qa_chain = None
-    
-    def load_website(self, urls: List[str]) -> None:
-        """Load content from a list of URLs using WebBaseLoader"""
-        print(f"Loading content from {len(urls)} URLs...")
-        
-        start_time = time.time()
-        
-        loader = WebBaseLoader(urls)
-        documents = loader.load()
-        
-        # Try to extract title from the first document
-        website_title = "Website Analysis"
-        if documents and hasattr(documents[0], 'metadata') and 'title' in documents[0].metadata:
-            website_title = documents[0].metadata['title']
-            print(f"Title: {website_title}")
-        
-        # Split documents into chunks with larger chunk size for better context
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1500,  # Increased chunk size
-            chunk_overlap=150  # Increased overlap
-        )
-        chunks = text_splitter.split_documents(documents)
-        print(f"Split into {len(chunks)} chunks")
-        
-        # Create vector store
-        self.vector_store = FAISS.from_documents(chunks, self.embeddings)
-        print("Vector store created successfully")
-        
-        # Set up Gemini model for QA with improved settings
-        llm = ChatGoogleGenerativeAI(
-            model=self.model_name, 
-            temperature=0.2,
-            top_p=0.95,
-            max_output_tokens=4096  # Increased token limit for longer responses
-        )
-        
-        template = """You are an expert assistant that provides detailed, accurate answers based on the provided context.
+# Helpers shared with the other agents live in the root AgentCommon directory
+sys.path.append(os.path.join(root_dir, "AgentCommon"))
+from embedding_pipeline import (BatchedEmbeddings, DEFAULT_BATCH_SIZE, DEFAULT_MAX_CONCURRENCY,
+                                DEFAULT_MAX_QPS, DEFAULT_TOKENS_PER_MINUTE)
+from vector_index import INDEX_TYPES, convert_store, delete_documents, effective_index_type
+from hybrid_retriever import (BM25Index, HybridRetriever, RERANKERS, DEFAULT_K, DEFAULT_CONTEXT_TOKENS,
+                              DEFAULT_FETCH_K, DEFAULT_CROSS_ENCODER, RRF_K)
+from mmap_store import MmapFAISS
+
+EMBEDDING_MODEL = "models/embedding-001"
+DEFAULT_EMBEDDING_CACHE_PATH = os.path.join(script_dir, "embedding_cache.sqlite")
+DEFAULT_ANSWER_CACHE_PATH = os.path.join(script_dir, "answer_cache.sqlite")
+VECTOR_K = 5  # chunks retrieved in plain vector mode (more context than the default 4)
+
+QA_PROMPT_TEMPLATE = """You are an expert assistant that provides detailed, accurate answers based on the provided context.
 
             Context: {context}
             
@@ -112,94 +84,452 @@ class WebsiteQueryAgent:
 
             Provide a comprehensive answer:
             """
-        prompt = ChatPromptTemplate.from_template(template)
-        
-        # Create QA chain with improved retrieval
-        self.qa_chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            chain_type="stuff",
-            retriever=self.vector_store.as_retriever(search_kwargs={"k": 5}),  # Increased k for more context
-            chain_type_kwargs={"prompt": prompt}
+
+def _chunk_id(page_key: str, content_hash: str, index: int) -> str:
+    """Stable document ID for the index-th chunk of one version of a page"""
+    page = hashlib.sha256(page_key.encode("utf-8")).hexdigest()[:12]
+    return f"{page}-{content_hash[:12]}-{index}"
+
+class WebsiteQueryAgent:
+    def __init__(self, api_key: str = None, model_name: str = "models/gemini-2.5-flash",
+                 embedding_cache_path: Optional[str] = DEFAULT_EMBEDDING_CACHE_PATH,
+                 embedding_cache_mb: int = DEFAULT_CACHE_MAX_MB,
+                 embedding_batch_size: int = DEFAULT_BATCH_SIZE,
+                 embedding_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 embedding_qps: Optional[float] = DEFAULT_MAX_QPS,
+                 embedding_tokens_per_minute: Optional[int] = DEFAULT_TOKENS_PER_MINUTE,
+                 answer_cache_path: Optional[str] = DEFAULT_ANSWER_CACHE_PATH,
+                 answer_cache_ttl: float = DEFAULT_ANSWER_TTL,
+                 answer_cache_entries: int = DEFAULT_MAX_ENTRIES,
+                 answer_similarity_threshold: Optional[float] = None,
+                 retrieval_mode: str = "vector", reranker: str = "lexical",
+                 retrieval_k: int = DEFAULT_K, context_tokens: Optional[int] = DEFAULT_CONTEXT_TOKENS,
+                 index_type: str = "flat"):
+        """Initialize the website query agent with Google API key and model.
+        
+        Chunk embeddings are cached on disk at embedding_cache_path (pass None to disable);
+        cache misses are embedded in parallel batches under the given QPS/token budget.
+        Answers are cached at answer_cache_path per index version; with a similarity
+        threshold set, near-identical questions are answered from the cache too.
+        retrieval_mode "vector" (the default) is plain FAISS top-5; "hybrid" fuses BM25 and
+        vector rankings and reranks the result into at most retrieval_k chunks / context_tokens tokens.
+        index_type picks the FAISS index built for new indexes (see vector_index.INDEX_TYPES).
+        """
+        # Use provided API key or get from environment
+        self.api_key = api_key or os.environ.get("GOOGLE_API_KEY")
+        if not self.api_key:
+            raise ValueError("Google API key is required. Provide it directly or set in .env file.")
+            
+        os.environ["GOOGLE_API_KEY"] = self.api_key
+        genai.configure(api_key=self.api_key)
+        self.model_name = model_name
+        self.embeddings = BatchedEmbeddings(
+            GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL),
+            batch_size=embedding_batch_size,
+            max_concurrency=embedding_concurrency,
+            max_qps=embedding_qps,
+            tokens_per_minute=embedding_tokens_per_minute
         )
+        self.batched_embeddings = self.embeddings
+        if embedding_cache_path:
+            # Unchanged chunks are served from disk instead of the embedding API
+            cache = EmbeddingCache(embedding_cache_path, max_bytes=embedding_cache_mb * 1024 * 1024)
+            self.embeddings = CachedEmbeddings(self.embeddings, EMBEDDING_MODEL, cache)
+        self.answer_cache = None
+        if answer_cache_path:
+            self.answer_cache = AnswerCache(answer_cache_path, ttl=answer_cache_ttl,
+                                            max_entries=answer_cache_entries)
+        self.answer_similarity_threshold = answer_similarity_threshold
+        self.retrieval_mode = retrieval_mode
+        self.index_type = index_type
+        self.reranker = reranker
+        self.retrieval_k = retrieval_k
+        self.context_tokens = context_tokens
+        self.vector_store = None
+        self.bm25 = None
+        self.index_version = None
+        # LLM client, prompt, retriever and chain are built on first use and then reused
+        self._llm = None
+        self._prompt = None
+        self._retriever = None
+        self._qa_chain = None
+        self.last_stream = None
+        # What the loaded index contains and where it lives, for incremental updates
+        self.urls = []
+        self.pages = {}
+        self.store_path = None
+        self.registry_root = None
+        self.store_variant = ""
+    
+    def load_website(self, urls: List[str], store_root: Optional[str] = None,
+                     crawl_depth: int = 0, max_pages: int = DEFAULT_MAX_PAGES) -> None:
+        """Load content from a list of URLs.
+        
+        With store_root set, the URL set gets its own index in the vector store registry
+        and only pages that changed since the last build are re-crawled and re-embedded.
+        With crawl_depth > 0, same-domain links are followed breadth first up to that
+        depth, indexing at most max_pages pages.
+        """
+        print(f"Loading content from {len(urls)} URLs...")
+        
+        start_time = time.time()
+        
+        # A crawl indexes a different page set than the bare URLs, so it gets its own index
+        variant = f"crawl-depth{crawl_depth}-max{max_pages}" if crawl_depth > 0 else ""
+        registry = VectorStoreRegistry(store_root) if store_root else None
+        manifest = registry.load_manifest(urls, variant) if registry else None
+        previous_store = None
+        previous_bm25 = None
+        if manifest:
+            try:
+                previous_store, previous_bm25 = self._load_store(registry.current_path(urls, variant))
+            except Exception as e:
+                print(f"Warning: Could not load existing index, rebuilding: {str(e)}")
+                manifest = None
+        previous_pages = manifest["pages"] if manifest else {}
+        
+        # Split changed pages as soon as they arrive instead of after the slowest download
+        text_splitter = self._text_splitter()
+        split_chunks = {}
+        
+        def split_page(result):
+            if result["status"] == "changed":
+                split_chunks[normalize_url(result["url"])] = text_splitter.split_documents([result["document"]])
+        
+        if crawl_depth > 0:
+            results = crawl_site(urls, crawl_depth, max_pages, previous_pages, on_result=split_page)
+        else:
+            results = fetch_pages(urls, previous_pages, key=normalize_url, on_result=split_page)
+        for result in results:
+            if result["status"] == "failed":
+                print(f"Warning: Could not fetch {result['url']}: {result['error']}")
+        
+        # Try to extract title from the first page
+        website_title = "Website Analysis"
+        if results and results[0].get("meta", {}).get("title"):
+            website_title = results[0]["meta"]["title"]
+            print(f"Title: {website_title}")
+        
+        changed = [result for result in results if result["status"] == "changed"]
+        # A crawl may reach a different set of pages than last time even if none changed
+        removed = set(previous_pages) - {normalize_url(result["url"]) for result in results}
+        self.urls, self.store_variant = list(urls), variant
+        self.registry_root, self.store_path = store_root, None
+        same_index_type = False
+        if previous_store is not None:
+            # Small sites get flat instead of ivf and float16 instead of pq; that index is still up to date
+            wanted_type = effective_index_type(self.index_type, len(previous_store.index_to_docstore_id))
+            if wanted_type != self.index_type:
+                print(f"Note: {len(previous_store.index_to_docstore_id)} chunks are too few for a "
+                      f"{self.index_type} index, using {wanted_type}")
+            same_index_type = previous_store.index_type == wanted_type
+        if previous_store is not None and not changed and not removed and same_index_type:
+            self.store_path = registry.current_path(urls, variant)
+            print(f"Index for these URLs is up to date ({self.store_path})")
+            self._set_vector_store(previous_store, previous_bm25)
+            self.pages = previous_pages
+            self.index_version = manifest.get("version")
+        else:
+            # Changed and vanished pages are swapped out of the previous index by document ID
+            vector_store, bm25, self.pages = self._update_vector_store(
+                previous_store, previous_bm25, results, split_chunks, previous_pages, removed
+            )
+            self._set_vector_store(vector_store, bm25)
+            print("Vector store created successfully")
+            if registry:
+                self.store_path = registry.publish(urls, self.vector_store, self.pages, variant,
+                                                   save_extras=self.bm25.save)
+                self.index_version = os.path.basename(self.store_path)
+                print(f"Vector store saved to {self.store_path}")
         
         end_time = time.time()
         process_time = end_time - start_time
-        print(f"QA chain setup complete")
         print(f"Total execution time: {process_time:.2f} seconds")
     
-    def save_vector_store(self, path: str) -> None:
-        """Save the FAISS vector store to disk"""
-        if self.vector_store:
-            self.vector_store.save_local(path)
-            print(f"Vector store saved to {path}")
+    def _load_store(self, path: str):
+        """Open a saved store and its BM25 index; both are read lazily on first use"""
+        if MmapFAISS.is_store(path):
+            store = MmapFAISS.load(path, self.embeddings)
         else:
-            print("No vector store to save")
-    
-    def load_vector_store(self, path: str) -> None:
-        """Load a FAISS vector store from disk"""
-        if os.path.exists(path):
+            # Stores saved before the mmap format are pickles; they are rewritten on the next save.
             # allow_dangerous_deserialization=True is required for newer versions of LangChain
             # to explicitly acknowledge we trust this pickle file source
-            self.vector_store = FAISS.load_local(path, self.embeddings, allow_dangerous_deserialization=True)
-            
-            # Set up Gemini model for QA with improved settings
-            llm = ChatGoogleGenerativeAI(
+            store = MmapFAISS.from_store(
+                FAISS.load_local(path, self.embeddings, allow_dangerous_deserialization=True)
+            )
+        # Index files are read on first search: keep this version while the store is in use
+        mark_open(path, store)
+        return store, BM25Index.lazy(path, store)
+    
+    def _set_vector_store(self, vector_store, bm25: Optional[BM25Index] = None) -> None:
+        """Point the agent (and the existing retriever, if any) at a new index"""
+        if bm25 is None and vector_store is not None:
+            bm25 = BM25Index.lazy(store=vector_store)
+        self.vector_store = vector_store
+        self.bm25 = bm25
+        # Unknown until the index is saved; answers are only cached for saved versions
+        self.index_version = None
+        if self._retriever is not None:
+            self._retriever.vectorstore = vector_store
+            if isinstance(self._retriever, HybridRetriever):
+                self._retriever.bm25 = bm25
+    
+    @property
+    def llm(self) -> ChatGoogleGenerativeAI:
+        # Set up Gemini model for QA with improved settings
+        if self._llm is None:
+            self._llm = ChatGoogleGenerativeAI(
                 model=self.model_name, 
                 temperature=0.2,
                 top_p=0.95,
                 max_output_tokens=4096  # Increased token limit for longer responses
             )
-            
-            # Create enhanced prompt template
-            template = """You are an expert assistant that provides detailed, accurate answers based on the provided context.
-
-            Context: {context}
-            
-            Question: {question}
-            
-            Guidelines for your response:
-            1. Answer based only on the provided context. If you cannot answer from the context, say "I don't have enough information to answer this question."
-            2. For questions about code, extract the complete code snippet and format it properly with appropriate markdown code blocks.
-            3. When asked for examples, provide the complete example with detailed explanation.
-            4. When asked to explain a concept, give a thorough explanation with all relevant details from the context.
-            5. Use proper formatting, including bullet points, numbered lists, and code blocks where appropriate.
-            6. If there are step-by-step instructions in the context, preserve the complete sequence.
-            7. For technical content, be precise and include all important details from the context.
-            8. Explain with your own examples or analogies to make the answer more understandable if required.
-            9. If summary is asked give a detailed summary of the context in this format:
-                1. KEY POINTS: Identify and summarize the most important information
-                2. MAIN ARGUMENTS: Extract the primary arguments or claims made in the document
-                3. EVIDENCE/DATA: Include significant evidence, statistics, or data presented, if any
-                4. CONCLUSIONS: Summarize the author's conclusions or recommendations
-                5. CONTEXT: Provide relevant context about the document's purpose and audience
-                Dont include the headers "KEY POINTS", "MAIN ARGUMENTS", etc. in your response, just the content.
-
-                Focus only on information present in the document. If you don't have enough information in the 
-                provided context, do your best with what's available.
-                
-                Do not include phrases like "The document discusses" or "The text mentions" in your summary.
-                Format the summary in clear paragraphs with logical organization.
-
-            Provide a comprehensive answer:
-            """
-            prompt = ChatPromptTemplate.from_template(template)
-            
-            # Create QA chain with improved retrieval
-            self.qa_chain = RetrievalQA.from_chain_type(
-                llm=llm,
+        return self._llm
+    
+    @property
+    def prompt(self) -> ChatPromptTemplate:
+        if self._prompt is None:
+            self._prompt = ChatPromptTemplate.from_template(QA_PROMPT_TEMPLATE)
+        return self._prompt
+    
+    @property
+    def retriever(self):
+        if self._retriever is None and self.vector_store is not None:
+            if self.retrieval_mode == "hybrid":
+                self._retriever = HybridRetriever(
+                    vectorstore=self.vector_store,
+                    bm25=self.bm25,
+                    embeddings=self.embeddings,
+                    k=self.retrieval_k,
+                    reranker=self.reranker,
+                    context_tokens=self.context_tokens
+                )
+            else:
+                self._retriever = self.vector_store.as_retriever(search_kwargs={"k": VECTOR_K})
+        return self._retriever
+    
+    @property
+    def qa_chain(self) -> Optional[RetrievalQA]:
+        """QA chain over the loaded index; None until a website or vector store is loaded"""
+        if self._qa_chain is None and self.vector_store is not None:
+            self._qa_chain = RetrievalQA.from_chain_type(
+                llm=self.llm,
                 chain_type="stuff",
-                retriever=self.vector_store.as_retriever(search_kwargs={"k": 5}),  # Increased k for more context
-                chain_type_kwargs={"prompt": prompt}
+                retriever=self.retriever,
+                chain_type_kwargs={"prompt": self.prompt}
             )
+        return self._qa_chain
+    
+    @staticmethod
+    def _text_splitter() -> RecursiveCharacterTextSplitter:
+        # Split documents into chunks with larger chunk size for better context
+        return RecursiveCharacterTextSplitter(
+            chunk_size=1500,  # Increased chunk size
+            chunk_overlap=150  # Increased overlap
+        )
+    
+    def _update_vector_store(self, store, bm25: Optional[BM25Index], results: List[Dict],
+                             split_chunks: Dict[str, List], previous_pages: Dict[str, Dict], removed=()):
+        """Apply fetch results to a FAISS index and its BM25 index in place.
+        
+        Vectors of changed and removed pages are deleted by document ID and only the new
+        chunks are embedded and added, so the cost scales with what changed rather than
+        with the size of the index. Returns the store, the BM25 index and the manifest
+        page metadata.
+        """
+        if bm25 is None:
+            bm25 = BM25Index.from_vector_store(store) if store is not None else BM25Index()
+        ids_by_page = None
+        
+        def previous_ids(key):
+            nonlocal ids_by_page
+            meta = previous_pages.get(key) or {}
+            if "chunk_ids" in meta:
+                return meta["chunk_ids"]
+            if store is None:
+                return []
+            if ids_by_page is None:
+                # Stores saved before chunk IDs were recorded in the manifest
+                ids_by_page = self._chunk_ids_by_page(store)
+            return ids_by_page.get(key, [])
+        
+        stale_ids = [chunk_id for key in removed for chunk_id in previous_ids(key)]
+        new_entries = []
+        pages = {}
+        for result in results:
+            key = normalize_url(result["url"])
+            if result["status"] == "changed":
+                stale_ids.extend(previous_ids(key))
+                chunks = split_chunks.get(key, [])
+                ids = [_chunk_id(key, result["meta"]["content_hash"], i) for i in range(len(chunks))]
+                new_entries.extend(zip(ids, chunks))
+                pages[key] = {**result["meta"], "chunk_ids": ids}
+            else:
+                # Unchanged page, or a failed fetch where stale content beats no content
+                meta = result.get("meta") or previous_pages.get(key)
+                if meta:
+                    pages[key] = {**meta, "chunk_ids": previous_ids(key)}
+        
+        print(f"Split into {len(new_entries)} new chunks ({len(stale_ids)} stale chunks to remove)")
+        if store is not None and stale_ids:
+            present = set(store.index_to_docstore_id.values())
+            stale_ids = [chunk_id for chunk_id in stale_ids if chunk_id in present]
+            if stale_ids:
+                delete_documents(store, stale_ids)
+                bm25.remove(stale_ids)
+        
+        if new_entries:
+            vectors = self.embeddings.embed_documents([chunk.page_content for _, chunk in new_entries])
+            text_embeddings = [(chunk.page_content, vector) for (_, chunk), vector in zip(new_entries, vectors)]
+            metadatas = [chunk.metadata for _, chunk in new_entries]
+            ids = [chunk_id for chunk_id, _ in new_entries]
+            if store is None:
+                store = MmapFAISS.from_store(
+                    FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas, ids=ids)
+                )
+            else:
+                store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+            bm25.add(ids, (chunk.page_content for _, chunk in new_entries))
+        
+        if store is None or not store.index_to_docstore_id:
+            raise ValueError("No content could be loaded from the provided URLs")
+        # New stores start out flat; indexes of another type are rebuilt once and then updated in place
+        convert_store(store, self.index_type)
+        return store, bm25, pages
+    
+    @staticmethod
+    def _chunk_ids_by_page(store) -> Dict[str, List[str]]:
+        """Group the document IDs of an existing index by normalized page URL"""
+        pages = {}
+        for doc_id in store.index_to_docstore_id.values():
+            doc = store.docstore.search(doc_id)
+            pages.setdefault(normalize_url(doc.metadata.get("source", "")), []).append(doc_id)
+        return pages
+    
+    def update_index(self, add_urls: Optional[List[str]] = None, remove_urls: Optional[List[str]] = None,
+                     store_root: Optional[str] = None) -> None:
+        """Incrementally add pages to and remove pages from the loaded index.
+        
+        Only added pages that are new or changed get embedded. With store_root set, the
+        result is published in the registry for the new URL set; otherwise a plain store
+        loaded from disk is saved back in place.
+        """
+        if self.vector_store is None:
+            raise ValueError("Load a vector store before updating it")
+        add_urls = add_urls or []
+        removed = {normalize_url(url) for url in remove_urls or []}
+        start_time = time.time()
+        
+        text_splitter = self._text_splitter()
+        split_chunks = {}
+        
+        def split_page(result):
+            if result["status"] == "changed":
+                split_chunks[normalize_url(result["url"])] = text_splitter.split_documents([result["document"]])
+        
+        results = fetch_pages(add_urls, self.pages, key=normalize_url, on_result=split_page) if add_urls else []
+        for result in results:
+            if result["status"] == "failed":
+                print(f"Warning: Could not fetch {result['url']}: {result['error']}")
+        
+        vector_store, bm25, updated_pages = self._update_vector_store(
+            self.vector_store, self.bm25, results, split_chunks, self.pages, removed
+        )
+        self._set_vector_store(vector_store, bm25)
+        pages = {url: meta for url, meta in self.pages.items() if url not in removed}
+        pages.update(updated_pages)
+        known = {normalize_url(url) for url in self.urls}
+        urls = [url for url in self.urls if normalize_url(url) not in removed]
+        urls += [url for url in add_urls if normalize_url(url) not in known]
+        self.urls, self.pages = urls, pages
+        
+        store_root = store_root or self.registry_root
+        if store_root:
+            path = VectorStoreRegistry(store_root).publish(urls, self.vector_store, pages, self.store_variant,
+                                                           save_extras=self.bm25.save)
+            self.index_version = os.path.basename(path)
+        elif self.store_path:
+            path = self.store_path
+            self.index_version = f"v{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+            self.vector_store.save_local(path)
+            self.bm25.save(path)
+            write_manifest(path, urls, pages, self.store_variant, self.index_version)
+        else:
+            path = None
+        print(f"Index updated with {len(results)} added and {len(removed)} removed URLs "
+              f"in {time.time() - start_time:.2f} seconds")
+        if path:
+            print(f"Vector store saved to {path}")
+    
+    def embedding_cache_stats(self) -> Optional[Dict]:
+        """Return embedding cache hit/miss counters, or None if caching is disabled"""
+        if isinstance(self.embeddings, CachedEmbeddings):
+            return self.embeddings.stats()
+        return None
+    
+    def save_vector_store(self, path: str) -> None:
+        """Save the FAISS vector store to disk"""
+        if self.vector_store:
+            self.vector_store.save_local(path)
+            self.bm25.save(path)
+            print(f"Vector store saved to {path}")
+        else:
+            print("No vector store to save")
+    
+    def load_vector_store(self, path: str) -> None:
+        """Load a FAISS vector store from disk (a plain store or a registry site directory)"""
+        if os.path.exists(path):
+            self.store_path = resolve_store_path(path)
+            self._set_vector_store(*self._load_store(self.store_path))
+            manifest = read_manifest(self.store_path) or {}
+            self.urls = manifest.get("urls", [])
+            self.pages = manifest.get("pages", {})
+            self.store_variant = manifest.get("variant", "")
+            self.index_version = manifest.get("version")
+            # A registry site directory lives directly under the registry root
+            is_site_dir = os.path.exists(os.path.join(path, CURRENT_FILE))
+            self.registry_root = os.path.dirname(os.path.abspath(path)) if is_site_dir else None
             print(f"Vector store loaded from {path}")
         else:
             print(f"No vector store found at {path}")
     
-    def query(self, question: str) -> Dict:
-        """Query the website content with enhanced handling of code and examples"""
-        if not self.qa_chain:
-            return {"answer": "Please load a website or vector store first"}
-        
+    def retrieval_signature(self) -> str:
+        """The retrieval settings that shape an answer's context, for the answer cache key"""
+        if self.retrieval_mode != "hybrid":
+            return f"vector-k{VECTOR_K}"
+        reranker = f"{self.reranker}={DEFAULT_CROSS_ENCODER}" if self.reranker == "cross-encoder" else self.reranker
+        return (f"hybrid-k{self.retrieval_k}-fetch{DEFAULT_FETCH_K}-rrf{RRF_K}"
+                f"-rerank:{reranker}-ctx{self.context_tokens}")
+    
+    def _cache_version(self) -> Optional[str]:
+        if not self.answer_cache or not self.index_version:
+            return None
+        # Answers built from a different context (k, fusion, reranking) must not be reused
+        return f"{self.index_version}:{self.model_name}:{self.retrieval_signature()}"
+    
+    def _cached_answer(self, question: str):
+        """Look the question up in the answer cache; returns (cached response or None, question embedding)"""
+        cache_version = self._cache_version()
+        if not cache_version:
+            return None, None
+        question_embedding = None
+        cached = self.answer_cache.get(cache_version, question)
+        if cached is None and self.answer_similarity_threshold:
+            try:
+                question_embedding = self.embeddings.embed_query(question)
+                cached = self.answer_cache.get_similar(cache_version, question_embedding,
+                                                       self.answer_similarity_threshold)
+            except Exception as e:
+                print(f"Warning: Similarity lookup failed: {str(e)}")
+        return cached, question_embedding
+    
+    def _cache_answer(self, question: str, answer: str, question_embedding=None) -> None:
+        cache_version = self._cache_version()
+        if cache_version and answer:
+            self.answer_cache.put(cache_version, question, {"result": answer}, question_embedding)
+    
+    @staticmethod
+    def _enhance_question(question: str) -> str:
         # Analyze the question to detect code or example requests
         code_keywords = ["code", "snippet", "implementation", "function", "class", "method"]
         example_keywords = ["example", "sample", "demonstrate", "illustration", "walkthrough"]
@@ -208,23 +538,76 @@ class WebsiteQueryAgent:
         is_example_request = any(keyword in question.lower() for keyword in example_keywords)
         
         # Enhance the question for better retrieval if needed
-        enhanced_question = question
         if is_code_request:
-            enhanced_question = f"Extract and format the complete code for: {question}"
-        elif is_example_request:
-            enhanced_question = f"Provide the full, detailed example for: {question}"
+            return f"Extract and format the complete code for: {question}"
+        if is_example_request:
+            return f"Provide the full, detailed example for: {question}"
+        return question
+    
+    def query(self, question: str) -> Dict:
+        """Query the website content with enhanced handling of code and examples
+        
+        The result dict has "cached": True when the answer came from the answer cache.
+        """
+        if not self.qa_chain:
+            return {"answer": "Please load a website or vector store first"}
+        
+        start_time = time.time()
+        cached, question_embedding = self._cached_answer(question)
+        if cached is not None:
+            print(f"Query processed in {time.time() - start_time:.2f} seconds (cached answer)")
+            return {**cached, "query": question, "cached": True}
         
         try:
-            start_time = time.time()
-            response = self.qa_chain.invoke({"query": enhanced_question})
+            response = self.qa_chain.invoke({"query": self._enhance_question(question)})
             end_time = time.time()
             process_time = end_time - start_time
             print(f"Query processed in {process_time:.2f} seconds")
-            return response
         except Exception as e:
             return {"answer": f"Error processing query: {str(e)}"}
+        
+        self._cache_answer(question, response.get("result"), question_embedding)
+        return {**response, "cached": False}
+    
+    def stream_query(self, question: str) -> Iterator[str]:
+        """Like query, but yield the answer in pieces as Gemini generates them.
+        
+        Runs the same retrieval and prompt as the QA chain. A cached answer is yielded
+        in one piece; self.last_stream records whether it was cached and the timings.
+        """
+        start_time = time.time()
+        self.last_stream = {"cached": False, "first_token_seconds": None, "seconds": None}
+        if not self.qa_chain:
+            yield "Please load a website or vector store first"
+            return
+        
+        cached, question_embedding = self._cached_answer(question)
+        if cached is not None:
+            self.last_stream.update(cached=True, first_token_seconds=time.time() - start_time)
+            yield cached["result"]
+        else:
+            pieces = []
+            try:
+                documents = self.retriever.invoke(self._enhance_question(question))
+                context = "\n\n".join(doc.page_content for doc in documents)
+                messages = self.prompt.format_messages(context=context, question=self._enhance_question(question))
+                for chunk in self.llm.stream(messages):
+                    if not chunk.content:
+                        continue
+                    if not pieces:
+                        self.last_stream["first_token_seconds"] = time.time() - start_time
+                    pieces.append(chunk.content)
+                    yield chunk.content
+            except Exception as e:
+                yield f"Error processing query: {str(e)}"
+                return
+            self._cache_answer(question, "".join(pieces), question_embedding)
+        
+        self.last_stream["seconds"] = time.time() - start_time
+        print(f"Query processed in {self.last_stream['seconds']:.2f} seconds"
+              f"{' (cached answer)' if self.last_stream['cached'] else ''}")
 
-def main():
+def main(argv=None):
     # Set up argument parser
     parser = argparse.ArgumentParser(description="Website Query Agent Tool")
     parser.add_argument("--api_key", help="Google API key (optional, can use environment variable)")
@@ -234,9 +617,47 @@ def main():
     parser.add_argument("--query", help="Question to ask about the website")
     parser.add_argument("--interactive", action="store_true", help="Run in interactive mode")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose output")
+    parser.add_argument("--embedding_cache", default=DEFAULT_EMBEDDING_CACHE_PATH,
+                        help="Path of the on-disk embedding cache")
+    parser.add_argument("--embedding_cache_mb", type=int, default=DEFAULT_CACHE_MAX_MB,
+                        help="Maximum size of the embedding cache in megabytes")
+    parser.add_argument("--no_embedding_cache", action="store_true", help="Disable the embedding cache")
+    parser.add_argument("--embedding_batch_size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Chunks per embedding request")
+    parser.add_argument("--embedding_concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="Embedding requests in flight at once")
+    parser.add_argument("--embedding_qps", type=float, default=DEFAULT_MAX_QPS,
+                        help="Maximum embedding requests per second")
+    parser.add_argument("--embedding_tpm", type=int, default=DEFAULT_TOKENS_PER_MINUTE,
+                        help="Maximum embedded tokens per minute (default: no limit)")
+    parser.add_argument("--answer_cache", default=DEFAULT_ANSWER_CACHE_PATH,
+                        help="Path of the on-disk answer cache")
+    parser.add_argument("--no_answer_cache", action="store_true", help="Disable the answer cache")
+    parser.add_argument("--answer_cache_ttl", type=float, default=DEFAULT_ANSWER_TTL,
+                        help="Seconds a cached answer stays valid")
+    parser.add_argument("--answer_similarity", type=float, default=None,
+                        help="Also reuse answers to questions at least this similar (cosine, e.g. 0.95)")
+    parser.add_argument("--retrieval", choices=["vector", "hybrid"], default="vector",
+                        help="Plain vector similarity (default), or hybrid BM25 + vector retrieval")
+    parser.add_argument("--reranker", choices=RERANKERS, default="lexical",
+                        help="How hybrid results are reranked before trimming to the token budget")
+    parser.add_argument("--retrieval_k", type=int, default=DEFAULT_K,
+                        help="Maximum chunks passed to the model with hybrid retrieval")
+    parser.add_argument("--context_tokens", type=int, default=DEFAULT_CONTEXT_TOKENS,
+                        help="Token budget for retrieved context with hybrid retrieval")
+    parser.add_argument("--index_type", choices=INDEX_TYPES, default="flat",
+                        help="FAISS index type: exact flat, float16, ivf, hnsw or pq (compact, approximate)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream the answer as ###STREAM_CHUNK### lines before the final Answer")
+    parser.add_argument("--add_urls", nargs="+", help="URLs to add to the index loaded with --load_path")
+    parser.add_argument("--remove_urls", nargs="+", help="URLs to remove from the index loaded with --load_path")
+    parser.add_argument("--crawl_depth", "--crawl-depth", type=int, default=0,
+                        help="Follow same-domain links up to this depth (0 = only the given URLs)")
+    parser.add_argument("--max_pages", "--max-pages", type=int, default=DEFAULT_MAX_PAGES,
+                        help="Maximum number of pages to index when crawling")
     
     # Parse arguments
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Print timestamp if verbose
     if args.verbose:
@@ -244,19 +665,47 @@ def main():
     
     try:
         # Initialize agent
-        agent = WebsiteQueryAgent(api_key=args.api_key)
+        agent = WebsiteQueryAgent(
+            api_key=args.api_key,
+            embedding_cache_path=None if args.no_embedding_cache else args.embedding_cache,
+            embedding_cache_mb=args.embedding_cache_mb,
+            embedding_batch_size=args.embedding_batch_size,
+            embedding_concurrency=args.embedding_concurrency,
+            embedding_qps=args.embedding_qps,
+            embedding_tokens_per_minute=args.embedding_tpm,
+            answer_cache_path=None if args.no_answer_cache else args.answer_cache,
+            answer_cache_ttl=args.answer_cache_ttl,
+            answer_similarity_threshold=args.answer_similarity,
+            retrieval_mode=args.retrieval,
+            reranker=args.reranker,
+            retrieval_k=args.retrieval_k,
+            context_tokens=args.context_tokens,
+            index_type=args.index_type
+        )
         
-        # Load existing vector store if specified
-        if args.load_path:
+        # Load existing vector store if specified (URLs get their own index from the registry)
+        if args.load_path and not args.urls:
             agent.load_vector_store(args.load_path)
         
-        # Load URLs if provided
+        # Incrementally update the loaded index instead of rebuilding it
+        if args.add_urls or args.remove_urls:
+            if agent.vector_store is None:
+                print("Error: --add_urls/--remove_urls need an index loaded with --load_path")
+                return 1
+            agent.update_index(args.add_urls, args.remove_urls, store_root=args.save_path or None)
+        
+        # Load URLs if provided; the per-site index under save_path is reused when fresh
         if args.urls:
-            agent.load_website(args.urls)
+            agent.load_website(args.urls, store_root=args.save_path or None,
+                               crawl_depth=args.crawl_depth, max_pages=args.max_pages)
             
-            # Save vector store if path specified
-            if args.save_path:
-                agent.save_vector_store(args.save_path)
+            cache_stats = agent.embedding_cache_stats()
+            if args.verbose and cache_stats:
+                print(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                      f"({cache_stats['cache_bytes'] / (1024 * 1024):.1f} MB on disk)")
+            rate = agent.batched_embeddings.chunks_per_second()
+            if args.verbose and rate:
+                print(f"Embedding throughput: {rate:.1f} chunks/sec")
         
         # Process query if provided
         if args.query:
@@ -266,7 +715,6 @@ def main():
             # Handle JSON-formatted strings (for Windows compatibility)
             if (query.startswith('"') and query.endswith('"')) or (query.startswith("'") and query.endswith("'")):
                 try:
-                    import json
                     # Try to parse as JSON string
                     query = json.loads(query)
                     if args.verbose:
@@ -294,9 +742,19 @@ def main():
                 print("Error: No website loaded. Please provide URLs or a vector store path.")
                 return
             
-            result = agent.query(query)
+            if args.stream:
+                # One JSON-encoded piece per line so the caller can forward text as it arrives
+                print("###STREAM_START###", flush=True)
+                pieces = []
+                for piece in agent.stream_query(query):
+                    pieces.append(piece)
+                    print(f"###STREAM_CHUNK### {json.dumps(piece)}", flush=True)
+                print(f"###STREAM_END### {json.dumps(agent.last_stream)}", flush=True)
+                answer = "".join(pieces)
+            else:
+                answer = agent.query(query).get("result", "No answer found")
             print("\nAnswer:")
-            print(result.get("result", "No answer found"))
+            print(answer)
         
         # Run in interactive mode if specified
         if args.interactive:
@@ -336,12 +794,9 @@ def run_interactive_mode(agent: WebsiteQueryAgent, save_path: str = "vector_stor
                 
             urls = urls_input.split()
             try:
-                agent.load_website(urls)
+                # The per-site index under save_path is saved automatically
+                agent.load_website(urls, store_root=save_path)
                 has_data = True
-                
-                # Automatically save vector store
-                agent.save_vector_store(save_path)
-                print(f"Vector store saved to {save_path}")
             except Exception as e:
                 print(f"Error loading URLs: {str(e)}")
                 continue
@@ -366,9 +821,10 @@ def run_interactive_mode(agent: WebsiteQueryAgent, save_path: str = "vector_stor
             
         print("\nProcessing question...")
         try:
-            response = agent.query(question)
             print("\nAnswer:")
-            print(response.get("result", "No answer found"))
+            for piece in agent.stream_query(question):
+                print(piece, end="", flush=True)
+            print()
         except Exception as e:
             print(f"Error: {str(e)}")
 